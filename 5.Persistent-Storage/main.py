@@ -1,17 +1,45 @@
 import asyncio
+import os
+import sys
 
 from dotenv import load_dotenv
 from google.adk.runners import Runner
 from google.adk.sessions import DatabaseSessionService
+
+# agent_common/ (shared with 6.Multi-agent) lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_common.context_window import HistoryPolicy, get_history_policy, install_history_policy
+from agent_common.console import StateObserver
+from agent_common.latest_session import prefetch_latest_session
+from agent_common.session_cache import CachingSessionService
+from agent_common.storage_profiles import apply_profile
 from memory_agent.agent import memory_agent
-from utils import call_agent_async
+from utils import call_agent_async, render_state
 
 load_dotenv()
 
 # ===== PART 1: Initialize Persistent Session Service =====
 # Using SQLite database for persistent storage
+# Recently used sessions stay in an LRU cache in front of the database
+# (MEMORY_AGENT_CACHE_SESSIONS sessions, 0 disables it)
+# The engine uses the MEMORY_AGENT_STORAGE_PROFILE storage profile
+# ("durable" by default, "fast" or "read-mostly", see agent_common/storage_profiles.py)
 db_url = "sqlite:///./my_agent_data.db"
 session_service = DatabaseSessionService(db_url=db_url)
+STORAGE_PROFILE = os.getenv("MEMORY_AGENT_STORAGE_PROFILE", "durable")
+if STORAGE_PROFILE:
+    apply_profile(session_service, STORAGE_PROFILE)
+CACHE_SESSIONS = int(os.getenv("MEMORY_AGENT_CACHE_SESSIONS", "16"))
+if CACHE_SESSIONS:
+    session_service = CachingSessionService(session_service, max_sessions=CACHE_SESSIONS)
+
+
+# Set MEMORY_AGENT_SHOW_STATE=0 to skip the before/after state display
+SHOW_STATE = os.getenv("MEMORY_AGENT_SHOW_STATE", "1") not in ("0", "false", "no")
+
+# Set MEMORY_AGENT_STREAM=0 to print responses only once they are complete
+STREAM = os.getenv("MEMORY_AGENT_STREAM", "1") not in ("0", "false", "no")
 
 
 # ===== PART 2: Define Initial State =====
@@ -28,28 +56,34 @@ async def main_async():
     USER_ID = "arvind_rajesh_mehta"
 
     # ===== PART 3: Session Management - Find or Create =====
-    # Check for existing sessions for this user
-    existing_sessions = session_service.list_sessions(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-    )
+    # Look up the most recent session (one indexed query) while the banner prints
+    latest_session_future = prefetch_latest_session(session_service, APP_NAME, USER_ID)
 
-    # If there's an existing session, use it, otherwise create a new one
-    if existing_sessions and len(existing_sessions.sessions) > 0:
-        # Use the most recent session
-        SESSION_ID = existing_sessions.sessions[0].id
-        print(f"Continuing existing session: {SESSION_ID}")
+    print("\nWelcome to Memory Agent Chat!")
+    print("Your reminders will be remembered across conversations.")
+    print("Type 'exit' or 'quit' to end the conversation.\n")
+
+    # Resume the most recent session, otherwise create a new one
+    session = await asyncio.wrap_future(latest_session_future)
+    if session is not None:
+        print(f"Continuing existing session: {session.id}")
     else:
         # Create a new session with initial state
-        new_session = session_service.create_session(
+        session = session_service.create_session(
             app_name=APP_NAME,
             user_id=USER_ID,
             state=initial_state,
         )
-        SESSION_ID = new_session.id
-        print(f"Created new session: {SESSION_ID}")
+        print(f"Created new session: {session.id}")
+    SESSION_ID = session.id
+
+    # The state came with the session; the observer then follows the event stream
+    observer = StateObserver(session.state, render_state) if SHOW_STATE else None
 
     # ===== PART 4: Agent Runner Setup =====
+    # Send the model the recent turns plus a rolling summary, not the whole history
+    install_history_policy(memory_agent, HistoryPolicy.from_env("MEMORY_AGENT_"))
+
     # Create a runner with the memory agent
     runner = Runner(
         agent=memory_agent,
@@ -58,10 +92,6 @@ async def main_async():
     )
 
     # ===== PART 5: Interactive Conversation Loop =====
-    print("\nWelcome to Memory Agent Chat!")
-    print("Your reminders will be remembered across conversations.")
-    print("Type 'exit' or 'quit' to end the conversation.\n")
-
     while True:
         # Get user input
         user_input = input("You: ")
@@ -69,10 +99,17 @@ async def main_async():
         # Check if user wants to exit
         if user_input.lower() in ["exit", "quit"]:
             print("Ending conversation. Your data has been saved to the database.")
+            stats = get_history_policy().stats()
+            print(f"Context: ~{stats['avg_tokens_after']} prompt tokens per request "
+                  f"(~{stats['avg_tokens_before']} untrimmed)")
+            if isinstance(session_service, CachingSessionService):
+                stats = session_service.stats()
+                print(f"Session cache: {stats['hits']} hits, {stats['misses']} misses, "
+                      f"{stats['bytes'] / 1024:.0f} KiB cached")
             break
 
         # Process the user query through the agent
-        await call_agent_async(runner, USER_ID, SESSION_ID, user_input)
+        await call_agent_async(runner, USER_ID, SESSION_ID, user_input, observer, stream=STREAM)
 
 
 if __name__ == "__main__":
@@ -1,65 +1,57 @@
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
-
-# ANSI color codes for terminal output
-class Colors:
-    RESET = "\033[0m"
-    BOLD = "\033[1m"
-    UNDERLINE = "\033[4m"
-
-    # Foreground colors
-    BLACK = "\033[30m"
-    RED = "\033[31m"
-    GREEN = "\033[32m"
-    YELLOW = "\033[33m"
-    BLUE = "\033[34m"
-    MAGENTA = "\033[35m"
-    CYAN = "\033[36m"
-    WHITE = "\033[37m"
-
-    # Background colors
-    BG_BLACK = "\033[40m"
-    BG_RED = "\033[41m"
-    BG_GREEN = "\033[42m"
-    BG_YELLOW = "\033[43m"
-    BG_BLUE = "\033[44m"
-    BG_MAGENTA = "\033[45m"
-    BG_CYAN = "\033[46m"
-    BG_WHITE = "\033[47m"
+from agent_common.console import Colors, ResponseStreamer
 
 
 def display_state(
     session_service, app_name, user_id, session_id, label="Current State"
 ):
-    """Display the current session state in a formatted way."""
+    """Load the session and display its state. Prefer a StateObserver inside the turn loop."""
     try:
         session = session_service.get_session(
             app_name=app_name, user_id=user_id, session_id=session_id
         )
+        render_state(session.state, label)
+    except Exception as e:
+        print(f"Error displaying state: {e}")
 
-        # Format the output with clear sections
-        print(f"\n{'-' * 10} {label} {'-' * 10}")
 
-        # Handle the user name
-        user_name = session.state.get("user_name", "Unknown")
-        print(f"👤 User: {user_name}")
+def render_state(state, label="Current State"):
+    """Display a session state dict in a formatted way."""
+    # Format the output with clear sections
+    print(f"\n{'-' * 10} {label} {'-' * 10}")
 
-        # Handle reminders
-        reminders = session.state.get("reminders", [])
-        if reminders:
-            print("📝 Reminders:")
-            for idx, reminder in enumerate(reminders, 1):
-                print(f"  {idx}. {reminder}")
-        else:
-            print("📝 Reminders: None")
+    # Handle the user name
+    user_name = state.get("user_name", "Unknown")
+    print(f"👤 User: {user_name}")
 
-        print("-" * (22 + len(label)))
-    except Exception as e:
-        print(f"Error displaying state: {e}")
+    # Handle reminders
+    reminders = state.get("reminders", [])
+    if reminders:
+        print("📝 Reminders:")
+        for idx, reminder in enumerate(reminders, 1):
+            print(f"  {idx}. {reminder}")
+    else:
+        print("📝 Reminders: None")
+
+    print("-" * (22 + len(label)))
 
 
-async def process_agent_response(event):
-    """Process and display agent response events."""
+async def process_agent_response(event, streamer=None):
+    """Process and display agent response events.
+
+    With a ResponseStreamer, partial events are printed as they arrive and the
+    final response is not printed a second time.
+    """
+    if streamer and event.partial:
+        streamer.feed(event)
+        return None
+    # A complete event closes any partial text streamed before it
+    streamed = None
+    if streamer and streamer.streaming:
+        streamed = streamer.close(final=event.is_final_response())
+
     # Log basic event info
     print(f"Event ID: {event.id}, Author: {event.author}")
 
@@ -84,7 +76,7 @@ async def process_agent_response(event):
                 print(f"  Tool Response: {part.tool_response.output}")
                 has_specific_part = True
             # Also print any text parts found in any event for debugging
-            elif hasattr(part, "text") and part.text and not part.text.isspace():
+            elif hasattr(part, "text") and part.text and not part.text.isspace() and streamed is None:
                 print(f"  Text: '{part.text.strip()}'")
 
     # Check for final response after specific parts
@@ -97,6 +89,9 @@ async def process_agent_response(event):
             and event.content.parts[0].text
         ):
             final_response = event.content.parts[0].text.strip()
+            if streamed is not None:
+                # Already shown chunk by chunk
+                return final_response
             # Use colors and formatting to make the final response stand out
             print(
                 f"\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ AGENT RESPONSE ═════════════════════════════════════════{Colors.RESET}"
@@ -113,8 +108,13 @@ async def process_agent_response(event):
     return final_response
 
 
-async def call_agent_async(runner, user_id, session_id, query):
-    """Call the agent asynchronously with the user's query."""
+async def call_agent_async(runner, user_id, session_id, query, observer=None, stream=False):
+    """Call the agent asynchronously with the user's query.
+
+    Pass a StateObserver to print the state before and after the turn; with
+    observer=None no state display work is done. With stream=True the model is
+    called in SSE mode and response text is printed as it arrives.
+    """
     content = types.Content(role="user", parts=[types.Part(text=query)])
     print(
         f"\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Running Query: {query} ---{Colors.RESET}"
@@ -122,32 +122,28 @@ async def call_agent_async(runner, user_id, session_id, query):
     final_response_text = None
 
     # Display state before processing
-    display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State BEFORE processing",
-    )
+    if observer:
+        observer.render("State BEFORE processing")
+
+    streamer = ResponseStreamer("AGENT RESPONSE") if stream else None
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if stream else RunConfig()
 
     try:
         async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=content
+            user_id=user_id, session_id=session_id, new_message=content, run_config=run_config
         ):
+            if observer:
+                observer.apply(event)
             # Process each event and get the final response if available
-            response = await process_agent_response(event)
+            response = await process_agent_response(event, streamer)
             if response:
                 final_response_text = response
     except Exception as e:
         print(f"Error during agent call: {e}")
 
     # Display state after processing the message
-    display_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State AFTER processing",
-    )
+    if observer:
+        observer.render("State AFTER processing")
+
+    return final_response_text
 
-    return final_response_text
\ No newline at end of file
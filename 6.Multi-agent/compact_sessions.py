@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Compact sessions of an existing session database offline.
+
+For every matching session, keeps the last --keep-turns turns in the events
+table, writes a snapshot row and moves older events to events_archive (or
+deletes them with --drop), exactly like the automatic compaction of
+storage.CompactionMixin. Works on databases written by
+DeltaDatabaseSessionService (multi_agent_data.db) and by the stock
+DatabaseSessionService (e.g. 5.Persistent-Storage/my_agent_data.db).
+
+    python compact_sessions.py --db multi_agent_data.db --keep-turns 20
+    python compact_sessions.py --db multi_agent_data.db --user u1 --dry-run
+    python compact_sessions.py --db multi_agent_data.db --drop --vacuum
+"""
+import argparse
+import os
+import sys
+
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from sqlalchemy import create_engine, func, select, text
+
+# agent_common/ (shared with 5.Persistent-Storage) lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.compaction import (
+    CompactingDatabaseSessionService,
+    CompactingDeltaSessionService,
+    compact_session,
+    has_delta_entries,
+)
+
+
+def open_service(db_path: str):
+    """The compacting service matching how the database was written."""
+    db_url = f"sqlite:///{db_path}"
+    engine = create_engine(db_url)
+    try:
+        delta = has_delta_entries(engine)
+    finally:
+        engine.dispose()
+    service_class = CompactingDeltaSessionService if delta else CompactingDatabaseSessionService
+    return service_class(db_url=db_url)
+
+
+def session_keys(service, app_name=None, user_id=None) -> list:
+    query = select(StorageSession.app_name, StorageSession.user_id, StorageSession.id)
+    if app_name:
+        query = query.where(StorageSession.app_name == app_name)
+    if user_id:
+        query = query.where(StorageSession.user_id == user_id)
+    with service.DatabaseSessionFactory() as db:
+        return db.execute(query.order_by(StorageSession.update_time.desc())).all()
+
+
+def count_events(service, key) -> tuple:
+    """(events, user turns) currently in the events table for a session."""
+    app_name, user_id, session_id = key
+    where = (
+        StorageEvent.app_name == app_name,
+        StorageEvent.user_id == user_id,
+        StorageEvent.session_id == session_id,
+    )
+    with service.DatabaseSessionFactory() as db:
+        events = db.execute(select(func.count()).where(*where)).scalar()
+        turns = db.execute(select(func.count()).where(*where, StorageEvent.author == "user")).scalar()
+    return events, turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact sessions of a session database")
+    parser.add_argument("--db", default="multi_agent_data.db", help="Path to the SQLite DB")
+    parser.add_argument("--app", dest="app_name", help="Only sessions of this app_name")
+    parser.add_argument("--user", dest="user_id", help="Only sessions of this user_id")
+    parser.add_argument("--keep-turns", type=int, default=20, help="Turns kept in the events table")
+    parser.add_argument("--drop", action="store_true", help="Delete old events instead of archiving them")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be compacted")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Error: database {args.db} not found", file=sys.stderr)
+        sys.exit(1)
+
+    service = open_service(args.db)
+    totals = {"sessions": 0, "events_compacted": 0, "turns_compacted": 0}
+    for key in session_keys(service, args.app_name, args.user_id):
+        events, turns = count_events(service, key)
+        label = f"{key[0]} / {key[1]} / {key[2]}"
+        if args.dry_run:
+            excess = max(0, turns - args.keep_turns)
+            print(f"{label}: {events} events, {turns} turns, {excess} turns to compact")
+            continue
+        session = service.get_session(app_name=key[0], user_id=key[1], session_id=key[2])
+        result = compact_session(service, session, keep_turns=args.keep_turns, archive=not args.drop)
+        if result["events_compacted"]:
+            totals["sessions"] += 1
+            totals["events_compacted"] += result["events_compacted"]
+            totals["turns_compacted"] += result["turns_compacted"]
+        print(f"{label}: {events} events -> {events - result['events_compacted']} "
+              f"({result['turns_compacted']} turns {'archived' if result['archived'] else 'dropped'})")
+
+    if not args.dry_run:
+        print(f"\nCompacted {totals['sessions']} sessions: {totals['events_compacted']} events, "
+              f"{totals['turns_compacted']} turns")
+    if args.vacuum and not args.dry_run:
+        with service.db_engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        print("Database vacuumed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+from datetime import datetime
+
+import state_ops
+from storage.ops import LOG_ENTRIES_KEY
+
+# ===== Append-only storage for conversation_history / agent_delegations =====
+# Session state only keeps the last TAIL_SIZE entries of each log plus a small
+# counters dict. Every entry also travels with the event (under
+# LOG_ENTRIES_KEY) to the session service, which appends it to its
+# `conversation_log` table, keyed by session, in the same transaction as the
+# state change (DeltaDatabaseSessionService; read the full log with its
+# read_log). The full history survives without being re-serialized into the
+# session state on every turn.
+
+TAIL_SIZE = int(os.getenv("MULTI_AGENT_LOG_TAIL", "20"))
+
+# State key holding per-log totals and per-agent delegation counts
+COUNTERS_KEY = "log_counters"
+
+CONVERSATION_LOG = "conversation_history"
+DELEGATION_LOG = "agent_delegations"
+
+
+def log_count(state, log_name: str) -> int:
+    """Total number of entries ever logged, falling back to the list length for legacy sessions."""
+    counters = state.get(COUNTERS_KEY) or {}
+    if log_name in counters:
+        return counters[log_name]
+    return len(state.get(log_name, []))
+
+
+def delegation_counts(state) -> dict:
+    """Number of delegations per agent across the whole session."""
+    counters = state.get(COUNTERS_KEY) or {}
+    if "delegations_by_agent" in counters:
+        return dict(counters["delegations_by_agent"])
+    counts = {}
+    for delegation in state.get(DELEGATION_LOG, []):
+        agent_name = delegation.get("agent_name", "unknown")
+        counts[agent_name] = counts.get(agent_name, 0) + 1
+    return counts
+
+
+def migrate_legacy_log(context, log_name: str) -> None:
+    """Move a legacy session's full history of `log_name` from state to the table, once.
+
+    Run it before parallel tool calls start (see migrate_legacy_logs): calls
+    that each migrate from their own copy of the state would store the
+    history twice.
+    """
+    state = context.state
+    if log_name in (state.get(COUNTERS_KEY) or {}):
+        return
+    tail = list(state.get(log_name, []))
+    state_ops.collect(context, LOG_ENTRIES_KEY, *({"log": log_name, "entry": old} for old in tail))
+    migrated = {log_name: len(tail)}
+    if log_name == DELEGATION_LOG:
+        migrated["delegations_by_agent"] = delegation_counts(state)
+    state_ops.merge(context, COUNTERS_KEY, migrated)
+
+
+def migrate_legacy_logs(context) -> None:
+    """Migrate both session logs of a legacy session (no-op for current ones)."""
+    for log_name in (CONVERSATION_LOG, DELEGATION_LOG):
+        migrate_legacy_log(context, log_name)
+
+
+def append_log_entry(context, log_name: str, entry: dict) -> int:
+    """Append an entry to a session log and keep only a capped tail in state.
+
+    Args:
+        context: ToolContext or CallbackContext of the current invocation
+        log_name: State key of the log (conversation_history or agent_delegations)
+        entry: The JSON-serializable entry to record
+
+    Returns:
+        The total number of entries in the log after this append
+    """
+    migrate_legacy_log(context, log_name)
+
+    # Counters and tail change through operations, so concurrent appends add up
+    seq = state_ops.incr(context, f"{COUNTERS_KEY}.{log_name}")
+    state_ops.collect(context, LOG_ENTRIES_KEY, {"log": log_name, "entry": entry})
+
+    if log_name == DELEGATION_LOG:
+        agent_name = entry.get("agent_name", "unknown")
+        state_ops.incr(context, f"{COUNTERS_KEY}.delegations_by_agent.{agent_name}")
+
+    state_ops.append(context, log_name, entry, limit=TAIL_SIZE)
+    return seq
+
+
+def record_delegation(context, agent_name: str, task: str) -> int:
+    """Log a delegation to a sub-agent. Returns the total delegation count."""
+    return append_log_entry(context, DELEGATION_LOG, {
+        "timestamp": datetime.now().isoformat(),
+        "agent_name": agent_name,
+        "task": task,
+        "status": "delegated"
+    })
+
+
+def record_conversation(context, **fields) -> int:
+    """Log a conversation entry (user input or agent response). Returns the total count."""
+    entry = {"timestamp": datetime.now().isoformat()}
+    entry.update(fields)
+    return append_log_entry(context, CONVERSATION_LOG, entry)
+
+
+def record_interaction(context) -> int:
+    """Count one interaction in session_metadata; returns the new total."""
+    state_ops.merge(context, "session_metadata", {"last_activity": datetime.now().isoformat()})
+    return state_ops.incr(context, "session_metadata.total_interactions")
+
@@ -0,0 +1,353 @@
+"""Shared joke corpus for joke_agent and funny_nerd.
+
+Jokes live in a JSONL file (data/jokes.jsonl, or MULTI_AGENT_JOKES_FILE), one
+object per line:
+
+    {"topic": "python", "tags": ["nerd", "programming"], "text": "Why ..."}
+
+The file is scanned once, when the corpus is first used: JokeCorpus keeps only
+each line's byte offset and its id in the per-topic and per-tag indexes (typed
+arrays), and reads a joke's text from the memory-mapped file when it is told.
+The index is saved next to the file (jokes.jsonl.idx: a JSON header, then
+the raw arrays; no pickle) and reused while the file's size and
+modification time are unchanged. A joke's id is its line
+number among the jokes, so add new jokes at the end.
+
+Each user's told jokes are a bitset over those ids, stored zlib-compressed
+under state["user:jokes_seen"] (shared by all sessions of the user), so
+sampling does not repeat a joke until every joke of the pool has been told.
+tell_joke changes it through a state_ops "bits" operation, so jokes told by
+tool calls running at the same time are all kept:
+
+    joke = tell_joke(tool_context, topic="python")
+    joke["text"], joke["topic"], joke["tags"]
+"""
+import json
+import mmap
+import os
+import random
+import sys
+import threading
+from array import array
+from typing import Iterable, Optional
+
+import state_ops
+from storage.ops import decode_bitset, encode_bitset
+
+JOKES_PATH = os.getenv(
+    "MULTI_AGENT_JOKES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "jokes.jsonl"),
+)
+
+# User-scoped: one bitset per user, not per session
+SEEN_KEY = "user:jokes_seen"
+
+# Layout of the saved index (bump when it changes)
+_INDEX_FORMAT = 1
+
+# Random picks tried before listing the unseen jokes of a pool
+_SAMPLE_ATTEMPTS = 8
+
+
+def _pool_ids(pool):
+    """The ids of `pool` (an id array or range) as an int64 numpy array."""
+    import numpy as np
+
+    if isinstance(pool, range):
+        return np.arange(pool.start, pool.stop, pool.step, dtype=np.int64)
+    if isinstance(pool, array):
+        return np.frombuffer(pool, dtype=np.uint32).astype(np.int64)
+    return np.asarray(pool, dtype=np.int64)
+
+
+class SeenJokes:
+    """Set of joke ids as a bitset (bit i of byte i // 8 is joke i)."""
+
+    def __init__(self, bits: Optional[bytes] = None):
+        self.bits = bytearray(bits or b"")
+
+    @classmethod
+    def of(cls, pool) -> "SeenJokes":
+        """The set of every id in `pool` (an id array or range)."""
+        import numpy as np
+
+        ids = _pool_ids(pool)
+        if not len(ids):
+            return cls()
+        members = np.zeros(int(ids.max()) + 1, dtype=bool)
+        members[ids] = True
+        return cls(np.packbits(members, bitorder="little").tobytes())
+
+    @classmethod
+    def from_state(cls, value) -> "SeenJokes":
+        """Decode the value stored under SEEN_KEY (missing or unreadable: nothing seen)."""
+        return cls(decode_bitset(value))
+
+    def to_state(self) -> str:
+        """The bitset as stored under SEEN_KEY (see storage.ops.encode_bitset)."""
+        return encode_bitset(self.bits)
+
+    def __contains__(self, joke_id: int) -> bool:
+        byte = joke_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (joke_id & 7)))
+
+    def __len__(self) -> int:
+        return sum(bin(b).count("1") for b in self.bits)
+
+    def add(self, joke_id: int) -> None:
+        byte = joke_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (joke_id & 7)
+
+    def unseen(self, pool):
+        """The ids of `pool` (an id array or range) not in the set, as a numpy array."""
+        import numpy as np
+
+        ids = _pool_ids(pool)
+        bits = np.unpackbits(np.frombuffer(bytes(self.bits), dtype=np.uint8), bitorder="little")
+        told = np.zeros(len(ids), dtype=bool)
+        inside = ids < len(bits)
+        told[inside] = bits[ids[inside]].astype(bool)
+        return ids[~told]
+
+    def discard_many(self, joke_ids: Iterable[int]) -> None:
+        for joke_id in joke_ids:
+            byte = joke_id >> 3
+            if byte < len(self.bits):
+                self.bits[byte] &= ~(1 << (joke_id & 7)) & 0xFF
+
+
+class JokeCorpus:
+    """Read-only, indexed view of a JSONL joke file.
+
+    Args:
+        path: The JSONL file (kept open and memory-mapped)
+        cache_index: Load/save the index from/to `path` + ".idx"
+
+    Raises:
+        ValueError: A line is not a JSON object with a "text"
+    """
+
+    def __init__(self, path: str = JOKES_PATH, cache_index: bool = True):
+        self.path = path
+        self._offsets = array("Q")  # start of each joke's line, plus the end of the last one
+        self._topics = {}  # topic -> array of ids, in file order
+        self._tags = {}  # tag -> array of ids
+        self._pools = {}  # (topic, tag) -> ids of both
+        self._file = open(path, "rb")
+        self._map = None
+        stat = os.fstat(self._file.fileno())
+        version = (stat.st_size, stat.st_mtime_ns)
+        if not (cache_index and self._load_index(version)):
+            self._scan()
+            if cache_index:
+                self._save_index(version)
+        if len(self):
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _scan(self) -> None:
+        offset = 0
+        for lineno, line in enumerate(self._file, 1):
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line.decode("utf-8"))
+            except ValueError as exc:
+                raise ValueError(f"{self.path}:{lineno}: {exc}") from None
+            if not isinstance(entry, dict) or not entry.get("text"):
+                raise ValueError(f"{self.path}:{lineno}: expected an object with a \"text\"")
+            joke_id = len(self._offsets)
+            self._offsets.append(start)
+            self._index(self._topics, str(entry.get("topic") or "general").lower(), joke_id)
+            for tag in entry.get("tags") or ():
+                self._index(self._tags, str(tag).lower(), joke_id)
+        self._offsets.append(offset)
+
+    def _load_index(self, version: tuple) -> bool:
+        """Read the saved index: a JSON header line, then the raw array bytes.
+
+        Any unreadable, truncated or differently laid out file is ignored
+        (the caller scans the JSONL file again).
+        """
+        try:
+            with open(self.path + ".idx", "rb") as f:
+                header = json.loads(f.readline())
+                body = f.read()
+            if (header["format"] != _INDEX_FORMAT or header["version"] != list(version)
+                    or header["byteorder"] != sys.byteorder):
+                return False
+            offsets, position = self._read_array(body, 0, "Q", header["offsets"])
+            topics, position = self._read_index(body, position, header["topics"])
+            tags, position = self._read_index(body, position, header["tags"])
+            if position != len(body):
+                return False
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, IndexError):
+            return False
+        self._offsets, self._topics, self._tags = offsets, topics, tags
+        return True
+
+    @classmethod
+    def _read_index(cls, body: bytes, position: int, counts: list) -> tuple:
+        index = {}
+        for key, count in counts:
+            index[str(key)], position = cls._read_array(body, position, "I", count)
+        return index, position
+
+    @staticmethod
+    def _read_array(body: bytes, position: int, typecode: str, count: int) -> tuple:
+        values = array(typecode)
+        if not isinstance(count, int) or count < 0:
+            raise ValueError(f"bad array length {count!r}")
+        end = position + count * values.itemsize
+        if end > len(body):
+            raise ValueError("truncated index")
+        values.frombytes(body[position:end])
+        return values, end
+
+    def _save_index(self, version: tuple) -> None:
+        header = {
+            "format": _INDEX_FORMAT,
+            "version": list(version),
+            "byteorder": sys.byteorder,
+            "offsets": len(self._offsets),
+            "topics": [[key, len(ids)] for key, ids in self._topics.items()],
+            "tags": [[key, len(ids)] for key, ids in self._tags.items()],
+        }
+        tmp_path = f"{self.path}.idx.{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(json.dumps(header).encode("utf-8") + b"\n")
+                f.write(self._offsets.tobytes())
+                for index in (self._topics, self._tags):
+                    for ids in index.values():
+                        f.write(ids.tobytes())
+            os.replace(tmp_path, self.path + ".idx")
+        except OSError:
+            # e.g. a read-only data directory: scan again next time
+            pass
+
+    @staticmethod
+    def _index(index: dict, key: str, joke_id: int) -> None:
+        ids = index.get(key)
+        if ids is None:
+            ids = index[key] = array("I")
+        ids.append(joke_id)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def topics(self, tag: Optional[str] = None) -> list:
+        """Topics in the order they first appear (among the `tag` jokes, if given)."""
+        if tag is None:
+            return list(self._topics)
+        first = {topic: pool[0] for topic in self._topics if len(pool := self.pool(topic, tag))}
+        return sorted(first, key=first.get)
+
+    def tags(self) -> list:
+        return list(self._tags)
+
+    def get(self, joke_id: int) -> dict:
+        """The joke with id `joke_id`: its JSON object plus "id" (and "topic" defaulted)."""
+        if not 0 <= joke_id < len(self):
+            raise IndexError(f"joke id {joke_id} out of range")
+        entry = json.loads(self._map[self._offsets[joke_id]:self._offsets[joke_id + 1]])
+        entry.setdefault("topic", "general")
+        entry["id"] = joke_id
+        return entry
+
+    def pool(self, topic: Optional[str] = None, tag: Optional[str] = None):
+        """Ids of the jokes with `topic` and `tag` (either may be None); empty if none match."""
+        topic = topic.strip().lower() if topic else None
+        tag = tag.strip().lower() if tag else None
+        if topic is None and tag is None:
+            return range(len(self))
+        if tag is None:
+            return self._topics.get(topic, ())
+        if topic is None:
+            return self._tags.get(tag, ())
+        key = (topic, tag)
+        if key not in self._pools:
+            tagged = set(self._tags.get(tag, ()))
+            self._pools[key] = array("I", (i for i in self._topics.get(topic, ()) if i in tagged))
+        return self._pools[key]
+
+    def sample(self, pool, seen: Optional[SeenJokes] = None, rng=random) -> Optional[dict]:
+        """A random joke from `pool` not in `seen` (None if the pool is empty).
+
+        Once every joke of the pool is in `seen` they are removed from it and
+        the pool starts over. The joke told is added to `seen`.
+        """
+        if not len(pool):
+            return None
+        if seen is None:
+            return self.get(pool[rng.randrange(len(pool))])
+        joke_id = None
+        for _ in range(_SAMPLE_ATTEMPTS):
+            candidate = pool[rng.randrange(len(pool))]
+            if candidate not in seen:
+                joke_id = candidate
+                break
+        if joke_id is None:
+            # Mostly told already: pick among the rest
+            unseen = seen.unseen(pool)
+            if not len(unseen):
+                seen.discard_many(pool)
+                unseen = pool
+            joke_id = int(unseen[rng.randrange(len(unseen))])
+        seen.add(joke_id)
+        return self.get(joke_id)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+def tell_joke(context, topic: Optional[str] = None, tag: Optional[str] = None) -> Optional[dict]:
+    """A joke this user has not heard yet, from `topic` and/or `tag`; marks it as told.
+
+    Args:
+        context: ToolContext or CallbackContext of the current invocation
+        topic: Joke topic ("python", "food", ...), any if None
+        tag: Joke tag ("nerd", "general", ...), any if None
+
+    Returns:
+        The joke (see JokeCorpus.get), or None if no joke matches
+    """
+    corpus = get_joke_corpus()
+    pool = corpus.pool(topic, tag)
+    seen = SeenJokes.from_state(context.state.get(SEEN_KEY))
+    before = SeenJokes(bytes(seen.bits))
+    joke = corpus.sample(pool, seen)
+    if joke is not None:
+        # Record the change, not the new bitset: the storage layer applies it
+        # to the stored value, keeping the jokes other tool calls just told.
+        # Starting the pool over clears it as one compressed bitset, not a
+        # list of its (possibly 100k) ids
+        started_over = joke["id"] in before
+        state_ops.update_bits(
+            context, SEEN_KEY, add=[joke["id"]], clear=SeenJokes.of(pool).bits if started_over else None
+        )
+    return joke
+
+
+_corpus: Optional[JokeCorpus] = None
+_corpus_lock = threading.Lock()
+
+
+def get_joke_corpus() -> JokeCorpus:
+    """Return the process-wide joke corpus, indexing the file on first use."""
+    global _corpus
+    if _corpus is None:
+        with _corpus_lock:
+            if _corpus is None:
+                _corpus = JokeCorpus()
+    return _corpus
+
+
+def set_joke_corpus(corpus: Optional[JokeCorpus]) -> None:
+    """Replace the process-wide joke corpus (e.g. with one on a generated file)."""
+    global _corpus
+    _corpus = corpus
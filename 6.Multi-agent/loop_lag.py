@@ -0,0 +1,74 @@
+"""Event-loop lag: how long the asyncio loop was busy when it should have woken up.
+
+One blocking call on the loop (a sync tool waiting on yfinance, a SQLite
+commit) stalls every session, stream and HTTP request served by the process.
+LoopLagMonitor measures that directly: a coroutine sleeps `interval` seconds
+at a time and records how late it was woken. The lag is ~0 when the loop is
+free and equals the blocking time when something held it.
+
+    monitor = LoopLagMonitor()
+    monitor.start()          # inside the running loop
+    ...
+    monitor.stats()          # {"p50_ms": ..., "p99_ms": ..., "max_ms": ..., ...}
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+
+class LoopLagMonitor:
+    """Samples the lag of the running event loop.
+
+    Args:
+        interval: Seconds between samples
+        window: Recent samples kept for the percentiles
+        slow_ms: Lag (ms) counted as a stall in `stalls`
+    """
+
+    def __init__(self, interval: float = 0.05, window: int = 2000, slow_ms: float = 100.0):
+        self.interval = interval
+        self.slow_ms = slow_ms
+        self._samples: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"samples": 0, "stalls": 0, "max_ms": 0.0}
+
+    def start(self) -> None:
+        """Start sampling on the running loop (no-op if already started)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        ordered = sorted(self._samples)
+
+        def pct(p):
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 2)
+
+        return {
+            **self.counters,
+            "max_ms": round(self.counters["max_ms"], 2),
+            "p50_ms": pct(50),
+            "p99_ms": pct(99),
+            "interval_ms": self.interval * 1000,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.perf_counter() - expected) * 1000)
+            self._samples.append(lag_ms)
+            self.counters["samples"] += 1
+            self.counters["stalls"] += lag_ms >= self.slow_ms
+            self.counters["max_ms"] = max(self.counters["max_ms"], lag_ms)
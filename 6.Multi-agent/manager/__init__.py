@@ -1 +1,8 @@
-from . import agent
+import importlib
+
+
+def __getattr__(name):
+    # `manager.agent` (and with it litellm and every sub-agent) is imported on first access
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
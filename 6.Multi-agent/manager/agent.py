@@ -1,25 +1,31 @@
-from google.adk.agents import Agent
+import sys
+import os
+# The example folder (state_management_tools, ...) and agent_common/ (shared
+# with 5.Persistent-Storage, at the repository root) go on sys.path before
+# the sub-agents are imported: they import both
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 from google.adk.tools.agent_tool import AgentTool
 
 from .sub_agents.funny_nerd.agent import funny_nerd
 from .sub_agents.joke_agent.agent import joke_agent
 from .sub_agents.stock_analyst.agent import stock_analyst
+from .router import install_fast_path
 from .tools.tools import get_current_time
 
 # Import state management tools
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from state_management_tools import (
-    track_agent_delegation,
     update_user_preferences,
     add_to_stock_watchlist,
     add_joke_preference,
     get_conversation_summary,
     set_favorite_agent,
     get_agent_performance_stats,
-    log_user_input,
+    install_bookkeeping_callbacks,
 )
+from agent_common.context_window import HistoryPolicy, install_history_policy
+from tool_execution import ConcurrentToolsAgent
 
 from dotenv import load_dotenv
 import os 
@@ -30,7 +36,8 @@ model = LiteLlm(
     api_key=os.getenv("OPENROUTER_API_KEY")
 )
 
-root_agent = Agent(
+# Independent tool calls of one model response run concurrently
+root_agent = ConcurrentToolsAgent(
     name="manager",
     model=model,
     description="Manager agent with persistent state management",
@@ -49,7 +56,6 @@ root_agent = Agent(
 
     **STATE MANAGEMENT CAPABILITIES:**
     You have access to tools that help maintain persistent state:
-    - track_agent_delegation: Track when you delegate tasks to sub-agents
     - update_user_preferences: Update user preferences for personalized interactions
     - add_to_stock_watchlist: Add stocks to user's watchlist
     - add_joke_preference: Track user's joke topic preferences
@@ -58,11 +64,10 @@ root_agent = Agent(
     - get_agent_performance_stats: Get statistics about agent usage
 
     **DELEGATION WORKFLOW:**
-    1. ALWAYS call log_user_input with the user's exact message BEFORE doing anything else
-    2. When delegating to a sub-agent, use track_agent_delegation first
-    3. Use appropriate tools to update user preferences based on their requests
-    4. Provide personalized responses based on stored preferences
-    5. Track user interactions to improve future responses
+    User messages and delegations are logged automatically; do not log them yourself.
+    1. Delegate to the right sub-agent directly
+    2. Use appropriate tools to update user preferences based on their requests
+    3. Provide personalized responses based on stored preferences
 
     **PERSONALIZATION:**
     - Remember user preferences across conversations
@@ -76,8 +81,6 @@ root_agent = Agent(
     sub_agents=[stock_analyst, funny_nerd, joke_agent],
     tools=[
         get_current_time,
-        log_user_input,
-        track_agent_delegation,
         update_user_preferences,
         add_to_stock_watchlist,
         add_joke_preference,
@@ -85,4 +88,11 @@ root_agent = Agent(
         set_favorite_agent,
         get_agent_performance_stats,
     ],
-)
\ No newline at end of file
+)
+
+# User input and delegation bookkeeping runs in callbacks, not as model tool calls
+install_bookkeeping_callbacks(root_agent)
+# Obvious requests are transferred by the rule-based router without a model call
+install_fast_path(root_agent)
+# Every model request gets the recent turns plus a rolling summary of older ones
+install_history_policy(root_agent, HistoryPolicy.from_env("MULTI_AGENT_"))
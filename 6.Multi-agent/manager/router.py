@@ -0,0 +1,191 @@
+"""Rule-based fast path in front of the manager's model.
+
+Most requests are obvious ("price of AAPL", "tell me a python joke"), yet each
+one cost a manager model call just to pick the sub-agent. The router runs as
+the before_model_callback of the manager and its sub-agents (a session resumes
+at the sub-agent that answered last): when a request clearly matches exactly
+one other sub-agent it answers with a transfer_to_agent call itself, so the
+model is skipped; anything ambiguous goes to the model as before.
+
+Lexicon:
+- stock_analyst: price/quote/stock keywords plus a ticker-looking word
+  ($AAPL, MSFT) or any ticker from the user's stock_watchlist
+- funny_nerd: a joke keyword plus a nerd topic (nerd_topics(), from the joke corpus) or "nerdy"
+- joke_agent: a joke keyword without a nerd topic
+
+Set MULTI_AGENT_FAST_PATH=0 to always use the manager model.
+"""
+import os
+import re
+import threading
+from typing import Iterable, Optional
+
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from agent_common.context_window import chain_callbacks
+from preference_sets import stock_watchlist
+
+from .sub_agents.funny_nerd.agent import nerd_topics as corpus_nerd_topics
+
+FAST_PATH_ENABLED = os.getenv("MULTI_AGENT_FAST_PATH", "1") not in ("0", "false", "no")
+
+# Invocation id of the turn the router already decided on (temp: not persisted)
+ROUTED_INVOCATION_KEY = "temp:fast_path_routed"
+
+STOCK_PATTERNS = [
+    r"\bprices?\b", r"\bquotes?\b", r"\bstocks?\b", r"\bshares?\b",
+    r"\btrading at\b", r"\bticker\b", r"\bworth\b",
+]
+JOKE_PATTERNS = [r"\bjokes?\b", r"\bpuns?\b", r"\bmake me laugh\b", r"\bsomething funny\b"]
+NERD_PATTERNS = [r"\bnerdy?\b", r"\bgeeky?\b"]
+
+# Uppercase words that look like tickers but are ordinary words
+NOT_TICKERS = {"I", "A", "OK", "THE", "AND", "OR", "OF", "PLEASE", "WHAT", "IS", "ME", "MY", "US"}
+
+_TICKER = re.compile(r"\$([A-Za-z]{1,5})\b|\b([A-Z]{1,5})\b")
+_WORD = re.compile(r"[A-Za-z][A-Za-z.]*")
+
+
+def _compile(patterns: Iterable[str]) -> re.Pattern:
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+class FastPathRouter:
+    """Classifies a user message into a sub-agent name, or None to use the manager.
+
+    Args:
+        stock_patterns / joke_patterns / nerd_patterns: Regexes (case-insensitive)
+        nerd_topics: Topics that make a joke request a funny_nerd request
+            (default: the corpus's nerd topics, looked up on first use)
+        enabled: When False every request goes to the manager model
+    """
+
+    def __init__(
+        self,
+        stock_patterns: Optional[list] = None,
+        joke_patterns: Optional[list] = None,
+        nerd_patterns: Optional[list] = None,
+        nerd_topics: Optional[list] = None,
+        enabled: bool = FAST_PATH_ENABLED,
+    ):
+        self.stock_re = _compile(stock_patterns or STOCK_PATTERNS)
+        self.joke_re = _compile(joke_patterns or JOKE_PATTERNS)
+        self.nerd_re = _compile(nerd_patterns or NERD_PATTERNS)
+        self._nerd_topics = None if nerd_topics is None else {t.lower() for t in nerd_topics}
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "by_agent": {}}
+
+    @property
+    def nerd_topics(self) -> set:
+        if self._nerd_topics is None:
+            self._nerd_topics = {t.lower() for t in corpus_nerd_topics()}
+        return self._nerd_topics
+
+    def classify(self, text: str, watchlist=()) -> Optional[str]:
+        """Return the sub-agent for `text` if exactly one route matches confidently."""
+        if not text:
+            return None
+        words = {w.lower().rstrip(".") for w in _WORD.findall(text)}
+
+        tickers = {
+            (dollar or bare).upper()
+            for dollar, bare in _TICKER.findall(text)
+            if dollar or bare not in NOT_TICKERS
+        }
+        in_watchlist = any(w in watchlist for w in words)
+        is_stock = bool(self.stock_re.search(text)) and bool(tickers or in_watchlist)
+
+        is_joke = bool(self.joke_re.search(text))
+        is_nerd = is_joke and (bool(self.nerd_re.search(text)) or bool(words & self.nerd_topics))
+
+        if is_stock == is_joke:
+            # Neither, or both (e.g. "a joke about AAPL's price"): let the manager decide
+            return None
+        if is_stock:
+            return "stock_analyst"
+        return "funny_nerd" if is_nerd else "joke_agent"
+
+    def route(self, callback_context, llm_request) -> Optional[str]:
+        """Decide on the first model call of a turn; counts a hit or a miss once per turn."""
+        if not self.enabled:
+            return None
+        contents = llm_request.contents or []
+        if contents and any(part.function_response for part in contents[-1].parts or []):
+            # The agent is already working on this turn (e.g. after a tool call)
+            return None
+
+        invocation_id = callback_context.invocation_id
+        if callback_context.state.get(ROUTED_INVOCATION_KEY) == invocation_id:
+            return None
+        callback_context.state[ROUTED_INVOCATION_KEY] = invocation_id
+
+        content = callback_context.user_content
+        text = "".join(p.text for p in content.parts if p.text) if content and content.parts else ""
+        target = self.classify(text, stock_watchlist(callback_context))
+        if target == callback_context.agent_name:
+            # The session resumed at the right sub-agent already; let it work
+            return None
+
+        with self._lock:
+            if target:
+                self.counters["hits"] += 1
+                self.counters["by_agent"][target] = self.counters["by_agent"].get(target, 0) + 1
+            else:
+                self.counters["misses"] += 1
+        return target
+
+    def before_model_callback(self, callback_context, llm_request) -> Optional[LlmResponse]:
+        target = self.route(callback_context, llm_request)
+        if not target:
+            return None
+        print(f"--- Router: fast path to {target} ---")
+        return LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[types.Part(function_call=types.FunctionCall(
+                    name="transfer_to_agent", args={"agent_name": target}
+                ))],
+            )
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.counters["hits"] + self.counters["misses"]
+            return {
+                "hits": self.counters["hits"],
+                "misses": self.counters["misses"],
+                "hit_rate": round(self.counters["hits"] / total, 3) if total else 0.0,
+                "by_agent": dict(self.counters["by_agent"]),
+            }
+
+
+_router: Optional[FastPathRouter] = None
+
+
+def get_router() -> FastPathRouter:
+    global _router
+    if _router is None:
+        _router = FastPathRouter()
+    return _router
+
+
+def set_router(router: Optional[FastPathRouter]) -> None:
+    """Replace the shared router (e.g. with custom patterns); None resets it."""
+    global _router
+    _router = router
+
+
+def fast_path_callback(callback_context, llm_request) -> Optional[LlmResponse]:
+    """before_model_callback for the manager and its sub-agents, using the shared router."""
+    return get_router().before_model_callback(callback_context, llm_request)
+
+
+def install_fast_path(agent) -> None:
+    """Chain fast_path_callback after `agent`'s own before_model_callback, recursively."""
+    current = agent.before_model_callback
+    if current is not fast_path_callback and fast_path_callback not in getattr(current, "callbacks", ()):
+        agent.before_model_callback = chain_callbacks(current, fast_path_callback)
+    for sub_agent in agent.sub_agents:
+        install_fast_path(sub_agent)
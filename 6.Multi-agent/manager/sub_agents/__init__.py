@@ -1,3 +1,7 @@
-from .funny_nerd import agent
-from .joke_agent import agent
-from .stock_analyst import agent
+"""Sub-agents of the manager.
+
+Nothing is imported here: manager/agent.py imports the three agent modules
+to build the manager (ADK needs the sub-agent objects at construction), and
+tool modules such as stock_analyst.price_history can be imported on their
+own without loading every agent and its dependencies.
+"""
@@ -1,6 +1,6 @@
-from google.adk.agents import Agent
+from functools import lru_cache
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.tools.tool_context import ToolContext
-from datetime import datetime
 import sys
 from dotenv import load_dotenv
 import os 
@@ -12,63 +12,61 @@ model = LiteLlm(
 )
 
 
+# The shared joke corpus lives in 6.Multi-agent
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from joke_corpus import JokeCorpus, get_joke_corpus, tell_joke
+from tool_execution import ConcurrentToolsAgent
+
+NERD_TAG = "nerd"
+
+
+@lru_cache(maxsize=1)
+def _corpus_nerd_topics(corpus: JokeCorpus) -> tuple:
+    return tuple(corpus.topics(tag=NERD_TAG))
+
+
+def nerd_topics() -> tuple:
+    """Topics with nerdy jokes in the shared corpus (also used by the manager's fast-path router).
+
+    Looked up on first use, not at import: opening the corpus may scan the
+    whole joke file.
+    """
+    return _corpus_nerd_topics(get_joke_corpus())
+
+
 def get_nerd_joke(topic: str, tool_context: ToolContext) -> dict:
     """Get a nerdy joke about a specific topic."""
     print(f"--- Tool: get_nerd_joke called for topic: {topic} ---")
 
-    # Example jokes - in a real implementation, you might want to use an API
-    jokes = {
-        "python": "Why don't Python programmers like to use inheritance? Because they don't like to inherit anything!",
-        "javascript": "Why did the JavaScript developer go broke? Because he used up all his cache!",
-        "java": "Why do Java developers wear glasses? Because they can't C#!",
-        "programming": "Why do programmers prefer dark mode? Because light attracts bugs!",
-        "math": "Why was the equal sign so humble? Because he knew he wasn't less than or greater than anyone else!",
-        "physics": "Why did the photon check a hotel? Because it was travelling light!",
-        "chemistry": "Why did the acid go to the gym? To become a buffer solution!",
-        "biology": "Why did the cell go to therapy? Because it had too many issues!",
-        "default": "Why did the computer go to the doctor? Because it had a virus!",
-    }
-
-    joke = jokes.get(topic.lower(), jokes["default"])
+    # The topic, else jokes tagged with it (e.g. "science"), else any nerdy joke;
+    # never one the user has already heard until that pool is used up
+    joke = (
+        tell_joke(tool_context, topic=topic, tag=NERD_TAG)
+        or tell_joke(tool_context, tag=topic)
+        or tell_joke(tool_context, tag=NERD_TAG)
+    )
+    if joke is None:
+        return {"status": "error", "error_message": "No nerdy jokes available"}
 
     # Update state with the last joke topic and persist conversation
     state = tool_context.state
     state["last_joke_topic"] = topic
     # Track delegation implicitly (manager delegated to funny_nerd)
-    delegations = state.get("agent_delegations", [])
-    delegations.append({
-        "timestamp": datetime.now().isoformat(),
-        "agent_name": "funny_nerd",
-        "task": f"nerd_joke:{topic}",
-        "status": "delegated"
-    })
-    state["agent_delegations"] = delegations
-    history = state.get("conversation_history", [])
-    history.append({
-        "timestamp": datetime.now().isoformat(),
-        "agent_name": "funny_nerd",
-        "topic": topic,
-        "agent_response": joke
-    })
-    state["conversation_history"] = history
-    metadata = state.get("session_metadata", {})
-    metadata["last_activity"] = datetime.now().isoformat()
-    metadata["total_interactions"] = metadata.get("total_interactions", 0) + 1
-    state["session_metadata"] = metadata
-
-    return {"status": "success", "joke": joke, "topic": topic}
+    record_delegation(tool_context, "funny_nerd", f"nerd_joke:{topic}")
+    record_conversation(tool_context, agent_name="funny_nerd", topic=topic, agent_response=joke["text"])
+    record_interaction(tool_context)
+
+    return {"status": "success", "joke": joke["text"], "topic": joke["topic"]}
 
 
 # Bring in preference tool so this agent can store preferences when asked
 sys.path.append('/home/arvind/AI-agents-Dev/7.Multi-agent')
 from state_management_tools import add_joke_preference
+from conversation_log import record_conversation, record_delegation, record_interaction
 
-# Create the funny nerd agent
-funny_nerd = Agent(
-    name="funny_nerd",
-    model=model,
-    description="An agent that tells nerdy jokes about various topics.",
-    instruction="""
+def funny_nerd_instruction(context: ReadonlyContext) -> str:
+    """The agent's instruction, listing the corpus's nerd topics."""
+    return """
     You are a funny nerd agent that tells nerdy jokes about various topics.
     
     When asked to tell a joke:
@@ -77,15 +75,7 @@ funny_nerd = Agent(
     3. Format the response to include both the joke and a brief explanation if needed
     
     Available topics include:
-    - python
-    - javascript
-    - java
-    - programming
-    - math
-    - physics
-    - chemistry
-    - biology
-    
+""" + "".join(f"    - {topic}\n" for topic in nerd_topics()) + """    
     Example response format:
     "Here's a nerdy joke about <TOPIC>:
     <JOKE>
@@ -94,6 +84,14 @@ funny_nerd = Agent(
 
     If the user asks about anything else, 
     you should delegate the task to the manager agent.
-    """,
+    """
+
+
+# Create the funny nerd agent
+funny_nerd = ConcurrentToolsAgent(
+    name="funny_nerd",
+    model=model,
+    description="An agent that tells nerdy jokes about various topics.",
+    instruction=funny_nerd_instruction,
     tools=[get_nerd_joke, add_joke_preference],
 )
\ No newline at end of file
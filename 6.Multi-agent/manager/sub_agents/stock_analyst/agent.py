@@ -1,9 +1,13 @@
-from datetime import datetime
-
-import yfinance as yf
-from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
 
+import state_ops
+from conversation_log import record_delegation, record_interaction
+from preference_sets import stock_watchlist
+from tool_execution import ConcurrentToolsAgent, blocking_tool, tool_cancelled
+from .price_bars import analyze_closes, get_bar_cache, period_start
+from .price_history import get_price_history, parse_window
+from .price_service import get_price_service
+
 from dotenv import load_dotenv
 import os 
 from google.adk.models.lite_llm import LiteLlm
@@ -13,56 +17,49 @@ model = LiteLlm(
     api_key=os.getenv("OPENROUTER_API_KEY")
 )
 
+def _save_prices(tool_context: ToolContext, results: list, task: str) -> None:
+    """Record fetched prices: history store, plus watchlist and delegation log in state."""
+    record_delegation(tool_context, "stock_analyst", task)
+
+    history = get_price_history()
+    legacy = tool_context.state.get("price_history")
+    if legacy:
+        # Sessions from before the history store kept every price in state
+        history.append((r["ticker"], r["timestamp"], r.get("price")) for r in legacy if r.get("ticker"))
+        state_ops.set_value(tool_context, "price_history", [])
+    history.append((r["ticker"], r["timestamp"], r["price"]) for r in results)
+
+    stock_watchlist(tool_context).add_many(r["ticker"] for r in results)
+    record_interaction(tool_context)
+
+
+# Price fetches wait on the network: run them off the event loop, with a timeout
+@blocking_tool
 def get_stock_price(ticker: str, tool_context: ToolContext) -> dict:
     """Retrieves current stock price and saves to session state."""
     print(f"--- Tool: get_stock_price called for {ticker} ---")
 
     try:
-        # Fetch stock data
-        stock = yf.Ticker(ticker)
-        current_price = stock.info.get("currentPrice")
+        # Fetch through the cached price service
+        quote = get_price_service().get_quote(ticker)
 
-        if current_price is None:
+        if quote["price"] is None:
             return {
                 "status": "error",
                 "error_message": f"Could not fetch price for {ticker}",
             }
 
-        # Get current timestamp
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
         result = {
             "status": "success",
-            "ticker": ticker,
-            "price": current_price,
-            "timestamp": current_time,
+            "ticker": quote["ticker"],
+            "price": quote["price"],
+            "timestamp": quote["timestamp"],
         }
+        if tool_cancelled():
+            # Timed out while fetching; the model already got the timeout error
+            return result
 
-        # Persist to state: watchlist and history + delegation log
-        state = tool_context.state
-        delegations = state.get("agent_delegations", [])
-        delegations.append({
-            "timestamp": datetime.now().isoformat(),
-            "agent_name": "stock_analyst",
-            "task": f"get_stock_price:{ticker}",
-            "status": "delegated"
-        })
-        state["agent_delegations"] = delegations
-        preferences = state.get("user_preferences", {})
-        watchlist = preferences.get("stock_watchlist", [])
-        if ticker.upper() not in [t.upper() for t in watchlist]:
-            watchlist.append(ticker.upper())
-            preferences["stock_watchlist"] = watchlist
-            state["user_preferences"] = preferences
-
-        price_history = state.get("price_history", [])
-        price_history.append(result)
-        state["price_history"] = price_history
-
-        metadata = state.get("session_metadata", {})
-        metadata["last_activity"] = datetime.now().isoformat()
-        metadata["total_interactions"] = metadata.get("total_interactions", 0) + 1
-        state["session_metadata"] = metadata
+        _save_prices(tool_context, [result], f"get_stock_price:{quote['ticker']}")
 
         return result
 
@@ -73,8 +70,132 @@ def get_stock_price(ticker: str, tool_context: ToolContext) -> dict:
         }
 
 
+@blocking_tool
+def get_stock_prices(tickers: list[str], tool_context: ToolContext) -> dict:
+    """Retrieves current prices for several stocks in one batched call and saves them to session state.
+
+    Args:
+        tickers: Stock ticker symbols, e.g. ["AAPL", "MSFT", "GOOG"]
+        tool_context: Context for accessing and updating session state
+
+    Returns:
+        The prices that could be fetched and the tickers that failed
+    """
+    print(f"--- Tool: get_stock_prices called for {tickers} ---")
+
+    try:
+        quotes = get_price_service().get_quotes(tickers)
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Error fetching stock data: {str(e)}",
+        }
+
+    results = [
+        {"status": "success", "ticker": q["ticker"], "price": q["price"], "timestamp": q["timestamp"]}
+        for q in quotes.values()
+        if q["price"] is not None
+    ]
+    failed = [t for t, q in quotes.items() if q["price"] is None]
+
+    if not results:
+        return {
+            "status": "error",
+            "error_message": f"Could not fetch prices for {', '.join(failed) or 'any ticker'}",
+        }
+    if tool_cancelled():
+        return {"status": "success", "prices": results, "failed": failed}
+
+    _save_prices(tool_context, results, f"get_stock_prices:{','.join(r['ticker'] for r in results)}")
+
+    return {
+        "status": "success",
+        "prices": results,
+        "failed": failed,
+    }
+
+
+@blocking_tool
+def get_price_stats(ticker: str, window: str, tool_context: ToolContext) -> dict:
+    """Summarizes the recorded price history of a stock over a time window.
+
+    Args:
+        ticker: Stock ticker symbol, e.g. "AAPL"
+        window: How far back to look: "30m", "12h", "7d", "4w" or "all"
+        tool_context: Context for accessing and updating session state
+
+    Returns:
+        Observations, first/last/min/max/mean price, change, return and
+        volatility (std of returns between observations) in percent, and the
+        largest drawdown in percent
+    """
+    print(f"--- Tool: get_price_stats called for {ticker} over {window} ---")
+
+    try:
+        stats = get_price_history().stats(ticker, parse_window(window))
+    except ValueError as e:
+        return {"status": "error", "error_message": str(e)}
+
+    if stats is None:
+        return {
+            "status": "error",
+            "error_message": f"No recorded prices for {ticker.upper()} in window {window}; fetch the price first",
+        }
+
+    record_delegation(tool_context, "stock_analyst", f"get_price_stats:{ticker.upper()}:{window}")
+    record_interaction(tool_context)
+    return {"status": "success", "ticker": ticker.upper(), "window": window, **stats}
+
+
+# The first run downloads the whole period for every ticker
+@blocking_tool(timeout=60)
+def analyze_watchlist(period: str, tool_context: ToolContext) -> dict:
+    """Analyzes every stock on the user's watchlist over a period, from daily prices.
+
+    Args:
+        period: How far back to look: "1mo", "3mo", "6mo", "1y", "2y" or "ytd"
+        tool_context: Context for accessing and updating session state
+
+    Returns:
+        Per ticker: return, annualized volatility and maximum drawdown in
+        percent; the correlation matrix of daily returns; the same figures
+        for an equal-weight portfolio; and the best and worst performer
+    """
+    print(f"--- Tool: analyze_watchlist called for {period} ---")
+
+    tickers = stock_watchlist(tool_context).to_list()
+    if not tickers:
+        return {
+            "status": "error",
+            "error_message": "The watchlist is empty; add stocks with add_to_stock_watchlist first",
+        }
+
+    try:
+        start = period_start(period)
+        closes = get_bar_cache().closes(tickers, start)
+    except ValueError as e:
+        return {"status": "error", "error_message": str(e)}
+    except Exception as e:
+        return {
+            "status": "error",
+            "error_message": f"Error fetching price history: {str(e)}",
+        }
+
+    if closes.empty:
+        return {"status": "error", "error_message": f"No price history for {', '.join(tickers)}"}
+
+    record_delegation(tool_context, "stock_analyst", f"analyze_watchlist:{period}")
+    record_interaction(tool_context)
+    return {
+        "status": "success",
+        "period": period,
+        "missing": [t for t in tickers if t.upper() not in closes.columns],
+        **analyze_closes(closes),
+    }
+
+
 # Create the root agent
-stock_analyst = Agent(
+stock_analyst = ConcurrentToolsAgent(
     name="stock_analyst",
     model=model,
     description="An agent that can look up stock prices and track them over time.",
@@ -82,9 +203,16 @@ stock_analyst = Agent(
     You are a helpful stock market assistant that helps users track their stocks of interest.
     
     When asked about stock prices:
-    1. Use the get_stock_price tool to fetch the latest price for the requested stock(s)
+    1. Use the get_stock_price tool to fetch the latest price for a single stock.
+       For several stocks (or the user's whole watchlist) call get_stock_prices once
+       with all the tickers instead of calling get_stock_price repeatedly
     2. Format the response to show each stock's current price and the time it was fetched
     3. If a stock price couldn't be fetched, mention this in your response
+    4. For questions about how a stock has moved (range, average, returns, volatility)
+       use get_price_stats with a window such as "1d", "7d" or "all"; it covers the
+       prices fetched so far
+    5. To review the user's whole watchlist (performance, risk, how the stocks move
+       together) call analyze_watchlist once with a period such as "3mo" or "1y"
     
     Example response format:
     "Here are the current prices for your stocks:
@@ -92,5 +220,5 @@ stock_analyst = Agent(
     - TSLA: $156.78 (updated at 2024-04-21 16:30:00)
     - META: $123.45 (updated at 2024-04-21 16:30:00)"
     """,
-    tools=[get_stock_price],
+    tools=[get_stock_price, get_stock_prices, get_price_stats, analyze_watchlist],
 )
\ No newline at end of file
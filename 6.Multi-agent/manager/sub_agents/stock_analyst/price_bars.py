@@ -0,0 +1,281 @@
+import calendar
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, timedelta
+from typing import Optional
+
+# ===== Daily price bars for watchlist analytics =====
+# analyze_watchlist needs months of daily OHLC bars for every watchlist ticker.
+# DailyBarCache keeps them in a local SQLite file and asks its source only for
+# what is missing: tickers it has never seen (from the period start) and, once
+# a day, the tail since the last fetch, all tickers in one batched request.
+# Sources are swappable: YahooBarSource (one yf.download call) or
+# CsvBarSource, a local CSV fixture for offline runs (STOCK_BARS_CSV=path).
+# pandas (and yfinance) are imported on first use, not when the agent is loaded.
+
+BARS_DB_PATH = os.getenv("STOCK_BARS_DB", "./stock_bars_cache.db")
+TRADING_DAYS = 252
+
+FIELDS = ["open", "high", "low", "close", "volume"]
+
+_PERIOD = re.compile(r"^\s*(\d+)\s*(d|wk|mo|y)\s*$", re.IGNORECASE)
+
+
+def period_start(period: str, today: Optional[date] = None) -> date:
+    """First day of a yfinance-style period: "5d", "2wk", "6mo", "1y" or "ytd".
+
+    Raises:
+        ValueError: The period is not in that form
+    """
+    today = today or date.today()
+    if period.strip().lower() == "ytd":
+        return date(today.year, 1, 1)
+    match = _PERIOD.match(period)
+    if not match:
+        raise ValueError(f"Invalid period {period!r}; use e.g. '1mo', '3mo', '6mo', '1y', '2y' or 'ytd'")
+    count, unit = int(match.group(1)), match.group(2).lower()
+    if unit == "d":
+        return today - timedelta(days=count)
+    if unit == "wk":
+        return today - timedelta(weeks=count)
+    months = count * (12 if unit == "y" else 1)
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    # Clamp the day (e.g. 31 March minus one month is 28/29 February)
+    return date(year, month + 1, min(today.day, calendar.monthrange(year, month + 1)[1]))
+
+
+class YahooBarSource:
+    """Daily bars from Yahoo Finance, all tickers in one yf.download call."""
+
+    def __init__(self):
+        self.fetch_count = 0
+
+    def fetch(self, tickers: list, start: date, end: date) -> dict:
+        """{ticker: DataFrame of FIELDS indexed by date} for [start, end); missing tickers are left out."""
+        import pandas as pd
+        import yfinance as yf
+
+        self.fetch_count += 1
+        data = yf.download(
+            tickers, start=start.isoformat(), end=end.isoformat(), interval="1d",
+            group_by="ticker", auto_adjust=True, progress=False, threads=True,
+        )
+        if data is None or data.empty:
+            return {}
+        frames = {}
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                frame = data[ticker]
+            else:
+                frame = data
+            frame = frame.rename(columns=str.lower).reindex(columns=FIELDS).dropna(subset=["close"])
+            if len(frame):
+                frames[ticker] = frame
+        return frames
+
+
+class CsvBarSource:
+    """Daily bars from a local CSV file with columns date,ticker,open,high,low,close,volume.
+
+    Args:
+        path: The CSV file (read once, on the first fetch)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fetch_count = 0
+        self._data = None
+
+    def fetch(self, tickers: list, start: date, end: date) -> dict:
+        import pandas as pd
+
+        self.fetch_count += 1
+        if self._data is None:
+            data = pd.read_csv(self.path, parse_dates=["date"])
+            data["ticker"] = data["ticker"].str.upper()
+            self._data = data.set_index("date").sort_index()
+        rows = self._data.loc[pd.Timestamp(start):pd.Timestamp(end) - pd.Timedelta(days=1)]
+        rows = rows[rows["ticker"].isin(tickers)]
+        return {
+            ticker: frame.reindex(columns=FIELDS)
+            for ticker, frame in rows.groupby("ticker")
+        }
+
+
+class DailyBarCache:
+    """Local SQLite cache of daily bars in front of a bar source.
+
+    Args:
+        db_path: SQLite file for the cached bars
+        source: YahooBarSource (default) or CsvBarSource
+        today: Returns the current date (for tests and fixtures)
+    """
+
+    def __init__(self, db_path: str = BARS_DB_PATH, source=None, today=date.today):
+        self.db_path = db_path
+        self.source = source or YahooBarSource()
+        self._today = today
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "fetches": 0, "tickers_fetched": 0, "bars_written": 0}
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS daily_bars (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (ticker, date)
+            );
+            -- The date range fetched for each ticker (bars or not: weekends, holidays)
+            CREATE TABLE IF NOT EXISTS bar_coverage (
+                ticker TEXT PRIMARY KEY,
+                start TEXT NOT NULL,
+                end TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def closes(self, tickers: list, start: date):
+        """DataFrame of daily closes (dates x tickers) from `start`, fetching what is missing first."""
+        import pandas as pd
+
+        tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        self.refresh(tickers, start)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, ticker, close FROM daily_bars WHERE date >= ? "
+                f"AND ticker IN ({','.join('?' * len(tickers))})",
+                [start.isoformat(), *tickers],
+            ).fetchall()
+        frame = pd.DataFrame(rows, columns=["date", "ticker", "close"])
+        closes = frame.pivot(index="date", columns="ticker", values="close")
+        closes.index = pd.to_datetime(closes.index)
+        return closes.sort_index().reindex(columns=[t for t in tickers if t in closes.columns])
+
+    def refresh(self, tickers: list, start: date) -> list:
+        """Fetch the missing bars of `tickers` since `start` in one request; returns the tickers fetched."""
+        today = self._today()
+        with self._lock:
+            self.stats["requests"] += 1
+            coverage = {
+                t: (date.fromisoformat(s), date.fromisoformat(e))
+                for t, s, e in self._conn.execute("SELECT ticker, start, end FROM bar_coverage")
+            }
+            need = {}
+            for ticker in tickers:
+                covered = coverage.get(ticker)
+                if covered is None or covered[0] > start:
+                    need[ticker] = start
+                elif covered[1] < today:
+                    # From the last fetched day on: its bar may have been taken mid-session
+                    need[ticker] = covered[1]
+            if not need:
+                return []
+
+            fetch_start = min(need.values())
+            frames = self.source.fetch(list(need), fetch_start, today + timedelta(days=1))
+            rows = [
+                (ticker, day.date().isoformat(), *(None if v != v else float(v) for v in values))
+                for ticker, frame in frames.items()
+                for day, values in zip(frame.index, frame[FIELDS].itertuples(index=False, name=None))
+            ]
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO daily_bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO bar_coverage VALUES (?, ?, ?)",
+                    [
+                        (t, min(fetch_start, coverage[t][0]) if t in coverage else fetch_start, today)
+                        for t in need
+                    ],
+                )
+            self.stats["fetches"] += 1
+            self.stats["tickers_fetched"] += len(need)
+            self.stats["bars_written"] += len(rows)
+        return list(need)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _number(value, digits: int = 4):
+    """JSON-friendly float (None for NaN)."""
+    value = float(value)
+    return None if value != value else round(value, digits)
+
+
+def analyze_closes(closes) -> dict:
+    """Returns, volatility, drawdown and correlation of daily closes (dates x tickers).
+
+    The portfolio figures are for an equal-weight portfolio rebalanced daily.
+    """
+    import numpy as np
+
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    first, last = closes.bfill().iloc[0], closes.ffill().iloc[-1]
+    total_return = last / first - 1
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    drawdown = (closes / closes.cummax() - 1).min()
+
+    portfolio = returns.mean(axis=1, skipna=True)
+    growth = (1 + portfolio).cumprod()
+    portfolio_drawdown = (growth / growth.cummax() - 1).min() if len(growth) else float("nan")
+
+    per_ticker = {
+        ticker: {
+            "first_close": _number(first[ticker]),
+            "last_close": _number(last[ticker]),
+            "return_pct": _number(total_return[ticker] * 100, 2),
+            "volatility_pct": _number(volatility[ticker] * 100, 2),
+            "max_drawdown_pct": _number(drawdown[ticker] * 100, 2),
+        }
+        for ticker in closes.columns
+    }
+    correlation = returns.corr()
+    ranked = total_return.dropna().sort_values()
+    return {
+        "start": closes.index[0].strftime("%Y-%m-%d"),
+        "end": closes.index[-1].strftime("%Y-%m-%d"),
+        "trading_days": int(len(closes)),
+        "tickers": per_ticker,
+        "correlation": {
+            row: {col: _number(correlation.at[row, col], 3) for col in correlation.columns}
+            for row in correlation.index
+        },
+        "portfolio": {
+            "return_pct": _number((growth.iloc[-1] - 1) * 100 if len(growth) else 0.0, 2),
+            "volatility_pct": _number(portfolio.std() * np.sqrt(TRADING_DAYS) * 100, 2),
+            "max_drawdown_pct": _number(portfolio_drawdown * 100, 2),
+        },
+        "best": ranked.index[-1] if len(ranked) else None,
+        "worst": ranked.index[0] if len(ranked) else None,
+    }
+
+
+_cache: Optional[DailyBarCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_bar_cache() -> DailyBarCache:
+    """Return the process-wide bar cache, creating it on first use.
+
+    Set STOCK_BARS_CSV to a CSV fixture to use CsvBarSource instead of Yahoo.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                csv_path = os.getenv("STOCK_BARS_CSV")
+                _cache = DailyBarCache(source=CsvBarSource(csv_path) if csv_path else None)
+    return _cache
+
+
+def set_bar_cache(cache: Optional[DailyBarCache]) -> None:
+    """Replace the process-wide bar cache (e.g. with one backed by CsvBarSource)."""
+    global _cache
+    _cache = cache
@@ -0,0 +1,277 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+# ===== Columnar price history for the stock_analyst tools =====
+# Every fetched price used to be appended to state["price_history"], a list
+# that grew without bound and was rewritten with the session state. Prices
+# now go to their own SQLite tables instead:
+# - price_tail: one small row per new observation (a cheap append)
+# - price_series: per ticker, the timestamps and prices as two float64 arrays
+#   stored as blobs; once a ticker has `compact_at` tail rows they are folded
+#   into its arrays in one transaction
+# When folding, points older than `raw_seconds` are downsampled to one point
+# (the mean) per `bucket_seconds`, so months of samples stay small.
+# numpy is imported on first use, not when the agent is loaded.
+
+HISTORY_DB_PATH = os.getenv("STOCK_PRICE_HISTORY_DB", "./multi_agent_data.db")
+RAW_SECONDS = float(os.getenv("STOCK_PRICE_HISTORY_RAW_DAYS", "7")) * 86400
+BUCKET_SECONDS = float(os.getenv("STOCK_PRICE_HISTORY_BUCKET_MINUTES", "60")) * 60
+
+_WINDOW = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([mhdw])\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_window(window: Optional[str]) -> Optional[float]:
+    """Seconds in a window like "30m", "12h", "7d" or "4w"; None for "all" (or empty).
+
+    Raises:
+        ValueError: The window is not in that form
+    """
+    if not window or window.strip().lower() == "all":
+        return None
+    match = _WINDOW.match(window)
+    if not match:
+        raise ValueError(f"Invalid window {window!r}; use e.g. '30m', '12h', '7d', '4w' or 'all'")
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2).lower()]
+
+
+def parse_timestamp(value) -> float:
+    """Epoch seconds for a quote timestamp ("%Y-%m-%d %H:%M:%S" string or a number)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def downsample(ts, prices, before: float, bucket_seconds: float) -> tuple:
+    """Replace the points older than `before` with one mean point per bucket."""
+    import numpy as np
+
+    old = ts < before
+    if not old.any():
+        return ts, prices
+    buckets, inverse = np.unique(np.floor(ts[old] / bucket_seconds), return_inverse=True)
+    sizes = np.bincount(inverse, minlength=len(buckets))
+    old_ts = np.bincount(inverse, weights=ts[old], minlength=len(buckets)) / sizes
+    old_prices = np.bincount(inverse, weights=prices[old], minlength=len(buckets)) / sizes
+    return np.concatenate([old_ts, ts[~old]]), np.concatenate([old_prices, prices[~old]])
+
+
+def compute_stats(ts, prices) -> Optional[dict]:
+    """Summary statistics of one price series (None when it is empty).
+
+    volatility is the standard deviation of the log returns between
+    consecutive observations, in percent.
+    """
+    import numpy as np
+
+    valid = prices > 0
+    ts, prices = ts[valid], prices[valid]
+    if not len(prices):
+        return None
+    log_returns = np.diff(np.log(prices))
+    drawdown = prices / np.maximum.accumulate(prices) - 1
+    return {
+        "observations": int(len(prices)),
+        "start": datetime.fromtimestamp(ts[0]).strftime("%Y-%m-%d %H:%M:%S"),
+        "end": datetime.fromtimestamp(ts[-1]).strftime("%Y-%m-%d %H:%M:%S"),
+        "first": round(float(prices[0]), 4),
+        "last": round(float(prices[-1]), 4),
+        "min": round(float(prices.min()), 4),
+        "max": round(float(prices.max()), 4),
+        "mean": round(float(prices.mean()), 4),
+        "change": round(float(prices[-1] - prices[0]), 4),
+        "return_pct": round(float(prices[-1] / prices[0] - 1) * 100, 4),
+        "volatility_pct": round(float(log_returns.std(ddof=1)) * 100, 4) if len(log_returns) > 1 else 0.0,
+        "max_drawdown_pct": round(float(drawdown.min()) * 100, 4),
+    }
+
+
+class PriceHistoryStore:
+    """Per-ticker price series in SQLite: appended as rows, kept as float64 array blobs.
+
+    Args:
+        db_path: SQLite file (shared with the session database by default)
+        raw_seconds: Points younger than this keep full resolution
+        bucket_seconds: Older points are averaged per bucket of this size
+        compact_at: Tail rows of a ticker before they are folded into its arrays
+    """
+
+    def __init__(
+        self,
+        db_path: str = HISTORY_DB_PATH,
+        raw_seconds: float = RAW_SECONDS,
+        bucket_seconds: float = BUCKET_SECONDS,
+        compact_at: int = 256,
+        clock=time.time,
+    ):
+        self.db_path = db_path
+        self.raw_seconds = raw_seconds
+        self.bucket_seconds = bucket_seconds
+        self.compact_at = compact_at
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tail_counts = {}  # ticker -> rows in price_tail
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS price_series (
+                ticker TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                ts BLOB NOT NULL,
+                price BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS price_tail (
+                ticker TEXT NOT NULL,
+                ts REAL NOT NULL,
+                price REAL NOT NULL,
+                PRIMARY KEY (ticker, ts)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def append(self, observations: Iterable[tuple]) -> None:
+        """Record (ticker, timestamp, price) observations; a repeated timestamp replaces the price."""
+        # A repeated (ticker, timestamp) in the batch: the last price wins, as with REPLACE
+        rows = list({
+            (t.upper(), parse_timestamp(ts)): (t.upper(), parse_timestamp(ts), float(p))
+            for t, ts, p in observations if p is not None
+        }.values())
+        if not rows:
+            return
+        stamps = {}
+        for ticker, ts, _ in rows:
+            stamps.setdefault(ticker, []).append(ts)
+        with self._lock:
+            # Rows that only replace a tail row do not grow the tail
+            added = {ticker: len(ts) - self._tail_existing(ticker, ts) for ticker, ts in stamps.items()}
+            self._conn.executemany("INSERT OR REPLACE INTO price_tail VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+            for ticker, count in added.items():
+                if self._tail_count(ticker, count) >= self.compact_at:
+                    self._compact(ticker)
+
+    def series(self, ticker: str, since: Optional[float] = None) -> tuple:
+        """(timestamps, prices) of `ticker` as float64 arrays in time order, from `since` on."""
+        import numpy as np
+
+        ticker = ticker.upper()
+        with self._lock:
+            ts, prices = self._load(ticker)
+            tail = self._conn.execute(
+                "SELECT ts, price FROM price_tail WHERE ticker = ? ORDER BY ts", (ticker,)
+            ).fetchall()
+        if tail:
+            tail = np.array(tail, dtype=np.float64)
+            ts, prices = self._merge(ts, prices, tail[:, 0], tail[:, 1])
+        if since is not None:
+            start = int(np.searchsorted(ts, since))
+            ts, prices = ts[start:], prices[start:]
+        return ts, prices
+
+    def stats(self, ticker: str, window_seconds: Optional[float] = None) -> Optional[dict]:
+        """compute_stats over the last `window_seconds` (everything if None)."""
+        since = self._clock() - window_seconds if window_seconds else None
+        return compute_stats(*self.series(ticker, since))
+
+    def compact(self, ticker: Optional[str] = None) -> None:
+        """Fold the tail rows of `ticker` (or of every ticker) into the arrays now."""
+        with self._lock:
+            if ticker is None:
+                tickers = [r[0] for r in self._conn.execute("SELECT DISTINCT ticker FROM price_tail")]
+            else:
+                tickers = [ticker.upper()]
+            for name in tickers:
+                self._compact(name)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ===== Internals (called with the lock held) =====
+
+    def _tail_existing(self, ticker: str, stamps: list) -> int:
+        """How many of `stamps` already have a tail row for `ticker`."""
+        existing = 0
+        for i in range(0, len(stamps), 500):
+            chunk = stamps[i:i + 500]
+            existing += self._conn.execute(
+                f"SELECT COUNT(*) FROM price_tail WHERE ticker = ? AND ts IN ({','.join('?' * len(chunk))})",
+                (ticker, *chunk),
+            ).fetchone()[0]
+        return existing
+
+    def _tail_count(self, ticker: str, added: int) -> int:
+        """Tail rows of `ticker` after `added` new ones were inserted."""
+        if ticker in self._tail_counts:
+            self._tail_counts[ticker] += added
+        else:
+            self._tail_counts[ticker] = self._conn.execute(
+                "SELECT COUNT(*) FROM price_tail WHERE ticker = ?", (ticker,)
+            ).fetchone()[0]
+        return self._tail_counts[ticker]
+
+    def _load(self, ticker: str) -> tuple:
+        import numpy as np
+
+        row = self._conn.execute("SELECT ts, price FROM price_series WHERE ticker = ?", (ticker,)).fetchone()
+        if row is None:
+            return np.empty(0), np.empty(0)
+        return np.frombuffer(row[0], dtype=np.float64), np.frombuffer(row[1], dtype=np.float64)
+
+    @staticmethod
+    def _merge(ts, prices, new_ts, new_prices) -> tuple:
+        """Both series in time order; for equal timestamps the new price wins."""
+        import numpy as np
+
+        all_ts = np.concatenate([new_ts, ts])
+        all_prices = np.concatenate([new_prices, prices])
+        # np.unique keeps the first occurrence, i.e. the new point
+        unique_ts, first = np.unique(all_ts, return_index=True)
+        return unique_ts, all_prices[first]
+
+    def _compact(self, ticker: str) -> None:
+        import numpy as np
+
+        ts, prices = self._load(ticker)
+        tail = self._conn.execute(
+            "SELECT rowid, ts, price FROM price_tail WHERE ticker = ?", (ticker,)
+        ).fetchall()
+        if tail:
+            tail = np.array(tail, dtype=np.float64)
+            ts, prices = self._merge(ts, prices, tail[:, 1], tail[:, 2])
+        ts, prices = downsample(ts, prices, self._clock() - self.raw_seconds, self.bucket_seconds)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO price_series VALUES (?, ?, ?, ?)",
+                (ticker, len(ts), ts.astype(np.float64).tobytes(), prices.astype(np.float64).tobytes()),
+            )
+            # Only the rows folded in: another process may have appended since
+            last_rowid = int(tail[:, 0].max()) if len(tail) else 0
+            self._conn.execute("DELETE FROM price_tail WHERE ticker = ? AND rowid <= ?", (ticker, last_rowid))
+        self._tail_counts[ticker] = 0
+
+
+_store: Optional[PriceHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_history() -> PriceHistoryStore:
+    """Return the process-wide price history store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PriceHistoryStore()
+    return _store
+
+
+def set_price_history(store: Optional[PriceHistoryStore]) -> None:
+    """Replace the process-wide price history store (e.g. with one on a temporary file)."""
+    global _store
+    _store = store
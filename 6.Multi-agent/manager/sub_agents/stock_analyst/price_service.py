@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Optional
+
+# ===== Price service for the stock_analyst tools =====
+# Wraps a pluggable price source with:
+# - a per-ticker TTL cache
+# - single-flight de-duplication (concurrent requests for a ticker share one fetch)
+# - batched fetches, so a whole watchlist costs one round-trip
+
+DEFAULT_TTL_SECONDS = float(os.getenv("STOCK_PRICE_TTL", "60"))
+
+
+class YahooPriceSource:
+    """Fetches prices from Yahoo Finance.
+
+    Uses `fast_info` for a single ticker and one `yf.download` call for a batch,
+    instead of the slow `.info` endpoint. yfinance (and pandas with it) is
+    imported on the first fetch, not when the agent is loaded.
+    """
+
+    def fetch(self, tickers: list) -> dict:
+        import yfinance as yf
+
+        if len(tickers) == 1:
+            ticker = tickers[0]
+            return {ticker: yf.Ticker(ticker).fast_info.get("lastPrice")}
+
+        data = yf.download(
+            tickers, period="5d", interval="1d", progress=False, auto_adjust=False
+        )
+        closes = data["Close"].ffill()
+        prices = {}
+        for ticker in tickers:
+            if ticker in closes.columns and len(closes[ticker].dropna()):
+                prices[ticker] = float(closes[ticker].dropna().iloc[-1])
+            else:
+                prices[ticker] = None
+        return prices
+
+
+class FakePriceSource:
+    """Local, deterministic price feed for tests and benchmarks.
+
+    Args:
+        prices: Fixed prices by ticker. Unknown tickers get a stable pseudo price.
+        latency: Seconds to sleep per fetch, to mimic a network round-trip
+    """
+
+    def __init__(self, prices: Optional[dict] = None, latency: float = 0.0):
+        self.prices = {k.upper(): v for k, v in (prices or {}).items()}
+        self.latency = latency
+        self.fetch_count = 0
+        self.tickers_fetched = 0
+
+    def fetch(self, tickers: list) -> dict:
+        self.fetch_count += 1
+        self.tickers_fetched += len(tickers)
+        if self.latency:
+            time.sleep(self.latency)
+        return {
+            t: self.prices.get(t, round(50 + zlib.crc32(t.encode()) % 45000 / 100, 2))
+            for t in tickers
+        }
+
+
+class PriceService:
+    """TTL-cached, single-flight, batching front end for a price source."""
+
+    def __init__(self, source=None, ttl: float = DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.source = source or YahooPriceSource()
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._cache = {}  # ticker -> (price, fetched_at, timestamp)
+        self._in_flight = {}  # ticker -> Future shared by concurrent callers
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "batches": 0}
+
+    def get_quote(self, ticker: str) -> dict:
+        """Return {"ticker", "price", "timestamp", "cached"} for one ticker."""
+        return self.get_quotes([ticker])[ticker.upper()]
+
+    def get_quotes(self, tickers: list) -> dict:
+        """Return quotes for many tickers, fetching all cache misses in one batch.
+
+        Args:
+            tickers: Ticker symbols (case-insensitive, duplicates ignored)
+
+        Returns:
+            A dict of upper-cased ticker -> quote dict. `price` is None when the
+            source had no price for the ticker.
+        """
+        wanted = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+        quotes = {}
+        to_fetch = []
+        waiting = {}
+
+        with self._lock:
+            now = self._clock()
+            for ticker in wanted:
+                cached = self._cache.get(ticker)
+                if cached and now - cached[1] < self.ttl:
+                    self.stats["hits"] += 1
+                    quotes[ticker] = self._quote(ticker, cached, cached=True)
+                elif ticker in self._in_flight:
+                    self.stats["coalesced"] += 1
+                    waiting[ticker] = self._in_flight[ticker]
+                else:
+                    self.stats["misses"] += 1
+                    future = Future()
+                    self._in_flight[ticker] = future
+                    waiting[ticker] = future
+                    to_fetch.append(ticker)
+            if to_fetch:
+                self.stats["batches"] += 1
+
+        if to_fetch:
+            self._fetch_batch(to_fetch)
+
+        for ticker, future in waiting.items():
+            quotes[ticker] = self._quote(ticker, future.result(), cached=ticker not in to_fetch)
+
+        return {t: quotes[t] for t in wanted}
+
+    def invalidate(self, ticker: Optional[str] = None) -> None:
+        """Drop one ticker (or everything) from the cache."""
+        with self._lock:
+            if ticker is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(ticker.upper(), None)
+
+    def _fetch_batch(self, tickers: list) -> None:
+        try:
+            prices = self.source.fetch(tickers)
+        except Exception as e:
+            with self._lock:
+                futures = [self._in_flight.pop(t) for t in tickers]
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        fetched_at = self._clock()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            entries = {}
+            for ticker in tickers:
+                entry = (prices.get(ticker), fetched_at, timestamp)
+                if entry[0] is not None:
+                    self._cache[ticker] = entry
+                entries[ticker] = entry
+            futures = {t: self._in_flight.pop(t) for t in tickers}
+        for ticker, future in futures.items():
+            future.set_result(entries[ticker])
+
+    @staticmethod
+    def _quote(ticker: str, entry: tuple, cached: bool) -> dict:
+        price, _, timestamp = entry
+        return {"ticker": ticker, "price": price, "timestamp": timestamp, "cached": cached}
+
+
+_service: Optional[PriceService] = None
+_service_lock = threading.Lock()
+
+
+def get_price_service() -> PriceService:
+    """Return the process-wide price service, creating it on first use.
+
+    Set STOCK_PRICE_SOURCE=fake to use the offline FakePriceSource.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                source = FakePriceSource() if os.getenv("STOCK_PRICE_SOURCE") == "fake" else None
+                _service = PriceService(source)
+    return _service
+
+
+def set_price_service(service: Optional[PriceService]) -> None:
+    """Replace the process-wide price service (e.g. with one backed by FakePriceSource)."""
+    global _service
+    _service = service
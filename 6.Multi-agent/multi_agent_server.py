@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Concurrent multi-session front end for the persistent multi-agent system.
+
+Serves a small JSON API over HTTP (TCP or a Unix socket) on asyncio, sharing
+one Runner and one session service between all users and sessions:
+
+    POST /sessions  {"user_id": "alice"}                          -> {"session_id": ...}
+    POST /chat      {"user_id": "alice", "session_id": "...",
+                     "message": "price of AAPL"}                  -> {"response": ..., ...}
+    GET  /stats     request counters, latency percentiles, fast-path router hits,
+                    prompt tokens before/after history trimming, session cache hits,
+                    group commit batch sizes, concurrent tool calls and timeouts,
+                    event-loop lag
+    GET  /health
+
+Turns of the same session are serialized with a per-session lock so they stay
+ordered; turns of different sessions run concurrently up to --max-concurrency.
+If /chat is called without a session_id the user's most recent session is
+resumed (or a new one created).
+
+    python multi_agent_server.py --port 8080
+    python multi_agent_server.py --unix /tmp/multi_agent.sock
+"""
+import argparse
+import asyncio
+import copy
+import json
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+from google.genai import types
+
+from loop_lag import LoopLagMonitor
+
+APP_NAME = "Multi-Agent System"
+MAX_BODY_BYTES = 1024 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MultiAgentServer:
+    """Multiplexes many users/sessions over one shared Runner.
+
+    Args:
+        runner: The Runner shared by all requests
+        initial_state: State for newly created sessions (copied per session)
+        max_concurrency: Maximum number of turns processed at the same time
+    """
+
+    def __init__(self, runner, initial_state=None, max_concurrency: int = 8):
+        self.runner = runner
+        self.session_service = runner.session_service
+        self.app_name = runner.app_name
+        self.initial_state = initial_state or {}
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Session creation also creates the app/user state rows, which races
+        # between concurrent first requests; creations are rare, so serialize them
+        self._create_lock = asyncio.Lock()
+        self._session_locks = {}  # (user_id, session_id) -> [lock, users]
+        self._latencies = deque(maxlen=10000)
+        self.stats = {"requests": 0, "turns": 0, "errors": 0, "in_flight": 0, "queued": 0}
+        # Anything blocking the loop (a sync tool, session I/O) delays every session
+        self.loop_lag = LoopLagMonitor()
+
+    # ===== Sessions and turns =====
+
+    def create_session(self, user_id: str) -> str:
+        state = copy.deepcopy(self.initial_state)
+        metadata = state.get("session_metadata")
+        if isinstance(metadata, dict):
+            metadata["created_at"] = metadata["last_activity"] = datetime.now().isoformat()
+        session = self.session_service.create_session(
+            app_name=self.app_name, user_id=user_id, state=state
+        )
+        return session.id
+
+    def resume_or_create_session(self, user_id: str) -> str:
+        if hasattr(self.session_service, "get_latest_session"):
+            # One indexed lookup instead of listing every session of the user
+            latest = self.session_service.get_latest_session(app_name=self.app_name, user_id=user_id)
+            return latest.id if latest else self.create_session(user_id)
+        existing = self.session_service.list_sessions(app_name=self.app_name, user_id=user_id)
+        if existing and existing.sessions:
+            latest = max(existing.sessions, key=lambda s: s.last_update_time)
+            return latest.id
+        return self.create_session(user_id)
+
+    async def run_turn(self, user_id: str, session_id: str, message: str) -> dict:
+        """Run one turn, ordered within the session and bounded across sessions."""
+        key = (user_id, session_id)
+        entry = self._session_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        started = time.perf_counter()
+        try:
+            async with entry[0]:
+                self.stats["queued"] += 1
+                async with self._semaphore:
+                    self.stats["queued"] -= 1
+                    self.stats["in_flight"] += 1
+                    try:
+                        response = await self._run_agent(user_id, session_id, message)
+                    finally:
+                        self.stats["in_flight"] -= 1
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._session_locks.pop(key, None)
+
+        latency = time.perf_counter() - started
+        self._latencies.append(latency)
+        self.stats["turns"] += 1
+        return {
+            "user_id": user_id,
+            "session_id": session_id,
+            "response": response,
+            "latency_ms": round(latency * 1000, 2),
+        }
+
+    async def _run_agent(self, user_id: str, session_id: str, message: str):
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        final_response = None
+        async for event in self.runner.run_async(
+            user_id=user_id, session_id=session_id, new_message=content
+        ):
+            if event.is_final_response() and event.content and event.content.parts:
+                text = event.content.parts[0].text
+                if text:
+                    final_response = text.strip()
+        return final_response
+
+    def latency_stats(self) -> dict:
+        ordered = sorted(self._latencies)
+        if not ordered:
+            return {"count": 0}
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+        return {"count": len(ordered), "p50_ms": pct(50), "p90_ms": pct(90), "p99_ms": pct(99)}
+
+    @staticmethod
+    def fast_path_stats():
+        """Hit/miss counters of the manager's fast-path router (None if not loaded)."""
+        router = sys.modules.get("manager.router")
+        return router.get_router().stats() if router else None
+
+    @staticmethod
+    def context_stats():
+        """Prompt size before/after the history policy (None if not loaded)."""
+        context_window = sys.modules.get("agent_common.context_window")
+        return context_window.get_history_policy().stats() if context_window else None
+
+    @staticmethod
+    def tool_stats():
+        """Counters of the concurrent tool executor (None if not loaded)."""
+        tool_execution = sys.modules.get("tool_execution")
+        return tool_execution.get_tool_executor().stats() if tool_execution else None
+
+    def group_commit_stats(self):
+        """Batch counters of the group-commit writer (None if group commit is off)."""
+        committer = getattr(self.session_service, "group_committer", None)
+        return committer.stats() if committer else None
+
+    # ===== HTTP handling =====
+
+    async def dispatch(self, method: str, path: str, body: dict) -> dict:
+        if path == "/health":
+            return {"status": "ok"}
+        if path == "/stats":
+            return {
+                **self.stats,
+                "max_concurrency": self.max_concurrency,
+                "active_sessions": len(self._session_locks),
+                "latency": self.latency_stats(),
+                "fast_path": self.fast_path_stats(),
+                "context": self.context_stats(),
+                "session_cache": self.session_service.stats() if hasattr(self.session_service, "stats") else None,
+                "group_commit": self.group_commit_stats(),
+                "tools": self.tool_stats(),
+                "event_loop_lag": self.loop_lag.stats(),
+            }
+        if method != "POST":
+            raise HttpError(405, f"{method} not allowed on {path}")
+
+        user_id = body.get("user_id")
+        if not user_id or not isinstance(user_id, str):
+            raise HttpError(400, "user_id is required")
+
+        if path == "/sessions":
+            async with self._create_lock:
+                session_id = await asyncio.to_thread(self.create_session, user_id)
+            return {"user_id": user_id, "session_id": session_id}
+
+        if path == "/chat":
+            message = body.get("message")
+            if not message or not isinstance(message, str):
+                raise HttpError(400, "message is required")
+            session_id = body.get("session_id")
+            if not session_id:
+                async with self._create_lock:
+                    session_id = await asyncio.to_thread(self.resume_or_create_session, user_id)
+            try:
+                return await self.run_turn(user_id, session_id, message)
+            except ValueError as e:
+                if "Session not found" in str(e):
+                    raise HttpError(404, str(e))
+                raise
+
+        raise HttpError(404, f"Unknown path {path}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._write(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+
+                self.stats["requests"] += 1
+                try:
+                    length = int(headers.get("content-length", "0"))
+                    if length > MAX_BODY_BYTES:
+                        raise HttpError(413, "Request body too large")
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw) if raw else {}
+                    except json.JSONDecodeError:
+                        raise HttpError(400, "Body must be JSON")
+                    if not isinstance(body, dict):
+                        raise HttpError(400, "Body must be a JSON object")
+                    status, payload = 200, await self.dispatch(method.upper(), path.split("?", 1)[0], body)
+                except HttpError as e:
+                    self.stats["errors"] += 1
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write(writer, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, unix_path: str = None):
+        """Start listening and return the asyncio server."""
+        self.loop_lag.start()
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        return await asyncio.start_server(self.handle_connection, host=host, port=port)
+
+
+async def serve(host: str, port: int, unix_path: str, max_concurrency: int):
+    from persistent_multi_agent import initial_state, root_agent, session_service
+    from storage import AsyncRunner
+
+    # Session I/O runs on the service's I/O thread, not on this event loop
+    runner = AsyncRunner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+    server = MultiAgentServer(runner, initial_state=initial_state, max_concurrency=max_concurrency)
+    listener = await server.start(host, port, unix_path)
+    where = unix_path or f"http://{host}:{port}"
+    print(f"🤖 Multi-agent server listening on {where} (max concurrency {max_concurrency})")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the multi-agent system over a JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", dest="unix_path", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Turns processed at the same time")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix_path, args.max_concurrency))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,69 @@
 import asyncio
+import importlib
+import os
+import sys
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 from dotenv import load_dotenv
-from google.adk.runners import Runner
-from google.adk.sessions import DatabaseSessionService
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
-# Import the multi-agent manager
-from manager.agent import root_agent
- 
-class Colors:
-    RESET = "\033[0m"
-    BOLD = "\033[1m"
-    UNDERLINE = "\033[4m"
-
-    # Foreground colors
-    BLACK = "\033[30m"
-    RED = "\033[31m"
-    GREEN = "\033[32m"
-    YELLOW = "\033[33m"
-    BLUE = "\033[34m"
-    MAGENTA = "\033[35m"
-    CYAN = "\033[36m"
-    WHITE = "\033[37m"
-
-    # Background colors
-    BG_BLACK = "\033[40m"
-    BG_RED = "\033[41m"
-    BG_GREEN = "\033[42m"
-    BG_YELLOW = "\033[43m"
-    BG_BLUE = "\033[44m"
-    BG_MAGENTA = "\033[45m"
-    BG_CYAN = "\033[46m"
-    BG_WHITE = "\033[47m"
+# agent_common/ (shared with 5.Persistent-Storage) lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_common.console import Colors, ResponseStreamer, StateObserver
+from conversation_log import CONVERSATION_LOG, DELEGATION_LOG, log_count
+from storage import (
+    AsyncRunner,
+    AsyncSessionService,
+    CachingSessionService,
+    CompactingDeltaSessionService,
+    prefetch_latest_session,
+)
 
 load_dotenv()
 
 # ===== PART 1: Initialize Persistent Session Service =====
-# Using SQLite database for persistent storage
+# Using SQLite database for persistent storage. Only the state keys changed by
+# each event are written (one row per key), not the whole state JSON.
+# Every MULTI_AGENT_COMPACT_EVERY events (0 = never) a session is snapshotted
+# and all but its last MULTI_AGENT_KEEP_TURNS turns move to events_archive.
+# Recently used sessions are kept in an LRU cache (MULTI_AGENT_CACHE_SESSIONS
+# sessions, MULTI_AGENT_CACHE_MB megabytes; 0 sessions disables it), so the
+# per-turn load is a dictionary lookup plus an update_time check.
+# The SQLite engine uses the MULTI_AGENT_STORAGE_PROFILE storage profile
+# ("durable" by default, "fast" or "read-mostly", see agent_common/storage_profiles.py).
+# Session reads and commits run on a dedicated I/O thread so they don't block
+# the event loop (MULTI_AGENT_ASYNC_DB=0 runs them inline, as ADK's Runner does).
+# With MULTI_AGENT_GROUP_COMMIT_MS > 0 the event writes of concurrent sessions
+# arriving within that many milliseconds share one transaction (group commit),
+# and session I/O gets MULTI_AGENT_IO_THREADS threads so writes can overlap.
+# It is off by default: one user's writes have nothing to batch and would only
+# wait out the window. Try 2-5 ms when serving many busy sessions
+# (multi_agent_server.py; see storage/group_commit.py).
 db_url = "sqlite:///./multi_agent_data.db"
-session_service = DatabaseSessionService(db_url=db_url)
+COMPACT_EVERY = int(os.getenv("MULTI_AGENT_COMPACT_EVERY", "200"))
+CACHE_SESSIONS = int(os.getenv("MULTI_AGENT_CACHE_SESSIONS", "64"))
+GROUP_COMMIT_MS = float(os.getenv("MULTI_AGENT_GROUP_COMMIT_MS", "0"))
+session_service = CompactingDeltaSessionService(
+    db_url=db_url,
+    compact_every=COMPACT_EVERY or None,
+    keep_turns=int(os.getenv("MULTI_AGENT_KEEP_TURNS", "20")),
+    profile=os.getenv("MULTI_AGENT_STORAGE_PROFILE", "durable"),
+    commit_window=GROUP_COMMIT_MS / 1000 or None,
+)
+if CACHE_SESSIONS:
+    session_service = CachingSessionService(
+        session_service,
+        max_sessions=CACHE_SESSIONS,
+        max_bytes=int(float(os.getenv("MULTI_AGENT_CACHE_MB", "64")) * 1024 * 1024),
+    )
+if os.getenv("MULTI_AGENT_ASYNC_DB", "1").lower() not in ("0", "false", "no"):
+    session_service = AsyncSessionService(
+        session_service,
+        io_threads=int(os.getenv("MULTI_AGENT_IO_THREADS", "8" if GROUP_COMMIT_MS else "1")),
+    )
 
 # ===== PART 2: Define Initial State for Multi-Agent System =====
 # This will only be used when creating a new session
@@ -46,6 +71,12 @@ initial_state = {
     "user_name": "Arvind Mehta",
     "conversation_history": [],
     "agent_delegations": [],
+    # Full logs live in the conversation_log table; state keeps a capped tail + counters
+    "log_counters": {
+        "conversation_history": 0,
+        "agent_delegations": 0,
+        "delegations_by_agent": {}
+    },
     "user_preferences": {
         "favorite_agent": None,
         "joke_preferences": [],
@@ -59,24 +90,76 @@ initial_state = {
     }
 }
 
+# ===== Lazy agent loading =====
+# Importing manager.agent pulls in litellm and every sub-agent. It is loaded on
+# a background thread (started by main_async before the session lookup and the
+# banner), so the first prompt does not wait for it. `root_agent` is still
+# importable from this module; accessing it waits for the load.
+_root_agent_future = None
+_root_agent_lock = threading.Lock()
+
+
+def load_root_agent_in_background() -> Future:
+    """Start importing the multi-agent manager (once) and return its Future."""
+    global _root_agent_future
+    with _root_agent_lock:
+        if _root_agent_future is None:
+            future = Future()
+
+            def load():
+                try:
+                    future.set_result(importlib.import_module("manager.agent").root_agent)
+                except BaseException as e:
+                    future.set_exception(e)
+
+            threading.Thread(target=load, name="load-root-agent").start()
+            _root_agent_future = future
+    return _root_agent_future
+
+
+def get_root_agent():
+    """The manager agent, waiting for (or starting) the background load."""
+    return load_root_agent_in_background().result()
+
+
+def __getattr__(name):
+    if name == "root_agent":
+        return get_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Set MULTI_AGENT_SHOW_STATE=0 for headless runs: no state is tracked or printed
+SHOW_STATE = os.getenv("MULTI_AGENT_SHOW_STATE", "1") not in ("0", "false", "no")
+
+# Set MULTI_AGENT_STREAM=0 to print responses only once they are complete
+STREAM = os.getenv("MULTI_AGENT_STREAM", "1") not in ("0", "false", "no")
+
+
 def display_multi_agent_state(session_service, app_name, user_id, session_id, label="Multi-Agent State"):
-    """Display the current multi-agent session state in a formatted way."""
+    """Load the session and display its state. Prefer a StateObserver inside the turn loop."""
     try:
         session = session_service.get_session(
             app_name=app_name, user_id=user_id, session_id=session_id
         )
+        render_multi_agent_state(session.state, label)
+    except Exception as e:
+        print(f"Error displaying multi-agent state: {e}")
+
 
+def render_multi_agent_state(state, label="Multi-Agent State"):
+    """Display a multi-agent session state dict in a formatted way."""
+    try:
         # Format the output with clear sections
         print(f"\n{'-' * 15} {label} {'-' * 15}")
 
         # Handle the user name
-        user_name = session.state.get("user_name", "Unknown")
+        user_name = state.get("user_name", "Unknown")
         print(f"👤 User: {user_name}")
 
         # Handle conversation history
-        conversation_history = session.state.get("conversation_history", [])
+        conversation_history = state.get("conversation_history", [])
         if conversation_history:
-            print(f"💬 Conversation History: {len(conversation_history)} entries")
+            print(f"💬 Conversation History: {log_count(state, CONVERSATION_LOG)} entries")
             # Show last 3 conversations
             for i, conv in enumerate(conversation_history[-3:], 1):
                 print(f"  {i}. {conv.get('timestamp', 'Unknown time')}: {conv.get('user_input', '')[:50]}...")
@@ -84,9 +167,9 @@ def display_multi_agent_state(session_service, app_name, user_id, session_id, la
             print("💬 Conversation History: None")
 
         # Handle agent delegations
-        delegations = session.state.get("agent_delegations", [])
+        delegations = state.get("agent_delegations", [])
         if delegations:
-            print(f"🤖 Agent Delegations: {len(delegations)} total")
+            print(f"🤖 Agent Delegations: {log_count(state, DELEGATION_LOG)} total")
             # Show recent delegations
             for i, delegation in enumerate(delegations[-3:], 1):
                 print(f"  {i}. {delegation.get('timestamp', 'Unknown time')}: {delegation.get('agent_name', 'Unknown')} - {delegation.get('task', '')[:50]}...")
@@ -94,7 +177,7 @@ def display_multi_agent_state(session_service, app_name, user_id, session_id, la
             print("🤖 Agent Delegations: None")
 
         # Handle user preferences
-        preferences = session.state.get("user_preferences", {})
+        preferences = state.get("user_preferences", {})
         print(f"⚙️  User Preferences:")
         print(f"  - Favorite Agent: {preferences.get('favorite_agent', 'None')}")
         print(f"  - Joke Preferences: {preferences.get('joke_preferences', [])}")
@@ -102,7 +185,7 @@ def display_multi_agent_state(session_service, app_name, user_id, session_id, la
         print(f"  - Nerd Topics: {preferences.get('nerd_topics', [])}")
 
         # Handle session metadata
-        metadata = session.state.get("session_metadata", {})
+        metadata = state.get("session_metadata", {})
         print(f"📊 Session Metadata:")
         print(f"  - Created: {metadata.get('created_at', 'Unknown')}")
         print(f"  - Last Activity: {metadata.get('last_activity', 'Unknown')}")
@@ -112,8 +195,21 @@ def display_multi_agent_state(session_service, app_name, user_id, session_id, la
     except Exception as e:
         print(f"Error displaying multi-agent state: {e}")
 
-async def process_multi_agent_response(event, session_service, app_name, user_id, session_id):
-    """Process and display multi-agent response events with state tracking."""
+async def process_multi_agent_response(event, session_service, app_name, user_id, session_id, streamer=None):
+    """Process and display multi-agent response events with state tracking.
+
+    With a ResponseStreamer, partial events are printed as they arrive and the
+    final response is not printed a second time.
+    """
+    if streamer and event.partial:
+        streamer.feed(event)
+        return None
+    if event.content is None:
+        # State-only events from the bookkeeping callbacks; nothing to show
+        return None
+    # A complete event closes any partial text streamed before it
+    streamed = streamer.close(final=event.is_final_response()) if streamer and streamer.streaming else None
+
     # Log basic event info
     print(f"Event ID: {event.id}, Author: {event.author}")
 
@@ -130,7 +226,7 @@ async def process_multi_agent_response(event, session_service, app_name, user_id
             elif hasattr(part, "tool_response") and part.tool_response:
                 print(f"  Tool Response: {part.tool_response.output}")
                 has_specific_part = True
-            elif hasattr(part, "text") and part.text and not part.text.isspace():
+            elif hasattr(part, "text") and part.text and not part.text.isspace() and streamed is None:
                 print(f"  Text: '{part.text.strip()}'")
 
     # Check for final response after specific parts
@@ -143,6 +239,10 @@ async def process_multi_agent_response(event, session_service, app_name, user_id
             # Note: State persistence is handled by Runner + tools via ToolContext.
             # Avoid manual session updates here to keep compatibility with DatabaseSessionService.
             
+            if streamed is not None:
+                # Already shown chunk by chunk
+                return final_response
+
             # Display the response with formatting
             print(f"\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ MULTI-AGENT RESPONSE ═════════════════════════════════════════{Colors.RESET}")
             print(f"{Colors.CYAN}{Colors.BOLD}{final_response}{Colors.RESET}")
@@ -152,28 +252,33 @@ async def process_multi_agent_response(event, session_service, app_name, user_id
 
     return final_response
 
-async def call_multi_agent_async(runner, user_id, session_id, query):
-    """Call the multi-agent system asynchronously with the user's query."""
+async def call_multi_agent_async(runner, user_id, session_id, query, observer=None, stream=False):
+    """Call the multi-agent system asynchronously with the user's query.
+
+    Pass a StateObserver to print the state before and after the turn; with
+    observer=None no state display work is done at all. With stream=True the
+    model is called in SSE mode and response text is printed as it arrives.
+    """
     content = types.Content(role="user", parts=[types.Part(text=query)])
     print(f"\n{Colors.BG_GREEN}{Colors.BLACK}{Colors.BOLD}--- Running Multi-Agent Query: {query} ---{Colors.RESET}")
     final_response_text = None
 
     # Display state before processing
-    display_multi_agent_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State BEFORE processing",
-    )
+    if observer:
+        observer.render("State BEFORE processing")
+
+    streamer = ResponseStreamer("MULTI-AGENT RESPONSE") if stream else None
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if stream else RunConfig()
 
     try:
         async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, new_message=content
+            user_id=user_id, session_id=session_id, new_message=content, run_config=run_config
         ):
+            if observer:
+                observer.apply(event)
             # Process each event and get the final response if available
             response = await process_multi_agent_response(
-                event, runner.session_service, runner.app_name, user_id, session_id
+                event, runner.session_service, runner.app_name, user_id, session_id, streamer
             )
             if response:
                 final_response_text = response
@@ -181,13 +286,8 @@ async def call_multi_agent_async(runner, user_id, session_id, query):
         print(f"Error during multi-agent call: {e}")
 
     # Display state after processing the message
-    display_multi_agent_state(
-        runner.session_service,
-        runner.app_name,
-        user_id,
-        session_id,
-        "State AFTER processing",
-    )
+    if observer:
+        observer.render("State AFTER processing")
 
     return final_response_text
 
@@ -196,37 +296,14 @@ async def main_async():
     APP_NAME = "Multi-Agent System"
     USER_ID = "arvind_rajesh_mehta"
 
-    # ===== PART 3: Session Management - Find or Create =====
-    # Check for existing sessions for this user
-    existing_sessions = session_service.list_sessions(
-        app_name=APP_NAME,
-        user_id=USER_ID,
-    )
+    # Import the agents while the session is looked up and the banner is shown
+    root_agent_future = load_root_agent_in_background()
 
-    # If there's an existing session, use it, otherwise create a new one
-    if existing_sessions and len(existing_sessions.sessions) > 0:
-        # Use the most recent session
-        SESSION_ID = existing_sessions.sessions[0].id
-        print(f"Continuing existing multi-agent session: {SESSION_ID}")
-    else:
-        # Create a new session with initial state
-        new_session = session_service.create_session(
-            app_name=APP_NAME,
-            user_id=USER_ID,
-            state=initial_state,
-        )
-        SESSION_ID = new_session.id
-        print(f"Created new multi-agent session: {SESSION_ID}")
-
-    # ===== PART 4: Multi-Agent Runner Setup =====
-    # Create a runner with the multi-agent manager
-    runner = Runner(
-        agent=root_agent,
-        app_name=APP_NAME,
-        session_service=session_service,
-    )
+    # ===== PART 3: Session Management - Find or Create =====
+    # Look up the most recent session (one indexed query) while the banner prints
+    latest_session_future = prefetch_latest_session(session_service, APP_NAME, USER_ID)
 
-    # ===== PART 5: Interactive Multi-Agent Conversation Loop =====
+    # Welcome banner (printed while the session loads)
     print("\n" + "="*60)
     print("🤖 WELCOME TO PERSISTENT MULTI-AGENT SYSTEM! 🤖")
     print("="*60)
@@ -245,6 +322,29 @@ async def main_async():
     print("\nType 'exit' or 'quit' to end the conversation.")
     print("="*60)
 
+    # Resume the most recent session, otherwise create a new one
+    session = await asyncio.wrap_future(latest_session_future)
+    if session is not None:
+        print(f"Continuing existing multi-agent session: {session.id}")
+    else:
+        # Create a new session with initial state
+        session = session_service.create_session(
+            app_name=APP_NAME,
+            user_id=USER_ID,
+            state=initial_state,
+        )
+        print(f"Created new multi-agent session: {session.id}")
+    SESSION_ID = session.id
+
+    # The state came with the session; after that the observer follows the event stream
+    observer = StateObserver(session.state, render_multi_agent_state) if SHOW_STATE else None
+
+    # ===== PART 4: Multi-Agent Runner Setup =====
+    # The runner is created with the multi-agent manager once it has loaded,
+    # right before the first query
+    runner = None
+
+    # ===== PART 5: Interactive Multi-Agent Conversation Loop =====
     while True:
         # Get user input
         user_input = input("\nYou: ")
@@ -255,11 +355,31 @@ async def main_async():
             print("👋 Ending multi-agent conversation.")
             print("📊 All your data has been saved to the database.")
             print("🔄 Next time you run this, your conversation history will be preserved!")
+            router = sys.modules.get("manager.router")
+            if router:
+                stats = router.get_router().stats()
+                print(f"⚡ Fast path: {stats['hits']} requests routed directly, {stats['misses']} via the manager model")
+            if CACHE_SESSIONS:
+                stats = session_service.stats()
+                print(f"🗄️  Session cache: {stats['hits']} hits, {stats['misses']} misses, "
+                      f"{stats['bytes'] / 1024:.0f} KiB in {stats['sessions']} sessions")
+            context_window = sys.modules.get("agent_common.context_window")
+            if context_window:
+                stats = context_window.get_history_policy().stats()
+                print(f"✂️  Context: ~{stats['avg_tokens_after']} prompt tokens per request "
+                      f"(~{stats['avg_tokens_before']} untrimmed), {stats['turns_folded']} turns summarized")
             print("="*60)
             break
 
+        if runner is None:
+            runner = AsyncRunner(
+                agent=await asyncio.wrap_future(root_agent_future),
+                app_name=APP_NAME,
+                session_service=session_service,
+            )
+
         # Process the user query through the multi-agent system
-        await call_multi_agent_async(runner, USER_ID, SESSION_ID, user_input)
+        await call_multi_agent_async(runner, USER_ID, SESSION_ID, user_input, observer, stream=STREAM)
 
 if __name__ == "__main__":
     asyncio.run(main_async())
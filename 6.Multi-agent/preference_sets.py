@@ -0,0 +1,182 @@
+"""Ordered, de-duplicated preference collections kept in session state.
+
+The watchlist and joke topics live as plain lists in
+state["user_preferences"] (that is what the UI and the agents read).
+PreferenceSet reads the list without copying it and looks up a dict from
+each normalized value ("AAPL", "python") to the stored value. The dict is
+built once per list object and cached (state_ops replaces a list instead of
+changing it), so membership checks in later tool calls are O(1) instead of a
+scan that re-normalizes the whole list on every call.
+
+    watchlist = stock_watchlist(tool_context)
+    if "aapl" not in watchlist:
+        watchlist.add("aapl")          # a set_add on the list
+    watchlist.add_many(["MSFT", "nvda"])  # still one of each
+
+Changes go through state_ops.py, so two tools adding to the same list at
+the same time both land.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+import state_ops
+
+PREFERENCES_KEY = "user_preferences"
+
+# Indexes of the lists seen lately, by (id(list), normalize). Each entry keeps
+# the list itself, so its id cannot be reused while the entry exists
+INDEX_CACHE_SIZE = int(os.getenv("MULTI_AGENT_PREFERENCE_INDEXES", "256"))
+_index_cache: OrderedDict = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _cached_index(values: list, normalize: Callable[[str], str]) -> dict:
+    """{normalized: stored value} for `values`, built once per list object.
+
+    Do not change the returned dict; copy it first.
+    """
+    cache_key = (id(values), normalize)
+    with _index_lock:
+        cached = _index_cache.get(cache_key)
+        # A list changed in place (not through state_ops) is re-indexed
+        if cached is not None and cached[0] is values and cached[1] == len(values):
+            _index_cache.move_to_end(cache_key)
+            return cached[2]
+
+    index = {}
+    for value in values:
+        index.setdefault(normalize(str(value)), value)
+    with _index_lock:
+        _index_cache[cache_key] = (values, len(values), index)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def _identity(value: str) -> str:
+    return value
+
+
+class PreferenceSet:
+    """An insertion-ordered set stored at state["user_preferences"][name].
+
+    Args:
+        context: ToolContext or CallbackContext of the current invocation
+        name: Key of the list inside user_preferences
+        normalize: Maps a value to its membership key (e.g. str.upper)
+        canonical: Maps a value to the form that is stored (default: unchanged)
+    """
+
+    def __init__(
+        self,
+        context,
+        name: str,
+        normalize: Callable[[str], str] = str.lower,
+        canonical: Callable[[str], str] = _identity,
+    ):
+        self.context = context
+        self.name = name
+        self.normalize = normalize
+        self.canonical = canonical
+
+        values = (context.state.get(PREFERENCES_KEY) or {}).get(name)
+        if values is None:
+            values = []
+        elif not isinstance(values, list):
+            # e.g. set to a single string through update_user_preferences
+            values = [values]
+        # The stored list itself: state only changes through state_ops, and
+        # this object copies it before changing it
+        self.values = values
+        self._copied = False
+
+        # Shared with other PreferenceSets over the same list until changed
+        self.index = _cached_index(values, normalize)
+        self._index_copied = False
+        # Duplicates (e.g. written by an older version): write the list back once
+        self._rewrite = len(self.index) != len(values)
+        if self._rewrite:
+            self.values = list(self.index.values())
+            self._copied = True
+
+    def __contains__(self, value) -> bool:
+        return self.normalize(str(value)) in self.index
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_list(self) -> list:
+        return list(self.values)
+
+    def _own_values(self) -> list:
+        if not self._copied:
+            self.values = list(self.values)
+            self._copied = True
+        return self.values
+
+    def _own_index(self) -> dict:
+        if not self._index_copied:
+            self.index = dict(self.index)
+            self._index_copied = True
+        return self.index
+
+    def add(self, value: str) -> bool:
+        """Add one value; returns False if it was already present."""
+        return bool(self.add_many([value]))
+
+    def add_many(self, values: Iterable[str]) -> list:
+        """Add values in order, skipping ones already present; returns those added."""
+        added = []
+        for value in values:
+            key = self.normalize(str(value))
+            if key in self.index:
+                continue
+            stored = self.canonical(value)
+            self._own_index()[key] = stored
+            added.append(stored)
+        if added:
+            self._own_values().extend(added)
+            if self._rewrite:
+                self.save()
+            else:
+                state_ops.set_add(self.context, f"{PREFERENCES_KEY}.{self.name}", *added)
+        return added
+
+    def remove(self, value: str) -> bool:
+        """Remove one value; returns False if it was not present."""
+        return bool(self.remove_many([value]))
+
+    def remove_many(self, values: Iterable[str]) -> list:
+        """Remove values (one pass over the list); returns the stored values removed."""
+        removed = []
+        for value in values:
+            key = self.normalize(str(value))
+            if key not in self.index:
+                continue
+            removed.append(self._own_index().pop(key))
+        if removed:
+            self.values = list(self.index.values())
+            self._copied = True
+            self.save()
+        return removed
+
+    def save(self) -> None:
+        """Write the whole list (a set operation)."""
+        state_ops.set_value(self.context, f"{PREFERENCES_KEY}.{self.name}", list(self.values))
+        self._rewrite = False
+
+
+def stock_watchlist(context) -> PreferenceSet:
+    """Watchlist tickers, stored upper-case."""
+    return PreferenceSet(context, "stock_watchlist", normalize=str.upper, canonical=str.upper)
+
+
+def joke_preferences(context) -> PreferenceSet:
+    """Joke topics, matched case-insensitively and stored as given."""
+    return PreferenceSet(context, "joke_preferences")
+
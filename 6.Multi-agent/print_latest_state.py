@@ -1,9 +1,141 @@
 #!/usr/bin/env python3
+"""Inspect persisted session/user state in the multi-agent SQLite DB.
+
+The DB is opened read-only (URI `mode=ro`), and key selection runs inside
+SQLite with json_extract, so only the requested paths leave the database:
+
+    # Full state of the latest session (default)
+    python print_latest_state.py --db multi_agent_data.db --user u1
+
+    # Only some paths of the latest session
+    python print_latest_state.py --key session_metadata.total_interactions --key user:preferences
+
+    # Stream one JSON line per session, newest first
+    python print_latest_state.py --list --app "Multi-Agent System" --key log_counters.delegations
+
+    # count/sum/min/max/avg of a numeric path across all matching sessions
+    python print_latest_state.py --aggregate --key session_metadata.total_interactions
+
+    # Create the (app_name, user_id, update_time) indexes (the only write)
+    python print_latest_state.py --ensure-indexes
+"""
 import argparse
 import json
 import sqlite3
 import sys
-from typing import Optional
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+# name -> (table, columns). The sessions index also carries `id`, so finding a
+# user's latest session is answered from the index alone.
+INDEXES = {
+    "idx_sessions_app_user_update": ("sessions", ("app_name", "user_id", "update_time", "id")),
+    "idx_user_states_app_user_update": ("user_states", ("app_name", "user_id", "update_time")),
+}
+
+
+def connect_readonly(db_path: str) -> sqlite3.Connection:
+    """Open `db_path` read-only; fails instead of creating a missing file."""
+    return sqlite3.connect(f"file:{quote(db_path)}?mode=ro", uri=True)
+
+
+def connect_readwrite(db_path: str) -> sqlite3.Connection:
+    """Open an existing `db_path` for writing; fails instead of creating a missing file."""
+    return sqlite3.connect(f"file:{quote(db_path)}?mode=rw", uri=True)
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    cur = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cur.fetchone() is not None
+
+
+def missing_indexes(conn: sqlite3.Connection) -> list:
+    """Names of INDEXES that are not present (tables that don't exist are skipped)."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [
+        name for name, (table, _) in INDEXES.items()
+        if name not in existing and table_exists(conn, table)
+    ]
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> list:
+    """Create missing INDEXES and return the names created. Needs a writable connection."""
+    created = missing_indexes(conn)
+    for name in created:
+        table, columns = INDEXES[name]
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    conn.commit()
+    return created
+
+
+def json_path(key: str) -> tuple:
+    """Split a dotted key into (top-level key, path within its value, full path).
+
+    >>> json_path("session_metadata.total_interactions")
+    ('session_metadata', '$."total_interactions"', '$."session_metadata"."total_interactions"')
+    """
+    parts = key.split(".")
+    quoted = ['"' + p.replace('"', '\\"') + '"' for p in parts]
+    return parts[0], "$" + "".join("." + q for q in quoted[1:]), "$" + "".join("." + q for q in quoted)
+
+
+def _filters(app_name, user_id, session_id, id_column="id"):
+    where, params = [], []
+    if app_name:
+        where.append("s.app_name = ?")
+        params.append(app_name)
+    if user_id:
+        where.append("s.user_id = ?")
+        params.append(user_id)
+    if session_id:
+        where.append(f"s.{id_column} = ?")
+        params.append(session_id)
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def _key_expr(key: str, fn: str, source: str, with_entries: bool):
+    """SQL expression applying `fn` (json_extract/json_type) to one key, plus its parameters.
+
+    For sessions, `user:`/`app:` keys are read from user_states/app_states, and
+    keys written by DeltaDatabaseSessionService live in session_state_entries
+    and take precedence over the legacy state column.
+    """
+    top, inner, full = json_path(key)
+    if source == "sessions":
+        for prefix, table, match in (
+            ("user:", "user_states", "t.app_name = s.app_name AND t.user_id = s.user_id"),
+            ("app:", "app_states", "t.app_name = s.app_name"),
+        ):
+            if top.startswith(prefix):
+                _, _, scoped = json_path(key[len(prefix):])
+                return f"(SELECT {fn}(t.state, ?) FROM {table} t WHERE {match})", [scoped]
+        if with_entries:
+            sql = (
+                f"COALESCE((SELECT {fn}(e.value, ?) FROM session_state_entries e"
+                " WHERE e.app_name = s.app_name AND e.user_id = s.user_id"
+                f" AND e.session_id = s.id AND e.key = ?), {fn}(s.state, ?))"
+            )
+            return sql, [inner, top, full]
+    return f"{fn}(s.state, ?)", [full]
+
+
+def _key_columns(keys: list, source: str, with_entries: bool):
+    """(value, json_type) column expressions for every key, plus their parameters."""
+    columns, params = [], []
+    for key in keys:
+        for fn in ("json_extract", "json_type"):
+            sql, key_params = _key_expr(key, fn, source, with_entries)
+            columns.append(sql)
+            params.extend(key_params)
+    return columns, params
+
+
+def _decode(value, json_type):
+    if json_type in ("object", "array"):
+        return json.loads(value)
+    if json_type in ("true", "false"):
+        return json_type == "true"
+    return value
 
 
 def fetch_latest_state(
@@ -16,41 +148,137 @@ def fetch_latest_state(
     if source not in {"sessions", "user_states"}:
         raise ValueError("source must be 'sessions' or 'user_states'")
 
-    cur = conn.cursor()
-
     if source == "sessions":
-        base = "SELECT app_name, user_id, id as session_id, state, update_time FROM sessions"
-        where = []
-        params = []
-        if app_name:
-            where.append("app_name = ?")
-            params.append(app_name)
-        if user_id:
-            where.append("user_id = ?")
-            params.append(user_id)
-        if session_id:
-            where.append("id = ?")
-            params.append(session_id)
-        sql = base + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY update_time DESC LIMIT 1"
+        base = "SELECT s.app_name, s.user_id, s.id as session_id, s.state, s.update_time FROM sessions s"
+        where, params = _filters(app_name, user_id, session_id)
     else:
-        base = "SELECT app_name, user_id, state, update_time FROM user_states"
-        where = []
-        params = []
-        if app_name:
-            where.append("app_name = ?")
-            params.append(app_name)
-        if user_id:
-            where.append("user_id = ?")
-            params.append(user_id)
-        sql = base + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY update_time DESC LIMIT 1"
+        base = "SELECT s.app_name, s.user_id, s.state, s.update_time FROM user_states s"
+        where, params = _filters(app_name, user_id, None)
+    sql = base + where + " ORDER BY s.update_time DESC LIMIT 1"
 
+    cur = conn.cursor()
     cur.execute(sql, params)
     row = cur.fetchone()
     return row
 
 
+def iter_states(
+    conn: sqlite3.Connection,
+    keys: list,
+    source: str = "sessions",
+    app_name: Optional[str] = None,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> Iterator[dict]:
+    """Yield {"meta": ..., "state": {key: value}} per matching row, newest first.
+
+    Only the requested keys are extracted (in SQLite), and rows are read from
+    the cursor one at a time, so memory stays flat however many rows match.
+    """
+    if source not in {"sessions", "user_states"}:
+        raise ValueError("source must be 'sessions' or 'user_states'")
+    with_entries = source == "sessions" and table_exists(conn, "session_state_entries")
+    columns, key_params = _key_columns(keys, source, with_entries)
+
+    meta_columns = ["s.app_name", "s.user_id", "s.update_time"]
+    if source == "sessions":
+        meta_columns.append("s.id")
+    where, params = _filters(app_name, user_id, session_id if source == "sessions" else None)
+    sql = f"SELECT {', '.join(meta_columns + columns)} FROM {source} s{where} ORDER BY s.update_time DESC"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+
+    for row in conn.execute(sql, key_params + params):
+        meta = {"source": source, "app_name": row[0], "user_id": row[1], "update_time": row[2]}
+        if source == "sessions":
+            meta["session_id"] = row[3]
+        values = row[len(meta_columns):]
+        state = {key: _decode(values[2 * i], values[2 * i + 1]) for i, key in enumerate(keys)}
+        yield {"meta": meta, "state": state}
+
+
+def aggregate_keys(
+    conn: sqlite3.Connection,
+    keys: list,
+    source: str = "sessions",
+    app_name: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> dict:
+    """count/sum/min/max/avg of each key across matching rows, computed by SQLite."""
+    with_entries = source == "sessions" and table_exists(conn, "session_state_entries")
+    where, params = _filters(app_name, user_id, None)
+    result = {}
+    for key in keys:
+        value_sql, key_params = _key_expr(key, "json_extract", source, with_entries)
+        cur = conn.execute(
+            f"SELECT COUNT(*), COUNT(v), SUM(v), MIN(v), MAX(v), AVG(v)"
+            f" FROM (SELECT {value_sql} AS v FROM {source} s{where})",
+            key_params + params,
+        )
+        rows, count, total, low, high, avg = cur.fetchone()
+        result[key] = {"rows": rows, "count": count, "sum": total, "min": low, "max": high, "avg": avg}
+    return result
+
+
+def load_state_entries(conn: sqlite3.Connection, app_name: str, user_id: str, session_id: str) -> dict:
+    """Per-key state rows written by DeltaDatabaseSessionService (empty if the table is absent)."""
+    if not table_exists(conn, "session_state_entries"):
+        return {}
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT key, value FROM session_state_entries WHERE app_name = ? AND user_id = ? AND session_id = ?",
+        (app_name, user_id, session_id),
+    )
+    return {key: json.loads(value) if value is not None else None for key, value in cur.fetchall()}
+
+
+def print_latest_full_state(conn: sqlite3.Connection, args) -> None:
+    row = fetch_latest_state(
+        conn,
+        source=args.source,
+        app_name=args.app_name,
+        user_id=args.user_id,
+        session_id=args.session_id,
+    )
+    if not row:
+        print("No rows found.")
+        return
+
+    if args.source == "sessions":
+        app_name, user_id, session_id, state, update_time = row
+        meta = {
+            "source": args.source,
+            "app_name": app_name,
+            "user_id": user_id,
+            "session_id": session_id,
+            "update_time": update_time,
+        }
+    else:
+        app_name, user_id, state, update_time = row
+        meta = {
+            "source": args.source,
+            "app_name": app_name,
+            "user_id": user_id,
+            "update_time": update_time,
+        }
+
+    try:
+        state_json = json.loads(state)
+    except Exception:
+        # Not JSON? print raw
+        print(json.dumps({"meta": meta, "state_raw": state}, indent=2))
+        return
+
+    if args.source == "sessions":
+        # Keys stored one-per-row override the (legacy) state column
+        state_json.update(load_state_entries(conn, app_name, user_id, session_id))
+
+    print(json.dumps({"meta": meta, "state": state_json}, indent=2))
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Print latest persisted state from SQLite DB")
+    parser = argparse.ArgumentParser(description="Inspect persisted state in the SQLite DB")
     parser.add_argument(
         "--db",
         default="/home/arvind/AI-agents-Dev/7.Multi-agent/multi_agent_data.db",
@@ -65,58 +293,65 @@ def main():
     parser.add_argument("--app", dest="app_name", help="Filter by app_name")
     parser.add_argument("--user", dest="user_id", help="Filter by user_id")
     parser.add_argument("--session", dest="session_id", help="Filter by session id (sessions only)")
+    parser.add_argument(
+        "--key",
+        dest="keys",
+        action="append",
+        default=[],
+        help="Dotted state path to read, e.g. session_metadata.total_interactions (repeatable)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--list", action="store_true", help="Stream one JSON line per matching row")
+    mode.add_argument("--aggregate", action="store_true", help="count/sum/min/max/avg of each --key")
+    mode.add_argument("--ensure-indexes", action="store_true", help="Create missing indexes and exit")
+    parser.add_argument("--limit", type=int, help="Maximum rows for --list")
 
     args = parser.parse_args()
+    if args.aggregate and not args.keys:
+        parser.error("--aggregate needs at least one --key")
 
     try:
-        conn = sqlite3.connect(args.db)
+        if args.ensure_indexes:
+            conn = connect_readwrite(args.db)
+        else:
+            conn = connect_readonly(args.db)
     except sqlite3.Error as e:
         print(f"Error opening DB {args.db}: {e}", file=sys.stderr)
         sys.exit(1)
 
     try:
-        row = fetch_latest_state(
-            conn,
-            source=args.source,
-            app_name=args.app_name,
-            user_id=args.user_id,
-            session_id=args.session_id,
-        )
-        if not row:
-            print("No rows found.")
+        if args.ensure_indexes:
+            created = ensure_indexes(conn)
+            print(f"Created indexes: {', '.join(created)}" if created else "All indexes present.")
             return
 
-        if args.source == "sessions":
-            app_name, user_id, session_id, state, update_time = row
-            meta = {
-                "source": args.source,
-                "app_name": app_name,
-                "user_id": user_id,
-                "session_id": session_id,
-                "update_time": update_time,
-            }
-        else:
-            app_name, user_id, state, update_time = row
-            meta = {
-                "source": args.source,
-                "app_name": app_name,
-                "user_id": user_id,
-                "update_time": update_time,
-            }
-
-        try:
-            state_json = json.loads(state)
-        except Exception:
-            # Not JSON? print raw
-            print(json.dumps({"meta": meta, "state_raw": state}, indent=2))
-            return
+        missing = missing_indexes(conn)
+        if missing:
+            print(
+                f"Note: missing indexes {', '.join(missing)}; run with --ensure-indexes",
+                file=sys.stderr,
+            )
 
-        print(json.dumps({"meta": meta, "state": state_json}, indent=2))
+        if args.aggregate:
+            result = aggregate_keys(conn, args.keys, args.source, args.app_name, args.user_id)
+            print(json.dumps(result, indent=2))
+        elif args.list:
+            rows = iter_states(
+                conn, args.keys, args.source, args.app_name, args.user_id, args.session_id, args.limit
+            )
+            for item in rows:
+                print(json.dumps(item))
+        elif args.keys:
+            item = next(
+                iter_states(conn, args.keys, args.source, args.app_name, args.user_id, args.session_id, 1),
+                None,
+            )
+            print(json.dumps(item, indent=2) if item else "No rows found.")
+        else:
+            print_latest_full_state(conn, args)
     finally:
         conn.close()
 
 
 if __name__ == "__main__":
     main()
-
-
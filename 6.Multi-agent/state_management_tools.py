@@ -1,6 +1,23 @@
-from datetime import datetime
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools.tool_context import ToolContext
 
+from agent_common.context_window import chain_callbacks
+from conversation_log import (
+    CONVERSATION_LOG,
+    DELEGATION_LOG,
+    delegation_counts,
+    log_count,
+    migrate_legacy_logs,
+    record_conversation,
+    record_delegation,
+    record_interaction,
+)
+from preference_sets import joke_preferences as joke_preference_set
+from preference_sets import stock_watchlist
+import state_ops
+
 def track_agent_delegation(agent_name: str, task: str, tool_context: ToolContext) -> dict:
     """Track when the manager agent delegates tasks to sub-agents.
     
@@ -14,29 +31,15 @@ def track_agent_delegation(agent_name: str, task: str, tool_context: ToolContext
     """
     print(f"--- Tool: track_agent_delegation called for {agent_name} with task: {task} ---")
     
-    # Get current delegations from state
-    delegations = tool_context.state.get("agent_delegations", [])
-    
-    # Create new delegation record
-    delegation_record = {
-        "timestamp": datetime.now().isoformat(),
-        "agent_name": agent_name,
-        "task": task,
-        "status": "delegated"
-    }
-    
-    # Add the new delegation
-    delegations.append(delegation_record)
-    
-    # Update state with the new list of delegations
-    tool_context.state["agent_delegations"] = delegations
+    # Append the delegation to the session log (state keeps only a capped tail)
+    total_delegations = record_delegation(tool_context, agent_name, task)
     
     return {
         "action": "track_delegation",
         "agent_name": agent_name,
         "task": task,
         "message": f"Tracked delegation to {agent_name} for task: {task}",
-        "total_delegations": len(delegations)
+        "total_delegations": total_delegations
     }
 
 def update_user_preferences(preference_type: str, value: str, tool_context: ToolContext) -> dict:
@@ -52,14 +55,8 @@ def update_user_preferences(preference_type: str, value: str, tool_context: Tool
     """
     print(f"--- Tool: update_user_preferences called for {preference_type} with value: {value} ---")
     
-    # Get current preferences from state
-    preferences = tool_context.state.get("user_preferences", {})
-    
-    # Update the specific preference as a simple string value
-    preferences[preference_type] = value
-    
-    # Update state with the modified preferences
-    tool_context.state["user_preferences"] = preferences
+    # Update the specific preference as a simple string value (other preferences are kept)
+    state_ops.merge(tool_context, "user_preferences", {preference_type: value})
     
     return {
         "action": "update_preferences",
@@ -80,28 +77,23 @@ def add_to_stock_watchlist(ticker: str, tool_context: ToolContext) -> dict:
     """
     print(f"--- Tool: add_to_stock_watchlist called for {ticker} ---")
     
-    # Get current watchlist from preferences
-    preferences = tool_context.state.get("user_preferences", {})
-    watchlist = preferences.get("stock_watchlist", [])
+    watchlist = stock_watchlist(tool_context)
+    ticker = ticker.upper()
     
-    # Add ticker if not already present
-    if ticker.upper() not in [t.upper() for t in watchlist]:
-        watchlist.append(ticker.upper())
-        preferences["stock_watchlist"] = watchlist
-        tool_context.state["user_preferences"] = preferences
-        
+    # Add ticker if not already present (O(1) membership via the normalized index)
+    if watchlist.add(ticker):
         return {
             "action": "add_to_watchlist",
-            "ticker": ticker.upper(),
-            "message": f"Added {ticker.upper()} to your stock watchlist",
-            "watchlist": watchlist
+            "ticker": ticker,
+            "message": f"Added {ticker} to your stock watchlist",
+            "watchlist": watchlist.to_list()
         }
     else:
         return {
             "action": "add_to_watchlist",
-            "ticker": ticker.upper(),
-            "message": f"{ticker.upper()} is already in your watchlist",
-            "watchlist": watchlist
+            "ticker": ticker,
+            "message": f"{ticker} is already in your watchlist",
+            "watchlist": watchlist.to_list()
         }
 
 def add_joke_preference(topic: str, tool_context: ToolContext) -> dict:
@@ -116,28 +108,22 @@ def add_joke_preference(topic: str, tool_context: ToolContext) -> dict:
     """
     print(f"--- Tool: add_joke_preference called for topic: {topic} ---")
     
-    # Get current joke preferences
-    preferences = tool_context.state.get("user_preferences", {})
-    joke_preferences = preferences.get("joke_preferences", [])
+    joke_preferences = joke_preference_set(tool_context)
     
-    # Add topic if not already present
-    if topic.lower() not in [t.lower() for t in joke_preferences]:
-        joke_preferences.append(topic)
-        preferences["joke_preferences"] = joke_preferences
-        tool_context.state["user_preferences"] = preferences
-        
+    # Add topic if not already present (case-insensitive)
+    if joke_preferences.add(topic):
         return {
             "action": "add_joke_preference",
             "topic": topic,
             "message": f"Added '{topic}' to your joke preferences",
-            "joke_preferences": joke_preferences
+            "joke_preferences": joke_preferences.to_list()
         }
     else:
         return {
             "action": "add_joke_preference",
             "topic": topic,
             "message": f"'{topic}' is already in your joke preferences",
-            "joke_preferences": joke_preferences
+            "joke_preferences": joke_preferences.to_list()
         }
 
 def get_conversation_summary(tool_context: ToolContext) -> dict:
@@ -151,20 +137,21 @@ def get_conversation_summary(tool_context: ToolContext) -> dict:
     """
     print("--- Tool: get_conversation_summary called ---")
     
-    # Get conversation history from state
-    conversation_history = tool_context.state.get("conversation_history", [])
+    # Totals come from the log counters; state only holds the recent tail
+    total_conversations = log_count(tool_context.state, CONVERSATION_LOG)
+    total_delegations = log_count(tool_context.state, DELEGATION_LOG)
     delegations = tool_context.state.get("agent_delegations", [])
     metadata = tool_context.state.get("session_metadata", {})
     
     return {
         "action": "conversation_summary",
-        "total_conversations": len(conversation_history),
-        "total_delegations": len(delegations),
+        "total_conversations": total_conversations,
+        "total_delegations": total_delegations,
         "total_interactions": metadata.get("total_interactions", 0),
         "session_created": metadata.get("created_at", "Unknown"),
         "last_activity": metadata.get("last_activity", "Unknown"),
         "recent_delegations": delegations[-5:] if delegations else [],
-        "message": f"Session has {len(conversation_history)} conversations and {len(delegations)} agent delegations"
+        "message": f"Session has {total_conversations} conversations and {total_delegations} agent delegations"
     }
 
 def log_user_input(text: str, tool_context: ToolContext) -> dict:
@@ -179,28 +166,22 @@ def log_user_input(text: str, tool_context: ToolContext) -> dict:
     """
     print(f"--- Tool: log_user_input called: '{text[:60]}' ---")
 
-    state = tool_context.state
-    state["last_user_input"] = text
-
-    history = state.get("conversation_history", [])
-    history.append({
-        "timestamp": datetime.now().isoformat(),
-        "author": "user",
-        "user_input": text
-    })
-    state["conversation_history"] = history
-
-    metadata = state.get("session_metadata", {})
-    metadata["last_activity"] = datetime.now().isoformat()
-    metadata["total_interactions"] = metadata.get("total_interactions", 0) + 1
-    state["session_metadata"] = metadata
+    conversation_count = _record_user_input(tool_context, text)
 
     return {
         "action": "log_user_input",
         "message": "Logged user input",
-        "conversation_count": len(history)
+        "conversation_count": conversation_count
     }
 
+def _record_user_input(context, text: str) -> int:
+    """Store the user's message: last_user_input, conversation log, session metadata."""
+    context.state["last_user_input"] = text
+
+    conversation_count = record_conversation(context, author="user", user_input=text)
+    record_interaction(context)
+    return conversation_count
+
 def set_favorite_agent(agent_name: str, tool_context: ToolContext) -> dict:
     """Set the user's favorite agent for future interactions.
     
@@ -213,12 +194,8 @@ def set_favorite_agent(agent_name: str, tool_context: ToolContext) -> dict:
     """
     print(f"--- Tool: set_favorite_agent called for {agent_name} ---")
     
-    # Get current preferences
-    preferences = tool_context.state.get("user_preferences", {})
-    
     # Set favorite agent
-    preferences["favorite_agent"] = agent_name
-    tool_context.state["user_preferences"] = preferences
+    state_ops.merge(tool_context, "user_preferences", {"favorite_agent": agent_name})
     
     return {
         "action": "set_favorite_agent",
@@ -238,23 +215,81 @@ def get_agent_performance_stats(tool_context: ToolContext) -> dict:
     """
     print("--- Tool: get_agent_performance_stats called ---")
     
-    # Get delegations from state
-    delegations = tool_context.state.get("agent_delegations", [])
-    
-    # Count delegations by agent
-    agent_counts = {}
-    for delegation in delegations:
-        agent_name = delegation.get("agent_name", "unknown")
-        agent_counts[agent_name] = agent_counts.get(agent_name, 0) + 1
+    # Per-agent delegation counts are maintained by the delegation log
+    agent_counts = delegation_counts(tool_context.state)
+    total_delegations = log_count(tool_context.state, DELEGATION_LOG)
     
     # Get most used agent
     most_used_agent = max(agent_counts.items(), key=lambda x: x[1]) if agent_counts else ("none", 0)
     
     return {
         "action": "agent_performance_stats",
-        "total_delegations": len(delegations),
+        "total_delegations": total_delegations,
         "agent_usage": agent_counts,
         "most_used_agent": most_used_agent[0],
         "most_used_count": most_used_agent[1],
         "message": f"Agent performance: {agent_counts} (Most used: {most_used_agent[0]} with {most_used_agent[1]} delegations)"
     }
+
+
+# ===== Bookkeeping callbacks =====
+# log_user_input and track_agent_delegation used to be tools the manager had
+# to call itself, costing a model round-trip each. These callbacks write the
+# same state automatically; install them with install_bookkeeping_callbacks.
+
+# Id of the invocation whose user message has been logged. A turn can pass
+# through several agents (each runs before_agent_callback), but is logged once;
+# temp: state is shared by the agents of an invocation and never persisted.
+LOGGED_INVOCATION_KEY = "temp:user_input_logged"
+
+
+def _user_text(context) -> str:
+    content = context.user_content
+    if not content or not content.parts:
+        return ""
+    return "".join(part.text for part in content.parts if part.text)
+
+
+def log_user_input_callback(callback_context: CallbackContext) -> None:
+    """before_agent_callback: log the turn's user message once per invocation.
+
+    Legacy session logs are migrated here too, before any tool call can.
+    """
+    migrate_legacy_logs(callback_context)
+    invocation_id = callback_context.invocation_id
+    if callback_context.state.get(LOGGED_INVOCATION_KEY) == invocation_id:
+        return None
+    callback_context.state[LOGGED_INVOCATION_KEY] = invocation_id
+
+    text = _user_text(callback_context)
+    if text:
+        _record_user_input(callback_context, text)
+    return None
+
+
+def track_delegation_callback(tool, args: dict, tool_context: ToolContext, tool_response) -> Optional[dict]:
+    """after_tool_callback: record a delegation whenever an agent transfers to a sub-agent.
+
+    Handing a conversation back to the manager is not a delegation and is skipped.
+    """
+    agent_name = args.get("agent_name")
+    if tool.name != "transfer_to_agent" or not agent_name:
+        return None
+    if agent_name == tool_context._invocation_context.agent.root_agent.name:
+        return None
+    record_delegation(tool_context, agent_name, _user_text(tool_context))
+    return None
+
+
+def _chain_once(current, callback):
+    if current is callback or callback in getattr(current, "callbacks", ()):
+        return current
+    return chain_callbacks(current, callback)
+
+
+def install_bookkeeping_callbacks(agent) -> None:
+    """Chain the bookkeeping callbacks after `agent`'s own ones, recursively."""
+    agent.before_agent_callback = _chain_once(agent.before_agent_callback, log_user_input_callback)
+    agent.after_tool_callback = _chain_once(agent.after_tool_callback, track_delegation_callback)
+    for sub_agent in agent.sub_agents:
+        install_bookkeeping_callbacks(sub_agent)
@@ -0,0 +1,160 @@
+"""Intent-level state updates for tool and callback code.
+
+Tools used to read a whole list or dict from state, change it and write it
+back (`metadata = state.get(...); metadata["n"] += 1; state[...] = metadata`).
+Two tools doing that at the same time lose one update, and every change
+rewrites the full value. The functions here change state through an
+operation instead:
+
+    incr(tool_context, "session_metadata.total_interactions")
+    append(tool_context, "conversation_history", entry, limit=20)
+    set_add(tool_context, "user_preferences.stock_watchlist", "AAPL")
+    merge(tool_context, "user_preferences", {"favorite_agent": "stock_analyst"})
+    update_bits(tool_context, "user:jokes_seen", add=[42])
+
+Each call updates `context.state` right away (so the tool sees the result and
+session services that only know full values keep working) and records the
+operation, also through `context.state`, under OPS_KEY ("temp:state_ops",
+never persisted as a state key). DeltaDatabaseSessionService replays the
+recorded operations on the stored values inside its write transaction, so
+concurrent updates of the same key are applied one after the other instead of
+overwriting each other. The operation format and how it is applied live in
+storage/ops.py.
+
+A plain `state[key] = ...` write to a key that also has operations in the same
+delta is kept, in its place among them, as a "set" operation: after the last
+operation by normalize_ops, before the next one by _record. The latter needs
+the tool's delta (ToolContext.actions); in callbacks, use set_value for a key
+that is also changed through operations.
+
+Paths are dotted: the first part is the state key (with its app:/user:
+prefix), the rest walks into nested dicts.
+"""
+import threading
+import weakref
+from typing import Any, Iterable, Optional
+
+from storage.ops import (
+    OPS_KEY,
+    RESULTS_KEY,
+    apply_op,
+    encode_bitset,
+    missing_values,
+    set_op,
+)
+
+# Tool calls of one model response may run on several threads
+# (tool_execution.py); each read-modify-write of the session state is atomic
+_lock = threading.RLock()
+
+# The operations recorded through each context so far, the value each key had
+# after its last one and the lists built by collect, keyed by the context's
+# State. Kept here instead of being read back from state: State also writes
+# into the session, where a read would find what earlier contexts recorded
+_recordings: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _recording(state) -> dict:
+    return _recordings.setdefault(state, {"ops": [], "results": {}, "collected": {}})
+
+
+def _get_path(value: Any, path: list) -> Any:
+    for part in path:
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _written_before(context, key: str) -> bool:
+    """Whether `key` was written directly in this context's delta (tools only)."""
+    actions = getattr(context, "actions", None)
+    return actions is not None and key in actions.state_delta
+
+
+def _record(context, path: str, op: dict) -> Any:
+    op["path"] = path.split(".")
+    key = op["path"][0]
+    state = context.state
+    with _lock:
+        recording = _recording(state)
+        ops, results = recording["ops"], recording["results"]
+        current = state.get(key)
+        if key in results:
+            written = current != results[key]
+        else:
+            written = _written_before(context, key)
+        if written:
+            # state[key] = ... came first: keep it ahead of this operation
+            ops.append(set_op(key, current))
+        new_value = apply_op(current, op)
+        ops.append(op)
+        results[key] = new_value
+        state[key] = new_value
+        state[OPS_KEY] = list(ops)
+        state[RESULTS_KEY] = dict(results)
+    return _get_path(new_value, op["path"][1:])
+
+
+def set_value(context, path: str, value: Any) -> Any:
+    """Set the value at `path` (ordered with the other operations on its key)."""
+    return _record(context, path, {"op": "set", "value": value})
+
+
+def incr(context, path: str, amount: float = 1) -> Any:
+    """Add `amount` to the number at `path` (missing counts as 0); returns the new number."""
+    return _record(context, path, {"op": "incr", "value": amount})
+
+
+def append(context, path: str, value: Any, limit: Optional[int] = None) -> list:
+    """Append to the list at `path`, keeping only the last `limit` items; returns the list."""
+    return _record(context, path, {"op": "append", "value": value, "limit": limit})
+
+
+def extend(context, path: str, values: Iterable, limit: Optional[int] = None) -> list:
+    """Append several values to the list at `path`; returns the list."""
+    return _record(context, path, {"op": "extend", "value": list(values), "limit": limit})
+
+
+def set_add(context, path: str, *values) -> list:
+    """Append the values not yet in the list at `path`; returns the ones added."""
+    with _lock:
+        current = _get_path(context.state.get(path.split(".")[0]), path.split(".")[1:])
+        added = missing_values(current if isinstance(current, list) else [], values)
+        if added:
+            _record(context, path, {"op": "set_add", "value": added})
+    return added
+
+
+def merge(context, path: str, values: dict) -> dict:
+    """Update the dict at `path` with `values` (other keys are kept); returns the dict."""
+    return _record(context, path, {"op": "merge", "value": dict(values)})
+
+
+def update_bits(
+    context,
+    path: str,
+    add: Iterable[int] = (),
+    discard: Iterable[int] = (),
+    clear: Optional[bytes] = None,
+) -> str:
+    """Change the bitset at `path`; returns it.
+
+    The members of the bitset `clear` (raw bytes, see storage.ops) are
+    removed first, then the `discard` bits, then the `add` bits are set.
+    """
+    change = {"add": list(add), "discard": list(discard)}
+    if clear:
+        change["clear"] = encode_bitset(clear)
+    return _record(context, path, {"op": "bits", "value": change})
+
+
+def collect(context, key: str, *values) -> None:
+    """Add `values` to the list under the temp: `key` in this context's delta.
+
+    Unlike append, the list starts empty in every context: it carries data for
+    the session service along with the event (see storage.ops.LOG_ENTRIES_KEY).
+    """
+    state = context.state
+    with _lock:
+        items = _recording(state)["collected"].setdefault(key, [])
+        items.extend(values)
+        state[key] = list(items)
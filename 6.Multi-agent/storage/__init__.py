@@ -0,0 +1,12 @@
+from agent_common.latest_session import get_latest_session, prefetch_latest_session
+from agent_common.session_cache import CachingSessionService
+from agent_common.storage_profiles import PROFILES, StorageProfile, apply_profile, create_profiled_engine
+from .async_session_service import AsyncDatabaseSessionService, AsyncRunner, AsyncSessionService
+from .compaction import (
+    CompactingDatabaseSessionService,
+    CompactingDeltaSessionService,
+    CompactionMixin,
+    compact_session,
+)
+from .delta_session_service import DeltaDatabaseSessionService
+from .group_commit import GroupCommitter, enable_group_commit
@@ -0,0 +1,178 @@
+"""Session I/O off the event loop: a dedicated I/O thread and a Runner that awaits it.
+
+ADK's Runner calls the session service synchronously (get_session at the
+start of a turn, append_event for every event), so with a database-backed
+service each SQLite read/commit blocks the event loop and every other
+coroutine — other sessions' turns, streaming output, the HTTP server.
+
+AsyncSessionService wraps any session service and adds *_async methods that
+run the wrapped call on its own I/O thread (one thread by default, which
+also serializes SQLite writers). The plain sync methods still work and go
+straight to the wrapped service, so it remains a drop-in for code that does
+not await. AsyncRunner is a Runner whose run_async awaits those methods.
+
+    session_service = AsyncDatabaseSessionService(db_url="sqlite:///./multi_agent_data.db")
+    runner = AsyncRunner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Optional
+
+from google.adk.agents.run_config import RunConfig
+from google.adk.events.event import Event
+from google.adk.runners import Runner
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListEventsResponse,
+    ListSessionsResponse,
+)
+from google.adk.sessions.session import Session
+from google.adk.telemetry import tracer
+from google.genai import types
+
+from agent_common.storage_profiles import apply_profile
+
+
+class AsyncSessionService(BaseSessionService):
+    """Runs a session service's I/O on dedicated thread(s).
+
+    Args:
+        inner: The service doing the actual I/O (e.g. a DatabaseSessionService)
+        io_threads: Size of the I/O thread pool
+    """
+
+    def __init__(self, inner: BaseSessionService, io_threads: int = 1):
+        self.inner = inner
+        self.executor = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="session-io")
+
+    def __getattr__(self, name):
+        # e.g. stats(), compact(), db_engine of the wrapped service
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    async def run_io(self, fn, /, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the I/O thread and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    # ===== Sync API (unchanged behaviour, runs on the caller's thread) =====
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        return self.inner.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return self.inner.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        return self.inner.list_events(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        return self.inner.append_event(session=session, event=event)
+
+    # ===== Async API (runs on the I/O thread) =====
+
+    async def create_session_async(self, **kwargs) -> Session:
+        return await self.run_io(self.inner.create_session, **kwargs)
+
+    async def get_session_async(self, **kwargs) -> Optional[Session]:
+        return await self.run_io(self.inner.get_session, **kwargs)
+
+    async def list_sessions_async(self, **kwargs) -> ListSessionsResponse:
+        return await self.run_io(self.inner.list_sessions, **kwargs)
+
+    async def delete_session_async(self, **kwargs) -> None:
+        await self.run_io(self.inner.delete_session, **kwargs)
+
+    async def append_event_async(self, session: Session, event: Event) -> Event:
+        return await self.run_io(self.inner.append_event, session=session, event=event)
+
+
+class AsyncDatabaseSessionService(AsyncSessionService):
+    """Drop-in for DatabaseSessionService(db_url=...) with async I/O methods."""
+
+    def __init__(self, db_url: str, io_threads: int = 1, profile: Optional[str] = None):
+        inner = DatabaseSessionService(db_url=db_url)
+        if profile:
+            apply_profile(inner, profile)
+        super().__init__(inner, io_threads=io_threads)
+
+
+class AsyncRunner(Runner):
+    """Runner that awaits session I/O on an AsyncSessionService's I/O thread.
+
+    With any other session service it behaves exactly like Runner.
+    """
+
+    async def run_async(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        new_message: types.Content,
+        run_config: RunConfig = RunConfig(),
+    ):
+        service = self.session_service
+        if not isinstance(service, AsyncSessionService):
+            async for event in super().run_async(
+                user_id=user_id, session_id=session_id, new_message=new_message, run_config=run_config
+            ):
+                yield event
+            return
+
+        # Same steps as Runner.run_async, with the session I/O awaited
+        with tracer.start_as_current_span("invocation"):
+            session = await service.get_session_async(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+            if not session:
+                raise ValueError(f"Session not found: {session_id}")
+
+            invocation_context = self._new_invocation_context(
+                session, new_message=new_message, run_config=run_config
+            )
+            if new_message:
+                # Artifact handling and the user event append, on the I/O thread
+                await service.run_io(
+                    self._append_new_message_to_session,
+                    session,
+                    new_message,
+                    invocation_context,
+                    run_config.save_input_blobs_as_artifacts,
+                )
+
+            invocation_context.agent = self._find_agent_to_run(session, self.agent)
+            async for event in invocation_context.agent.run_async(invocation_context):
+                if not event.partial:
+                    await service.append_event_async(session, event)
+                yield event
@@ -0,0 +1,346 @@
+"""Session snapshots and event compaction.
+
+DatabaseSessionService.get_session loads every event a session ever recorded,
+so resuming (and every turn, since the Runner loads the session) gets slower
+as the session ages. The state itself is already materialized in the
+database (sessions.state / session_state_entries); the old events are only
+history the model no longer sees verbatim (see agent_common/context_window.py).
+
+compact_session() keeps the last `keep_turns` turns (a turn starts at a user
+event) and, in one transaction:
+
+- writes a `session_snapshots` row: the boundary timestamp and running
+  totals of what was compacted (the state itself stays in the state rows)
+- moves older events to `events_archive` (same columns as `events`), or
+  deletes them with archive=False
+- updates state["conversation_summary"] so the removed turns stay summarized
+  (context_window.rebase_summary)
+
+CompactionMixin adds this to a session service: get_session reads only the
+events after the snapshot boundary (ordered, through an index), and
+compact_every=N compacts a session automatically once N events were
+appended since its last compaction. compact_sessions.py does the same
+offline for existing databases.
+"""
+import threading
+from typing import Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.database_session_service import (
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+    _decode_content,
+    _merge_state,
+)
+from google.adk.sessions.session import Session
+from google.genai import types
+from sqlalchemy import Index, Integer, MetaData, String, Table, delete, func, insert, inspect, select, text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import DateTime
+
+from agent_common.storage_profiles import apply_profile
+
+from .delta_session_service import DeltaDatabaseSessionService, StateBase, StorageStateEntry, delete_session_rows
+from .group_commit import enable_group_commit
+
+ARCHIVE_TABLE = "events_archive"
+SUMMARY_KEY = "conversation_summary"
+
+# The stock events table has no index for "events of one session by time"
+EVENTS_INDEX = Index(
+    "idx_events_session_time",
+    StorageEvent.app_name, StorageEvent.user_id, StorageEvent.session_id, StorageEvent.timestamp,
+)
+
+
+class StorageSnapshot(StateBase):
+    """Where a session was last compacted, and how much was compacted so far."""
+    __tablename__ = "session_snapshots"
+
+    app_name: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    session_id: Mapped[str] = mapped_column(String, primary_key=True)
+    # Events older than this were archived or dropped
+    boundary_time: Mapped[DateTime] = mapped_column(DateTime())
+    events_compacted: Mapped[int] = mapped_column(Integer, default=0)
+    turns_compacted: Mapped[int] = mapped_column(Integer, default=0)
+    update_time: Mapped[DateTime] = mapped_column(
+        DateTime(), default=func.now(), onupdate=func.now()
+    )
+
+
+def ensure_compaction_tables(engine) -> None:
+    """Create the snapshot/archive tables and the events index if missing."""
+    StorageSnapshot.__table__.create(engine, checkfirst=True)
+    EVENTS_INDEX.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        # Copy of the events table layout (columns only, no constraints)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} AS SELECT * FROM events WHERE 1 = 0"
+        ))
+
+
+def archive_table(engine) -> Table:
+    return Table(ARCHIVE_TABLE, MetaData(), autoload_with=engine)
+
+
+def _where_session(app_name: str, user_id: str, session_id: str) -> tuple:
+    return (
+        StorageEvent.app_name == app_name,
+        StorageEvent.user_id == user_id,
+        StorageEvent.session_id == session_id,
+    )
+
+
+def _to_event(e: StorageEvent) -> Event:
+    """Events-table row to Event (same conversion as DatabaseSessionService.get_session)."""
+    return Event(
+        id=e.id,
+        author=e.author,
+        branch=e.branch,
+        invocation_id=e.invocation_id,
+        content=_decode_content(e.content),
+        actions=e.actions,
+        timestamp=e.timestamp.timestamp(),
+        long_running_tool_ids=e.long_running_tool_ids,
+        grounding_metadata=e.grounding_metadata,
+        partial=e.partial,
+        turn_complete=e.turn_complete,
+        error_code=e.error_code,
+        error_message=e.error_message,
+        interrupted=e.interrupted,
+    )
+
+
+def _removed_contents(rows) -> list:
+    """Contents of the compacted events, as context_window.split_turns expects them."""
+    contents = []
+    for content, author in rows:
+        if not content or not content.get("parts"):
+            continue
+        content = types.Content.model_validate(content)
+        content.role = "user" if author == "user" else (content.role or "model")
+        contents.append(content)
+    return contents
+
+
+def compact_session(
+    service: DatabaseSessionService,
+    session: Session,
+    keep_turns: int = 20,
+    archive: bool = True,
+) -> dict:
+    """Snapshot `session` and remove all but its last `keep_turns` turns.
+
+    Args:
+        service: The session service owning the database (stock or delta)
+        session: The session as loaded from `service` (its state is snapshotted)
+        keep_turns: Turns kept in the events table
+        archive: Move old events to events_archive (False deletes them)
+
+    Returns:
+        Counts of what was compacted (all zero if the session is short enough)
+    """
+    key = (session.app_name, session.user_id, session.id)
+    result = {"events_compacted": 0, "turns_compacted": 0, "archived": archive}
+    with service.DatabaseSessionFactory() as db:
+        boundary = db.execute(
+            select(StorageEvent.timestamp)
+            .where(*_where_session(*key), StorageEvent.author == "user")
+            .order_by(StorageEvent.timestamp.desc())
+            .offset(max(keep_turns, 1) - 1)
+            .limit(1)
+        ).scalar()
+        if boundary is None:
+            return result
+
+        old = (*_where_session(*key), StorageEvent.timestamp < boundary)
+        rows = db.execute(
+            select(StorageEvent.content, StorageEvent.author).where(*old).order_by(StorageEvent.timestamp)
+        ).all()
+        if not rows:
+            return result
+        turns = sum(1 for _, author in rows if author == "user")
+
+        if archive:
+            table = archive_table(service.db_engine)
+            columns = [c.name for c in table.columns]
+            source = StorageEvent.__table__
+            db.execute(insert(table).from_select(
+                columns, select(*[source.c[name] for name in columns]).where(*old)
+            ))
+        db.execute(delete(StorageEvent).where(*old))
+
+        summary = None
+        try:
+            from agent_common.context_window import rebase_summary
+        except ImportError:
+            rebase_summary = None
+        if rebase_summary:
+            summary = rebase_summary(session.state.get(SUMMARY_KEY), _removed_contents(rows))
+        if summary is not None:
+            session.state[SUMMARY_KEY] = summary
+            _write_session_key(service, db, session, SUMMARY_KEY, summary)
+
+        snapshot = db.get(StorageSnapshot, key)
+        if snapshot is None:
+            snapshot = StorageSnapshot(
+                app_name=session.app_name, user_id=session.user_id, session_id=session.id,
+                events_compacted=0, turns_compacted=0,
+            )
+            db.add(snapshot)
+        snapshot.boundary_time = boundary
+        snapshot.events_compacted += len(rows)
+        snapshot.turns_compacted += turns
+        db.commit()
+
+        if not isinstance(service, DeltaDatabaseSessionService) and summary is not None:
+            # The stock service keeps state in the sessions row, whose
+            # update_time just moved: keep the in-memory session current
+            storage_session = db.get(StorageSession, key)
+            session.last_update_time = storage_session.update_time.timestamp()
+
+    result.update(events_compacted=len(rows), turns_compacted=turns)
+    return result
+
+
+def _write_session_key(service, db, session: Session, key: str, value) -> None:
+    if isinstance(service, DeltaDatabaseSessionService):
+        db.merge(StorageStateEntry(
+            app_name=session.app_name, user_id=session.user_id, session_id=session.id,
+            key=key, value=value,
+        ))
+    else:
+        storage_session = db.get(StorageSession, (session.app_name, session.user_id, session.id))
+        storage_session.state = {**storage_session.state, key: value}
+
+
+class CompactionMixin:
+    """Adds snapshot-aware loading and automatic compaction to a
+    DatabaseSessionService subclass.
+
+    Args:
+        db_url: Database URL, as for DatabaseSessionService
+        compact_every: Compact a session once this many events were appended
+            since its last compaction (a session this process has not compacted
+            yet counts the events it loaded); None only compacts on request
+        keep_turns: Turns kept in the events table by each compaction
+        archive: Move compacted events to events_archive instead of deleting them
+        profile: Storage profile name (see agent_common/storage_profiles.py), None for SQLAlchemy's defaults
+        commit_window: Group commit window in seconds (see group_commit.py), None to
+            commit every event on its own
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        compact_every: Optional[int] = None,
+        keep_turns: int = 20,
+        archive: bool = True,
+        profile: Optional[str] = None,
+        commit_window: Optional[float] = None,
+    ):
+        super().__init__(db_url=db_url)
+        if profile:
+            apply_profile(self, profile)
+        if commit_window:
+            enable_group_commit(self, window=commit_window)
+        ensure_compaction_tables(self.db_engine)
+        self.compact_every = compact_every
+        self.keep_turns = keep_turns
+        self.archive = archive
+        self._lock = threading.Lock()
+        # (app, user, session) -> events appended since the last compaction
+        self._pending: dict = {}
+        self.compaction_stats = {"compactions": 0, "events_compacted": 0}
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if config is not None:
+            return super().get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+        key = (app_name, user_id, session_id)
+        with self.DatabaseSessionFactory() as db:
+            storage_session = db.get(StorageSession, key)
+            if storage_session is None:
+                return None
+            storage_app_state = db.get(StorageAppState, (app_name))
+            storage_user_state = db.get(StorageUserState, (app_name, user_id))
+            session = Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=_merge_state(
+                    storage_app_state.state if storage_app_state else {},
+                    storage_user_state.state if storage_user_state else {},
+                    storage_session.state,
+                ),
+                last_update_time=storage_session.update_time.timestamp(),
+            )
+            session.events = self._load_events(db, *key)
+        if isinstance(self, DeltaDatabaseSessionService):
+            session.state.update(self._load_entries(*key))
+        with self._lock:
+            # Sessions not compacted by this process count what they loaded
+            self._pending.setdefault(key, len(session.events))
+        return session
+
+    def _load_events(self, db, app_name: str, user_id: str, session_id: str) -> list:
+        """Events after the session's snapshot boundary, oldest first."""
+        query = select(StorageEvent).where(*_where_session(app_name, user_id, session_id))
+        snapshot = db.get(StorageSnapshot, (app_name, user_id, session_id))
+        if snapshot is not None:
+            query = query.where(StorageEvent.timestamp >= snapshot.boundary_time)
+        return [_to_event(e) for e in db.scalars(query.order_by(StorageEvent.timestamp))]
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        event = super().append_event(session=session, event=event)
+        if event.partial or not self.compact_every:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            pending = self._pending.get(key, 0) + 1
+            self._pending[key] = pending
+        # Compact between turns only, so no turn is split (its user event starts the next one)
+        if pending >= self.compact_every and event.author == "user":
+            self.compact(session)
+        return event
+
+    def compact(self, session: Session) -> dict:
+        """Compact `session` now with this service's settings."""
+        result = compact_session(self, session, keep_turns=self.keep_turns, archive=self.archive)
+        key = (session.app_name, session.user_id, session.id)
+        with self._lock:
+            self._pending[key] = 0
+            if result["events_compacted"]:
+                self.compaction_stats["compactions"] += 1
+                self.compaction_stats["events_compacted"] += result["events_compacted"]
+        return result
+
+    def delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        # Snapshot and archived events go in the same transaction as the session
+        delete_session_rows(self, app_name, user_id, session_id)
+
+
+class CompactingDeltaSessionService(CompactionMixin, DeltaDatabaseSessionService):
+    """DeltaDatabaseSessionService with snapshots and event compaction."""
+
+
+class CompactingDatabaseSessionService(CompactionMixin, DatabaseSessionService):
+    """Stock DatabaseSessionService with snapshots and event compaction."""
+
+
+def has_delta_entries(engine) -> bool:
+    """Whether a database was written by DeltaDatabaseSessionService."""
+    return inspect(engine).has_table(StorageStateEntry.__tablename__)
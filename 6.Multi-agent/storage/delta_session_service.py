@@ -0,0 +1,419 @@
+import base64
+import copy
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig
+from google.adk.sessions.database_session_service import (
+    DynamicJSON,
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+)
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+from sqlalchemy import Integer, String, Text, delete, func, inspect, select, text
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.types import DateTime
+
+from agent_common.latest_session import ensure_latest_session_index, get_latest_session
+from agent_common.storage_profiles import apply_profile
+
+from .group_commit import enable_group_commit
+from .ops import LOG_ENTRIES_KEY, OPS_KEY, RESULTS_KEY, apply_ops, normalize_ops
+
+# Tables with rows keyed by (app_name, user_id, session_id) that belong to one
+# session: its state entries, the compaction snapshot and archived events
+# (compaction.py) and the full conversation log (conversation_log.py)
+SESSION_TABLES = ("session_state_entries", "session_snapshots", "events_archive", "conversation_log")
+
+
+class StateBase(DeclarativeBase):
+    """Declarative base for the tables owned by this module."""
+    pass
+
+
+class StorageStateEntry(StateBase):
+    """One top-level session state key, stored in its own row."""
+    __tablename__ = "session_state_entries"
+
+    app_name: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    session_id: Mapped[str] = mapped_column(String, primary_key=True)
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[Any] = mapped_column(DynamicJSON, nullable=True)
+    update_time: Mapped[DateTime] = mapped_column(
+        DateTime(), default=func.now(), onupdate=func.now()
+    )
+
+
+class StorageLogEntry(StateBase):
+    """One entry of a session log (conversation_log.py), in insertion order."""
+    __tablename__ = "conversation_log"
+
+    app_name: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    session_id: Mapped[str] = mapped_column(String, primary_key=True)
+    log_name: Mapped[str] = mapped_column(String, primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    timestamp: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    entry: Mapped[str] = mapped_column(Text)
+
+
+def split_state(state: Optional[dict]) -> tuple:
+    """Split a state/delta dict into (app, user, session) parts, dropping temp: keys."""
+    app_state, user_state, session_state = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(State.APP_PREFIX):
+            app_state[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user_state[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session_state[key] = value
+    return app_state, user_state, session_state
+
+
+def delete_session_rows(service: DatabaseSessionService, app_name: str, user_id: str, session_id: str) -> None:
+    """Delete a session, its events and its rows in SESSION_TABLES in one transaction."""
+    existing = set(inspect(service.db_engine).get_table_names())
+    params = {"app_name": app_name, "user_id": user_id, "session_id": session_id}
+    with service.DatabaseSessionFactory() as db:
+        for table in SESSION_TABLES:
+            if table in existing:
+                db.execute(text(
+                    f"DELETE FROM {table} "
+                    "WHERE app_name = :app_name AND user_id = :user_id AND session_id = :session_id"
+                ), params)
+        # Explicitly: SQLite only cascades to events with PRAGMA foreign_keys on
+        db.execute(delete(StorageEvent).where(
+            StorageEvent.app_name == app_name,
+            StorageEvent.user_id == user_id,
+            StorageEvent.session_id == session_id,
+        ))
+        db.execute(delete(StorageSession).where(
+            StorageSession.app_name == app_name,
+            StorageSession.user_id == user_id,
+            StorageSession.id == session_id,
+        ))
+        db.commit()
+
+
+class DeltaDatabaseSessionService(DatabaseSessionService):
+    """DatabaseSessionService that persists only the state keys an event changed.
+
+    The stock service rewrites the whole `sessions.state` JSON column on every
+    append_event, so write cost grows with the size of the state. Here each
+    top-level session key lives in its own `session_state_entries` row and
+    append_event only upserts the keys present in the event's state_delta
+    (the keys tools wrote through ToolContext.state).
+
+    Sessions created by the stock service keep working: their `sessions.state`
+    column is read as the base and entry rows override it key by key.
+
+    Operations recorded by state_ops.py (append, incr, set_add, ...) are
+    replayed on the stored values inside the write transaction, and the
+    event's state_delta gets the resulting values. Log entries recorded by
+    conversation_log.py go to the conversation_log table in the same
+    transaction (read them back with read_log).
+
+    `profile` names a storage profile (see agent_common/storage_profiles.py) for the engine, and
+    `commit_window` (seconds) turns on group commit (see group_commit.py).
+    """
+
+    # Set by enable_group_commit()
+    group_committer = None
+
+    def __init__(
+        self,
+        db_url: str,
+        profile: Optional[str] = None,
+        commit_window: Optional[float] = None,
+    ):
+        super().__init__(db_url=db_url)
+        if profile:
+            apply_profile(self, profile)
+        if commit_window:
+            enable_group_commit(self, window=commit_window)
+        StateBase.metadata.create_all(self.db_engine)
+        ensure_latest_session_index(self.db_engine)
+
+    def get_latest_session(self, *, app_name: str, user_id: str) -> Optional[Session]:
+        """The user's most recently updated session, found through an index."""
+        return get_latest_session(self, app_name, user_id)
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        app_delta, user_delta, session_state = split_state(state)
+
+        with self.DatabaseSessionFactory() as db:
+            storage_app_state = db.get(StorageAppState, (app_name))
+            storage_user_state = db.get(StorageUserState, (app_name, user_id))
+            if not storage_app_state:
+                storage_app_state = StorageAppState(app_name=app_name, state={})
+                db.add(storage_app_state)
+            if not storage_user_state:
+                storage_user_state = StorageUserState(app_name=app_name, user_id=user_id, state={})
+                db.add(storage_user_state)
+
+            app_state = dict(storage_app_state.state or {})
+            user_state = dict(storage_user_state.state or {})
+            if app_delta:
+                app_state.update(app_delta)
+                storage_app_state.state = app_state
+            if user_delta:
+                user_state.update(user_delta)
+                storage_user_state.state = user_state
+
+            # The sessions.state column stays empty; keys go to entry rows
+            storage_session = StorageSession(
+                app_name=app_name, user_id=user_id, id=session_id, state={}
+            )
+            db.add(storage_session)
+            db.flush()
+            for key, value in session_state.items():
+                db.add(StorageStateEntry(
+                    app_name=app_name,
+                    user_id=user_id,
+                    session_id=storage_session.id,
+                    key=key,
+                    value=value,
+                ))
+            db.commit()
+            db.refresh(storage_session)
+
+            return Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=storage_session.id,
+                state=_merge(app_state, user_state, session_state),
+                last_update_time=storage_session.update_time.timestamp(),
+            )
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        session = super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session is None:
+            return None
+        session.state.update(self._load_entries(app_name, user_id, session_id))
+        return session
+
+    def delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        delete_session_rows(self, app_name, user_id, session_id)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+
+        if self.group_committer is not None:
+            # Committed together with other sessions' writes (see group_commit.py)
+            update_time = self.group_committer.submit(
+                lambda db: self._write_event(db, session, event), finish=_update_timestamp
+            ).result()
+        else:
+            with self.DatabaseSessionFactory() as db:
+                storage_session = self._write_event(db, session, event)
+                db.commit()
+                update_time = _update_timestamp(storage_session)
+        session.last_update_time = update_time
+
+        # Update the in-memory session the same way the base service does
+        BaseSessionService.append_event(self, session=session, event=event)
+        # Recording operations also wrote their bookkeeping into the session
+        # dict (State writes through); it belongs to this event only
+        for key in (OPS_KEY, RESULTS_KEY, LOG_ENTRIES_KEY):
+            session.state.pop(key, None)
+        return event
+
+    def _write_event(self, db, session: Session, event: Event) -> StorageSession:
+        """Stage the rows for `event` in the open DB session (without committing)."""
+        storage_session = db.get(
+            StorageSession, (session.app_name, session.user_id, session.id)
+        )
+        if storage_session.update_time.timestamp() > session.last_update_time:
+            raise ValueError(
+                f"Session last_update_time {session.last_update_time} is later than"
+                f" the update_time in storage {storage_session.update_time}"
+            )
+
+        self._stage_state_delta(db, session, event)
+        self._stage_log_entries(db, session, event)
+        db.add(_to_storage_event(session, event))
+
+        # Only bump the timestamp; the (possibly large) state column is untouched
+        storage_session.update_time = func.now()
+        return storage_session
+
+    def _stage_state_delta(self, db, session: Session, event: Event) -> None:
+        """Add the rows for the keys changed by `event` to the open DB session."""
+        if not event.actions or not event.actions.state_delta:
+            return
+        if event.actions.state_delta.get(OPS_KEY):
+            # Plain writes to the keys of the recorded operations become "set"
+            # operations among them; replay them all on the stored values, then
+            # continue with (and hand back to the caller) the values they produce
+            state_delta = normalize_ops(event.actions.state_delta)
+            state_delta.update(self._replay_state_ops(db, session, state_delta[OPS_KEY]))
+        app_delta, user_delta, session_delta = split_state(event.actions.state_delta)
+
+        if app_delta:
+            storage_app_state = db.get(StorageAppState, (session.app_name))
+            storage_app_state.state = {**storage_app_state.state, **app_delta}
+        if user_delta:
+            storage_user_state = db.get(StorageUserState, (session.app_name, session.user_id))
+            storage_user_state.state = {**storage_user_state.state, **user_delta}
+        for key, value in session_delta.items():
+            db.merge(StorageStateEntry(
+                app_name=session.app_name,
+                user_id=session.user_id,
+                session_id=session.id,
+                key=key,
+                value=value,
+            ))
+
+    @staticmethod
+    def _stage_log_entries(db, session: Session, event: Event) -> None:
+        """Append the event's log entries after the last stored one of each log."""
+        next_seq = {}
+        for row in (event.actions.state_delta.get(LOG_ENTRIES_KEY) if event.actions else None) or ():
+            log_name = row["log"]
+            if log_name not in next_seq:
+                last = db.execute(select(func.max(StorageLogEntry.seq)).where(
+                    StorageLogEntry.app_name == session.app_name,
+                    StorageLogEntry.user_id == session.user_id,
+                    StorageLogEntry.session_id == session.id,
+                    StorageLogEntry.log_name == log_name,
+                )).scalar()
+                next_seq[log_name] = (last or 0) + 1
+            db.add(StorageLogEntry(
+                app_name=session.app_name,
+                user_id=session.user_id,
+                session_id=session.id,
+                log_name=log_name,
+                seq=next_seq[log_name],
+                timestamp=row["entry"].get("timestamp"),
+                entry=json.dumps(row["entry"]),
+            ))
+            next_seq[log_name] += 1
+
+    def read_log(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        log_name: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> list:
+        """Entries of one session log, oldest first (state only keeps the last few)."""
+        with self.DatabaseSessionFactory() as db:
+            rows = db.execute(
+                select(StorageLogEntry.entry).where(
+                    StorageLogEntry.app_name == app_name,
+                    StorageLogEntry.user_id == user_id,
+                    StorageLogEntry.session_id == session_id,
+                    StorageLogEntry.log_name == log_name,
+                ).order_by(StorageLogEntry.seq).limit(limit).offset(offset)
+            ).scalars().all()
+        return [json.loads(entry) for entry in rows]
+
+    def _replay_state_ops(self, db, session: Session, ops: list) -> dict:
+        """{key: value} after applying state_ops operations to what is stored now."""
+        def stored_value(key: str):
+            if key.startswith(State.APP_PREFIX):
+                row = db.get(StorageAppState, (session.app_name))
+                return (row.state if row else {}).get(key.removeprefix(State.APP_PREFIX))
+            if key.startswith(State.USER_PREFIX):
+                row = db.get(StorageUserState, (session.app_name, session.user_id))
+                return (row.state if row else {}).get(key.removeprefix(State.USER_PREFIX))
+            entry = db.get(StorageStateEntry, (session.app_name, session.user_id, session.id, key))
+            if entry is not None:
+                return entry.value
+            # Sessions created by the stock service: the value is in sessions.state
+            storage_session = db.get(StorageSession, (session.app_name, session.user_id, session.id))
+            return (storage_session.state or {}).get(key)
+
+        return apply_ops(stored_value, ops)
+
+    def _load_entries(self, app_name: str, user_id: str, session_id: str) -> dict:
+        with self.DatabaseSessionFactory() as db:
+            rows = db.execute(
+                select(StorageStateEntry.key, StorageStateEntry.value).where(
+                    StorageStateEntry.app_name == app_name,
+                    StorageStateEntry.user_id == user_id,
+                    StorageStateEntry.session_id == session_id,
+                )
+            ).all()
+        return {key: value for key, value in rows}
+
+
+def _merge(app_state: dict, user_state: dict, session_state: dict) -> dict:
+    merged = copy.deepcopy(session_state)
+    for key, value in app_state.items():
+        merged[State.APP_PREFIX + key] = value
+    for key, value in user_state.items():
+        merged[State.USER_PREFIX + key] = value
+    return merged
+
+
+def _update_timestamp(storage_session: StorageSession) -> float:
+    """update_time of a just-committed session row (reloaded from the database)."""
+    return storage_session.update_time.timestamp()
+
+
+def _to_storage_event(session: Session, event: Event) -> StorageEvent:
+    """Build the events-table row for `event` (same encoding as DatabaseSessionService)."""
+    actions = event.actions
+    if actions and (actions.state_delta.get(OPS_KEY) or LOG_ENTRIES_KEY in actions.state_delta):
+        # The recorded operations describe these keys; their full values are in
+        # state, and the log entries in the conversation_log table
+        dropped = {op["path"][0] for op in actions.state_delta.get(OPS_KEY) or ()} | {LOG_ENTRIES_KEY}
+        actions = actions.model_copy(update={"state_delta": {
+            key: value for key, value in actions.state_delta.items() if key not in dropped
+        }})
+    storage_event = StorageEvent(
+        id=event.id,
+        invocation_id=event.invocation_id,
+        author=event.author,
+        branch=event.branch,
+        actions=actions,
+        session_id=session.id,
+        app_name=session.app_name,
+        user_id=session.user_id,
+        timestamp=datetime.fromtimestamp(event.timestamp),
+        long_running_tool_ids=event.long_running_tool_ids,
+        grounding_metadata=event.grounding_metadata,
+        partial=event.partial,
+        turn_complete=event.turn_complete,
+        error_code=event.error_code,
+        error_message=event.error_message,
+        interrupted=event.interrupted,
+    )
+    if event.content:
+        encoded_content = event.content.model_dump(exclude_none=True)
+        # Same workaround as the stock service for binary inline_data
+        for p in encoded_content["parts"]:
+            if "inline_data" in p:
+                p["inline_data"]["data"] = (
+                    base64.b64encode(p["inline_data"]["data"]).decode("utf-8"),
+                )
+        storage_event.content = encoded_content
+    return storage_event
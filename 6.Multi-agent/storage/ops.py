@@ -0,0 +1,154 @@
+"""State operations: their format and how they are applied.
+
+Operations recorded by state_ops.py travel in an event's state_delta under
+OPS_KEY, as a list of {"op": kind, "value": ..., "path": [key, ...]} dicts
+(kinds: set, incr, merge, append, extend, set_add, bits). The session service
+(DeltaDatabaseSessionService) replays them on the stored values inside its
+write transaction; tool_execution.merge_state_deltas replays them to combine
+parallel tool calls. Both first call normalize_ops, then write the delta's
+plain values for the other keys, then apply the operations.
+
+Bitsets ("bits") are stored as base64 of the zlib-compressed bytes, bit i of
+byte i // 8 being member i; encode_bitset/decode_bitset convert them. A bits
+operation's value is {"clear": bitset, "discard": [ids], "add": [ids]}
+(each optional, applied in that order): "clear" removes every member of a
+bitset in the same encoding, so clearing a large set of ids stays small.
+"""
+import base64
+import zlib
+from typing import Any, Callable, Iterable
+
+OPS_KEY = "temp:state_ops"
+
+# The value the last operation on each key produced, to tell a later plain
+# write apart from it; dropped by normalize_ops
+RESULTS_KEY = "temp:state_ops_results"
+
+# Log rows ({"log": log name, "entry": ...}) recorded by conversation_log.py,
+# which the session service appends to its conversation_log table with the
+# event. Each context collects its own list (state_ops.collect); merges
+# concatenate them
+LOG_ENTRIES_KEY = "temp:log_entries"
+
+
+def missing_values(present: list, values: Iterable) -> list:
+    """The `values` not in `present`, each once, in order."""
+    added = []
+    try:
+        seen = set(present)
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                added.append(value)
+    except TypeError:
+        # Unhashable items (dicts, lists): compare one by one
+        added = []
+        for value in values:
+            if value not in present and value not in added:
+                added.append(value)
+    return added
+
+
+def decode_bitset(value: Any) -> bytearray:
+    """The bytes of a stored bitset (missing or unreadable: empty)."""
+    if not value:
+        return bytearray()
+    try:
+        return bytearray(zlib.decompress(base64.b64decode(value)))
+    except (TypeError, ValueError, zlib.error):
+        return bytearray()
+
+
+def encode_bitset(bits: bytes) -> str:
+    """The stored form of a bitset: compressed base64, trailing zero bytes dropped."""
+    return base64.b64encode(zlib.compress(bytes(bits).rstrip(b"\0"))).decode("ascii")
+
+
+def _apply_bits(current: Any, change: dict) -> str:
+    bits = decode_bitset(current)
+    if change.get("clear"):
+        mask = decode_bitset(change["clear"])
+        kept = int.from_bytes(bits, "little") & ~int.from_bytes(mask, "little")
+        bits = bytearray(kept.to_bytes(len(bits), "little"))
+    for member in change.get("discard") or ():
+        if member >> 3 < len(bits):
+            bits[member >> 3] &= ~(1 << (member & 7)) & 0xFF
+    for member in change.get("add") or ():
+        if member >> 3 >= len(bits):
+            bits.extend(bytes((member >> 3) + 1 - len(bits)))
+        bits[member >> 3] |= 1 << (member & 7)
+    return encode_bitset(bits)
+
+
+def _apply_leaf(current: Any, op: dict) -> Any:
+    kind = op["op"]
+    if kind == "set":
+        return op["value"]
+    if kind == "bits":
+        return _apply_bits(current, op["value"])
+    if kind == "incr":
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + op["value"]
+    if kind == "merge":
+        return {**(current if isinstance(current, dict) else {}), **op["value"]}
+
+    values = list(current) if isinstance(current, list) else ([] if current is None else [current])
+    if kind == "append":
+        values.append(op["value"])
+    elif kind == "extend":
+        values.extend(op["value"])
+    elif kind == "set_add":
+        values.extend(missing_values(values, op["value"]))
+    else:
+        raise ValueError(f"Unknown state operation {kind!r}")
+    limit = op.get("limit")
+    return values[-limit:] if limit else values
+
+
+def apply_op(current: Any, op: dict) -> Any:
+    """New value of the state key `op["path"][0]`, given its `current` value.
+
+    Containers along the path are copied, so `current` is left unchanged.
+    """
+    def walk(value, path):
+        if not path:
+            return _apply_leaf(value, op)
+        container = dict(value) if isinstance(value, dict) else {}
+        container[path[0]] = walk(container.get(path[0]), path[1:])
+        return container
+
+    return walk(current, op["path"][1:])
+
+
+def apply_ops(get_current: Callable[[str], Any], ops: Iterable[dict]) -> dict:
+    """Replay `ops` in order; returns {state key: new value} for the keys they touch.
+
+    `get_current(key)` is called once per key for its value before the ops.
+    """
+    results = {}
+    for op in ops:
+        key = op["path"][0]
+        if key not in results:
+            results[key] = get_current(key)
+        results[key] = apply_op(results[key], op)
+    return results
+
+
+def set_op(key: str, value: Any) -> dict:
+    """The operation for a plain `state[key] = value` write."""
+    return {"op": "set", "value": value, "path": [key]}
+
+
+def normalize_ops(delta: dict) -> dict:
+    """Turn plain writes made after the last operation on a key into "set" operations.
+
+    Afterwards the operations under OPS_KEY describe every change to the keys
+    they touch, so the delta's own values for those keys can be ignored.
+    Changes `delta` in place and returns it.
+    """
+    results = delta.pop(RESULTS_KEY, None)
+    if results:
+        late = [set_op(key, delta[key]) for key, value in results.items() if key in delta and delta[key] != value]
+        if late:
+            delta[OPS_KEY] = [*(delta.get(OPS_KEY) or ()), *late]
+    return delta
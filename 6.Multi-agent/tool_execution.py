@@ -0,0 +1,443 @@
+"""Concurrent execution of the tool calls of one model response.
+
+When a model response contains several function calls (three
+get_stock_price calls for a multi-ticker question, or add_to_stock_watchlist
+next to set_favorite_agent), ADK runs them one after another, so blocking
+calls such as a yfinance fetch add up. ConcurrentToolExecutor runs the calls
+of one response at the same time instead:
+
+- plain (sync) function tools run on a bounded thread pool, so they neither
+  block the event loop nor wait for each other; async tools (AgentTool, ...)
+  run as tasks on the loop
+- before/after tool callbacks run on the loop, in the call's own task
+- each call gets its own ToolContext, over a copy of the session state, with
+  its own EventActions; once all calls are done, their state deltas are
+  merged in call order: operations recorded through state_ops
+  (temp:state_ops) are concatenated and replayed on the values the session
+  had before the response, so the result does not depend on which call
+  finished first. The merged delta is then applied to the session state
+
+Calls of one response must be independent of each other, which is what the
+model assumes when it emits them together. Tools that still read, modify and
+write back a whole state value (instead of using state_ops) get the value
+of the last call that wrote it.
+
+Agents opt in by being a ConcurrentToolsAgent (an LlmAgent whose flow hands
+its function calls to the shared executor); every other agent in the process
+keeps ADK's sequential function-call step. ADK's own merge of the response
+events keeps only the state delta of the last call, which drops the
+temp:state_ops of the others; ConcurrentToolsAgents get the merge above even
+with MULTI_AGENT_CONCURRENT_TOOLS=0, which runs their tool calls one after
+another again. MULTI_AGENT_TOOL_WORKERS (default 8) bounds the thread pool.
+
+Tools that wait on the network are marked with @blocking_tool: they run on
+the same pool under a timeout (MULTI_AGENT_TOOL_TIMEOUT, default 15 seconds)
+and answer the model with a structured timeout error instead of hanging the
+turn, also for agents without concurrent tools. For a ConcurrentToolsAgent
+the state written by a call that timed out (before or after the timeout)
+is dropped; other agents share ADK's ToolContext with the call's thread.
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.flows.llm_flows import functions
+from google.adk.flows.llm_flows.auto_flow import AutoFlow
+from google.adk.flows.llm_flows.single_flow import SingleFlow
+from google.adk.telemetry import trace_tool_call, trace_tool_response, tracer
+from google.adk.tools.function_tool import FunctionTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from storage.ops import LOG_ENTRIES_KEY, OPS_KEY, RESULTS_KEY, apply_ops, normalize_ops, set_op
+
+CONCURRENT_TOOLS = os.getenv("MULTI_AGENT_CONCURRENT_TOOLS", "1") not in ("0", "false", "no")
+TOOL_WORKERS = int(os.getenv("MULTI_AGENT_TOOL_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("MULTI_AGENT_TOOL_TIMEOUT", "15"))
+
+# Set for the worker-thread context of a blocking call that timed out or was cancelled
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "tool_cancel_event", default=None
+)
+
+
+def merge_state_deltas(base: dict, deltas: list) -> dict:
+    """Combine the state deltas of parallel tool calls as if they ran in list order.
+
+    Applies each delta the way the storage layer does (storage.ops.normalize_ops,
+    then the plain values, then the operations) on top of the ones before it.
+    A plain write and operations on the same key in different calls are kept
+    in call order by recording the plain write as a "set" operation.
+
+    Args:
+        base: Session state before the calls (read only)
+        deltas: One state_delta per call, in call order
+
+    Returns:
+        The merged delta: plain values (a later call wins), the new values of
+        keys changed through state_ops, all recorded operations under OPS_KEY
+        and the log entries of every call under LOG_ENTRIES_KEY
+    """
+    merged, ops_in_order, op_keys = {}, [], set()
+
+    def current(key):
+        return merged[key] if key in merged else base.get(key)
+
+    for delta in deltas:
+        ops = normalize_ops(delta).get(OPS_KEY) or []
+        keys = {op["path"][0] for op in ops}
+        for key, value in delta.items():
+            # A key changed through operations gets its value from the replay below
+            if key == OPS_KEY or key in keys:
+                continue
+            if key == LOG_ENTRIES_KEY:
+                # Each call's log entries are kept
+                merged[key] = [*merged.get(key, ()), *value]
+                continue
+            merged[key] = value
+            if key in op_keys:
+                # Overwrites the operations of an earlier call
+                ops_in_order.append(set_op(key, value))
+        if ops:
+            # Plain writes of earlier calls come before these operations
+            ops_in_order.extend(set_op(key, merged[key]) for key in keys - op_keys if key in merged)
+            merged.update(apply_ops(current, ops))
+            ops_in_order.extend(ops)
+            op_keys |= keys
+    if ops_in_order:
+        merged[OPS_KEY] = ops_in_order
+    return merged
+
+
+class ConcurrentToolExecutor:
+    """Runs the function calls of one model response concurrently.
+
+    Args:
+        max_workers: Threads for sync function tools (shared by all sessions)
+        enabled: When False, tool calls run one after another (their state
+            deltas are still merged in call order)
+    """
+
+    def __init__(self, max_workers: int = TOOL_WORKERS, enabled: bool = CONCURRENT_TOOLS):
+        self.max_workers = max_workers
+        self.enabled = enabled
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-worker")
+        self._lock = threading.Lock()
+        self.counters = {"responses": 0, "calls": 0, "concurrent_responses": 0, "largest_response": 0}
+        self.timeouts: dict = {}  # tool name -> calls that timed out
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "timeouts": dict(self.timeouts),
+                "enabled": self.enabled,
+                "max_workers": self.max_workers,
+            }
+
+    def record_timeout(self, tool_name: str) -> None:
+        with self._lock:
+            self.timeouts[tool_name] = self.timeouts.get(tool_name, 0) + 1
+
+    async def handle_function_calls(
+        self,
+        invocation_context,
+        function_call_event: Event,
+        tools_dict: dict,
+        filters: Optional[set] = None,
+    ) -> Optional[Event]:
+        """Drop-in for ADK's handle_function_calls_async: the merged function response event."""
+        function_calls = [
+            fc for fc in function_call_event.get_function_calls()
+            if not filters or fc.id in filters
+        ]
+        if not function_calls:
+            return None
+        for function_call in function_calls:
+            if function_call.name not in tools_dict:
+                raise ValueError(f"Function {function_call.name} is not found in the tools_dict.")
+        with self._lock:
+            self.counters["responses"] += 1
+            self.counters["calls"] += len(function_calls)
+            self.counters["concurrent_responses"] += self.enabled and len(function_calls) > 1
+            self.counters["largest_response"] = max(self.counters["largest_response"], len(function_calls))
+
+        state = invocation_context.session.state
+        base = dict(state)
+        agent = invocation_context.agent
+        calls = [
+            (tools_dict[fc.name], fc.args or {}, functools.partial(_call_context, invocation_context, fc.id))
+            for fc in function_calls
+        ]
+        if self.enabled:
+            results = await asyncio.gather(*(self._run_call(agent, *call) for call in calls))
+        else:
+            results = []
+            for call in calls:
+                results.append(await self._run_call(agent, *call))
+                # The next call starts from the state this one left
+                state.update(_plain_values(results[-1][1].actions.state_delta))
+
+        response_events = [
+            self._response_event(tool, response, tool_context, invocation_context)
+            for (tool, _, _), (response, tool_context) in zip(calls, results)
+            # A long-running tool may return nothing until it finishes
+            if not (tool.is_long_running and not response)
+        ]
+        if not response_events:
+            return None
+        merged_event = functions.merge_parallel_function_response_events(response_events)
+        merged = merge_state_deltas(base, [e.actions.state_delta for e in response_events])
+        merged_event.actions.state_delta = merged
+        # The calls wrote into their own copies of the state; settle it in call order
+        state.update(_plain_values(merged))
+        if len(response_events) > 1:
+            with tracer.start_as_current_span("tool_response"):
+                trace_tool_response(
+                    invocation_context=invocation_context,
+                    event_id=merged_event.id,
+                    function_response_event=merged_event,
+                )
+        return merged_event
+
+    async def _run_call(self, agent, tool, args: dict, make_context) -> tuple:
+        """Run one call; returns (response, the ToolContext its event is built from)."""
+        tool_context = make_context()
+        response = None
+        if agent.before_tool_callback:
+            response = agent.before_tool_callback(tool=tool, args=args, tool_context=tool_context)
+        if not response:
+            with tracer.start_as_current_span(f"tool_call [{tool.name}]"):
+                trace_tool_call(args=args)
+                try:
+                    response = await self._call_tool(tool, args, tool_context)
+                except asyncio.TimeoutError:
+                    if not isinstance(tool, BlockingTool):
+                        raise
+                    # The call's thread may still write to its context: leave
+                    # it that one and answer (and run the callback) with a new one
+                    self.record_timeout(tool.name)
+                    tool_context = make_context()
+                    response = tool.timeout_error()
+        if agent.after_tool_callback:
+            new_response = agent.after_tool_callback(
+                tool=tool, args=args, tool_context=tool_context, tool_response=response
+            )
+            if new_response:
+                response = new_response
+        return response, tool_context
+
+    async def _call_tool(self, tool, args: dict, tool_context: ToolContext) -> Any:
+        if isinstance(tool, BlockingTool):
+            # Raises asyncio.TimeoutError instead of answering with the error
+            return await tool.call(args, tool_context)
+        func = getattr(tool, "func", None)
+        if not isinstance(tool, FunctionTool) or inspect.iscoroutinefunction(func):
+            return await tool.run_async(args=args, tool_context=tool_context)
+        # Same argument handling as FunctionTool.run_async, but on a worker thread
+        call_args = dict(args)
+        if "tool_context" in inspect.signature(func).parameters:
+            call_args["tool_context"] = tool_context
+        return await self.run_blocking(func, (), call_args) or {}
+
+    async def run_blocking(self, func, args: tuple, kwargs: dict, timeout: Optional[float] = None) -> Any:
+        """Run func(*args, **kwargs) on the tool thread pool and await it.
+
+        Raises asyncio.TimeoutError after `timeout` seconds. A call that times
+        out or is cancelled before a worker picked it up never runs; one that
+        is already running keeps its thread until it returns, and sees
+        tool_cancelled() turn True.
+        """
+        cancel = threading.Event()
+        context = contextvars.copy_context()
+        context.run(_cancel_event.set, cancel)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._pool, functools.partial(context.run, func, *args, **kwargs)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            cancel.set()
+            raise
+
+    @staticmethod
+    def _response_event(tool, response, tool_context: ToolContext, invocation_context) -> Event:
+        with tracer.start_as_current_span(f"tool_response [{tool.name}]"):
+            if not isinstance(response, dict):
+                response = {"result": response}
+            part = types.Part.from_function_response(name=tool.name, response=response)
+            part.function_response.id = tool_context.function_call_id
+            event = Event(
+                invocation_id=invocation_context.invocation_id,
+                author=invocation_context.agent.name,
+                content=types.Content(role="user", parts=[part]),
+                actions=tool_context.actions,
+                branch=invocation_context.branch,
+            )
+            trace_tool_response(
+                invocation_context=invocation_context,
+                event_id=event.id,
+                function_response_event=event,
+            )
+            return event
+
+
+def _call_context(invocation_context, function_call_id: str) -> ToolContext:
+    """A ToolContext for one call, over its own copy of the session state.
+
+    Its writes stay there and in its own EventActions until the executor
+    merges the deltas of all calls into the session.
+    """
+    session = invocation_context.session
+    own_session = session.model_copy(update={"state": dict(session.state)})
+    return ToolContext(
+        invocation_context.model_copy(update={"session": own_session}),
+        function_call_id=function_call_id,
+        event_actions=EventActions(),
+    )
+
+
+def _plain_values(delta: dict) -> dict:
+    """`delta` without the recorded operations, their bookkeeping and the log entries."""
+    return {key: value for key, value in delta.items() if key not in (OPS_KEY, RESULTS_KEY, LOG_ENTRIES_KEY)}
+
+
+_executor: Optional[ConcurrentToolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ConcurrentToolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ConcurrentToolExecutor()
+    return _executor
+
+
+def set_tool_executor(executor: Optional[ConcurrentToolExecutor]) -> None:
+    """Replace the shared executor (e.g. another pool size); None resets it."""
+    global _executor
+    _executor = executor
+
+
+class _ConcurrentToolsFlow:
+    """Flow mixin: the function calls of a model response go through the shared executor."""
+
+    async def _postprocess_handle_function_calls_async(self, invocation_context, function_call_event, llm_request):
+        # Same steps as BaseLlmFlow's, with the executor in place of ADK's sequential step
+        function_response_event = await get_tool_executor().handle_function_calls(
+            invocation_context, function_call_event, llm_request.tools_dict
+        )
+        if not function_response_event:
+            return
+        auth_event = functions.generate_auth_event(invocation_context, function_response_event)
+        if auth_event:
+            yield auth_event
+        yield function_response_event
+        transfer_to_agent = function_response_event.actions.transfer_to_agent
+        if transfer_to_agent:
+            agent_to_run = self._get_agent_to_run(invocation_context, transfer_to_agent)
+            async for event in agent_to_run.run_async(invocation_context):
+                yield event
+
+
+class ConcurrentSingleFlow(_ConcurrentToolsFlow, SingleFlow):
+    pass
+
+
+class ConcurrentAutoFlow(_ConcurrentToolsFlow, AutoFlow):
+    pass
+
+
+class ConcurrentToolsAgent(LlmAgent):
+    """LlmAgent whose tool calls of one model response run concurrently.
+
+    Takes the same arguments as Agent; only the agents built with this class
+    use the shared executor, the rest of the process is unaffected.
+    """
+
+    @property
+    def _llm_flow(self):
+        # The flow LlmAgent would pick (transfers or not), with the executor
+        return ConcurrentAutoFlow() if isinstance(super()._llm_flow, AutoFlow) else ConcurrentSingleFlow()
+
+
+# ===== Blocking tools =====
+
+def tool_cancelled() -> bool:
+    """True inside a blocking tool whose call timed out or whose turn was cancelled.
+
+    Python can't stop a running thread, so long tools should check this
+    between steps and return early.
+    """
+    cancel = _cancel_event.get()
+    return cancel is not None and cancel.is_set()
+
+
+class BlockingTool(FunctionTool):
+    """FunctionTool for a sync function that blocks: runs on the tool thread pool with a timeout.
+
+    The declaration is built from the wrapped function as usual. After
+    `timeout` seconds (None: no limit) the model gets a structured error
+    instead of waiting for the call:
+
+        {"status": "error", "error_type": "timeout", "retryable": True, ...}
+    """
+
+    def __init__(self, func, timeout: Optional[float] = TOOL_TIMEOUT):
+        super().__init__(func)
+        self.timeout = timeout
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext) -> Any:
+        # Agents other than ConcurrentToolsAgent: the call shares ADK's
+        # ToolContext, so state the thread writes after a timeout still lands
+        # in the session; such tools should check tool_cancelled() first
+        try:
+            return await self.call(args, tool_context)
+        except asyncio.TimeoutError:
+            get_tool_executor().record_timeout(self.name)
+            return self.timeout_error()
+
+    async def call(self, args: dict, tool_context: ToolContext) -> Any:
+        """Run the function on the tool thread pool; raises asyncio.TimeoutError after `timeout`."""
+        call_args = dict(args)
+        if "tool_context" in inspect.signature(self.func).parameters:
+            call_args["tool_context"] = tool_context
+        return await get_tool_executor().run_blocking(self.func, (), call_args, self.timeout) or {}
+
+    def timeout_error(self) -> dict:
+        return {
+            "status": "error",
+            "error_type": "timeout",
+            "error_message": f"{self.name} did not finish within {self.timeout:g} seconds",
+            "retryable": True,
+        }
+
+
+def blocking_tool(func=None, *, timeout: Optional[float] = TOOL_TIMEOUT):
+    """Decorator that turns a blocking sync tool function into a BlockingTool.
+
+    The event loop keeps serving other sessions while the tool waits on the
+    network, also for agents without concurrent tools. Use the result in an
+    agent's `tools` like the plain function:
+
+        @blocking_tool(timeout=10)
+        def get_stock_price(ticker: str, tool_context: ToolContext) -> dict:
+            ...
+    """
+    def decorate(func):
+        return BlockingTool(func, timeout=timeout)
+
+    return decorate(func) if func is not None else decorate
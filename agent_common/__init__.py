@@ -0,0 +1,7 @@
+"""Modules shared by the 5.Persistent-Storage and 6.Multi-agent examples.
+
+The example folders are not Python packages, so their entry points
+(5.Persistent-Storage/main.py, 6.Multi-agent/persistent_multi_agent.py,
+manager/agent.py, ...) put the repository root on sys.path, and both import
+`agent_common.<module>` the same way.
+"""
@@ -0,0 +1,105 @@
+"""Terminal helpers shared by the interactive runners of lessons 5 and 6.
+
+StateObserver keeps the state shown before/after each turn up to date from
+the events the runner streams, instead of reloading the session. Each lesson
+passes the function that prints its own state layout. ResponseStreamer prints
+streamed response text inside the response box as it arrives.
+"""
+from typing import Callable
+
+
+# ANSI color codes for terminal output
+class Colors:
+    RESET = "\033[0m"
+    BOLD = "\033[1m"
+    UNDERLINE = "\033[4m"
+
+    # Foreground colors
+    BLACK = "\033[30m"
+    RED = "\033[31m"
+    GREEN = "\033[32m"
+    YELLOW = "\033[33m"
+    BLUE = "\033[34m"
+    MAGENTA = "\033[35m"
+    CYAN = "\033[36m"
+    WHITE = "\033[37m"
+
+    # Background colors
+    BG_BLACK = "\033[40m"
+    BG_RED = "\033[41m"
+    BG_GREEN = "\033[42m"
+    BG_YELLOW = "\033[43m"
+    BG_BLUE = "\033[44m"
+    BG_MAGENTA = "\033[45m"
+    BG_CYAN = "\033[46m"
+    BG_WHITE = "\033[47m"
+
+
+class StateObserver:
+    """Keeps a local copy of the session state up to date from streamed events.
+
+    Seeded once with the session state, then fed every event the runner yields,
+    so the state can be displayed before/after each turn without reloading the
+    session (and all of its events) from the database.
+
+    Args:
+        state: The session state to start from
+        render: Prints a state dict under a label (e.g. utils.render_state)
+    """
+
+    def __init__(self, state: dict, render: Callable[[dict, str], None]):
+        self.state = dict(state)
+        self._render = render
+
+    def apply(self, event):
+        """Apply an event's state_delta the same way the session service does."""
+        if event.partial or not event.actions or not event.actions.state_delta:
+            return
+        for key, value in event.actions.state_delta.items():
+            if not key.startswith("temp:"):
+                self.state[key] = value
+
+    def render(self, label: str):
+        self._render(self.state, label)
+
+
+class ResponseStreamer:
+    """Prints partial (streamed) response text as it arrives.
+
+    In streaming mode the runner's response printer hands partial events to
+    this class, which prints them inside the response box as soon as they
+    arrive; the final event, which repeats the whole text, then only closes
+    the box instead of printing it again.
+
+    Args:
+        title: Box title ("AGENT RESPONSE", "MULTI-AGENT RESPONSE")
+    """
+
+    def __init__(self, title: str = "AGENT RESPONSE"):
+        self.title = title
+        self.chunks = []
+
+    @property
+    def streaming(self) -> bool:
+        return bool(self.chunks)
+
+    def feed(self, event):
+        """Print the text of a partial event."""
+        parts = event.content.parts if event.content and event.content.parts else []
+        text = "".join(part.text for part in parts if part.text)
+        if not text:
+            return
+        if not self.chunks:
+            print(f"\n{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╔══ {self.title} {'═' * 41}{Colors.RESET}")
+            print(f"{Colors.CYAN}{Colors.BOLD}", end="")
+        print(text, end="", flush=True)
+        self.chunks.append(text)
+
+    def close(self, final=True):
+        """End the streamed block; returns the text streamed so far."""
+        text = "".join(self.chunks)
+        self.chunks = []
+        print(Colors.RESET)
+        if final:
+            print(f"{Colors.BG_BLUE}{Colors.WHITE}{Colors.BOLD}╚{'═' * 61}{Colors.RESET}\n")
+        return text
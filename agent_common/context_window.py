@@ -0,0 +1,307 @@
+"""History policy applied to every model request of a long-lived session.
+
+The interactive scripts resume the same session forever, and ADK sends every
+event of it to the model, so prompts (and model latency) grow without bound.
+HistoryPolicy runs as a before_model_callback and rewrites the request:
+
+- the last `keep_turns` turns (a turn starts at a user message) stay verbatim
+- older turns are folded, once, into a compact extractive summary kept in
+  state["conversation_summary"]; the request carries that summary instead
+- tool responses in the kept history (not the turn in progress) larger than
+  `tool_response_chars` are replaced by a truncated preview
+
+stats() keeps the approximate prompt sizes (characters / 4) before and after
+trimming; with `log` every request also prints them.
+
+Settings, read by HistoryPolicy.from_env with the app's prefix (MULTI_AGENT_,
+MEMORY_AGENT_): <prefix>HISTORY_TURNS (default 6, 0 disables trimming),
+<prefix>TOOL_RESPONSE_CHARS (default 2000), <prefix>LOG_TOKENS (default 1: print
+the per-request line; 0 turns it off).
+"""
+import json
+import os
+import threading
+from typing import Callable, Optional
+
+from google.genai import types
+
+HISTORY_TURNS = 6
+TOOL_RESPONSE_CHARS = 2000
+
+SUMMARY_KEY = "conversation_summary"
+CONTEXT_PREFIX = "For context:"
+
+
+def chain_callbacks(*callbacks: Optional[Callable]) -> Optional[Callable]:
+    """Combine callbacks: each runs in order until one returns a response.
+
+    Works for model, agent and tool callbacks alike (ADK passes their
+    arguments by keyword).
+
+    None entries are skipped, so chain_callbacks(agent.before_model_callback, new)
+    works whether or not the agent already had a callback.
+    """
+    callbacks = [c for c in callbacks if c is not None]
+    if len(callbacks) <= 1:
+        return callbacks[0] if callbacks else None
+
+    def chained(**kwargs):
+        for callback in callbacks:
+            response = callback(**kwargs)
+            if response is not None:
+                return response
+        return None
+
+    chained.callbacks = callbacks
+    return chained
+
+
+def estimate_tokens(contents) -> int:
+    """Rough prompt size: about four characters per token."""
+    chars = 0
+    for content in contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(part.function_call.name or "") + len(_dumps(part.function_call.args))
+            elif part.function_response:
+                chars += len(_dumps(part.function_response.response))
+    return chars // 4
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _is_user_message(content) -> bool:
+    # Replies of other agents also arrive as user contents ("For context: ...")
+    if content.role != "user" or not content.parts:
+        return False
+    if any(part.function_response for part in content.parts):
+        return False
+    first = content.parts[0].text
+    return first is not None and not first.startswith(CONTEXT_PREFIX)
+
+
+def split_turns(contents) -> tuple:
+    """Split request contents into (leading contents, [turn contents...])."""
+    leading, turns = [], []
+    for content in contents:
+        if _is_user_message(content):
+            turns.append([content])
+        elif turns:
+            turns[-1].append(content)
+        else:
+            leading.append(content)
+    return leading, turns
+
+
+def summarize_turn(turn) -> str:
+    """One summary line: the user message, tools used and the last reply."""
+    request = " ".join(p.text for p in turn[0].parts if p.text)
+    tools, reply = [], ""
+    for content in turn[1:]:
+        for part in content.parts or []:
+            if part.function_call and part.function_call.name not in tools:
+                tools.append(part.function_call.name)
+            elif part.text and content.role == "model":
+                reply = part.text
+            elif part.text and content.role == "user" and "] said: " in part.text:
+                reply = part.text.split("] said: ", 1)[1]
+    line = f"User: {_clip(request, 120)}"
+    if tools:
+        line += f" | tools: {', '.join(tools)}"
+    if reply:
+        line += f" | reply: {_clip(reply, 160)}"
+    return line
+
+
+def _add_lines(summary: dict, lines: list, max_lines: int) -> None:
+    lines = list(summary.get("lines", [])) + lines
+    omitted = summary.get("omitted", 0)
+    if len(lines) > max_lines:
+        omitted += len(lines) - max_lines
+        lines = lines[-max_lines:]
+    summary.update(lines=lines, omitted=omitted)
+
+
+def rebase_summary(summary: Optional[dict], removed_contents, max_lines: int = 40) -> Optional[dict]:
+    """Update a conversation summary after the oldest events were removed from
+    the session (storage compaction).
+
+    Removed turns the summary does not cover yet are summarized now, and
+    turns_folded is shifted so it keeps counting turns of the remaining history.
+    Returns the new summary, or None if nothing changed.
+    """
+    _, turns = split_turns(removed_contents)
+    if not turns:
+        return None
+    summary = dict(summary or {})
+    folded = summary.get("turns_folded", 0)
+    if folded < len(turns):
+        _add_lines(summary, [summarize_turn(turn) for turn in turns[folded:]], max_lines)
+    summary["turns_folded"] = max(0, folded - len(turns))
+    return summary
+
+
+class HistoryPolicy:
+    """Trims model requests to recent turns plus a rolling summary.
+
+    Args:
+        keep_turns: Turns kept verbatim, including the one in progress (0 = keep all)
+        tool_response_chars: Size budget for one tool response in the kept history
+        max_summary_lines: Summary lines kept; older ones are only counted
+        log: Print the approximate prompt tokens of every request
+    """
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "HistoryPolicy":
+        """A policy configured by the <prefix>* environment variables (see the module docstring)."""
+        return cls(
+            keep_turns=int(os.getenv(f"{prefix}HISTORY_TURNS", str(HISTORY_TURNS))),
+            tool_response_chars=int(os.getenv(f"{prefix}TOOL_RESPONSE_CHARS", str(TOOL_RESPONSE_CHARS))),
+            log=os.getenv(f"{prefix}LOG_TOKENS", "1") not in ("0", "false", "no"),
+        )
+
+    def __init__(
+        self,
+        keep_turns: int = HISTORY_TURNS,
+        tool_response_chars: int = TOOL_RESPONSE_CHARS,
+        max_summary_lines: int = 40,
+        log: bool = False,
+    ):
+        self.keep_turns = keep_turns
+        self.tool_response_chars = tool_response_chars
+        self.max_summary_lines = max_summary_lines
+        self.log = log
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "tokens_before": 0, "tokens_after": 0, "turns_folded": 0}
+
+    def fold(self, state, old_turns) -> dict:
+        """Add turns not yet in state["conversation_summary"] to it; returns the summary."""
+        summary = dict(state.get(SUMMARY_KEY) or {})
+        folded = summary.get("turns_folded", 0)
+        if folded > len(old_turns):
+            # Events were removed without rebase_summary (e.g. deleted by hand):
+            # keep the summary as it is and count from the current history on
+            folded = len(old_turns)
+        new_turns = old_turns[folded:]
+        if not new_turns:
+            return summary
+
+        _add_lines(summary, [summarize_turn(turn) for turn in new_turns], self.max_summary_lines)
+        summary["turns_folded"] = len(old_turns)
+        # One state write per folded turn batch, carried by the model response event
+        state[SUMMARY_KEY] = summary
+        with self._lock:
+            self.counters["turns_folded"] += len(new_turns)
+        return summary
+
+    def summary_content(self, summary: dict) -> Optional[types.Content]:
+        if not summary.get("lines"):
+            return None
+        text = f"{CONTEXT_PREFIX} summary of the earlier conversation"
+        if summary.get("omitted"):
+            text += f" ({summary['omitted']} older turns not shown)"
+        text += ":\n" + "\n".join(f"- {line}" for line in summary["lines"])
+        return types.Content(role="user", parts=[types.Part(text=text)])
+
+    def trim_tool_responses(self, contents) -> None:
+        """Replace oversized tool payloads (and their "For context" copies) in place."""
+        budget = self.tool_response_chars
+        for content in contents:
+            for part in content.parts or []:
+                if part.function_response:
+                    payload = _dumps(part.function_response.response)
+                    if len(payload) > budget:
+                        part.function_response.response = {
+                            "truncated": True,
+                            "original_chars": len(payload),
+                            "preview": payload[:budget],
+                        }
+                elif part.text and len(part.text) > budget and "tool returned result:" in part.text:
+                    part.text = part.text[:budget] + f"... [truncated, {len(part.text)} chars]"
+
+    def apply(self, callback_context, llm_request) -> None:
+        """Rewrite llm_request.contents (already a copy of the session events)."""
+        contents = llm_request.contents or []
+        before = estimate_tokens(contents)
+
+        if self.keep_turns > 0:
+            leading, turns = split_turns(contents)
+            kept = turns[-self.keep_turns:]
+            old = turns[: len(turns) - len(kept)]
+            summary = self.fold(callback_context.state, old) if old else {}
+            history = [content for turn in kept[:-1] for content in turn]
+            self.trim_tool_responses(leading + history)
+
+            rebuilt = list(leading)
+            summary_content = self.summary_content(summary) if old else None
+            if summary_content:
+                rebuilt.append(summary_content)
+            rebuilt.extend(history)
+            rebuilt.extend(kept[-1] if kept else [])
+            llm_request.contents = rebuilt
+
+        after = estimate_tokens(llm_request.contents or [])
+        with self._lock:
+            self.counters["requests"] += 1
+            self.counters["tokens_before"] += before
+            self.counters["tokens_after"] += after
+        if self.log:
+            print(f"--- Context: {callback_context.agent_name} prompt ~{after} tokens "
+                  f"(~{before} before trimming) ---")
+
+    def before_model_callback(self, callback_context, llm_request):
+        self.apply(callback_context, llm_request)
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        requests = counters["requests"]
+        counters["avg_tokens_before"] = round(counters["tokens_before"] / requests) if requests else 0
+        counters["avg_tokens_after"] = round(counters["tokens_after"] / requests) if requests else 0
+        return counters
+
+
+_policy: Optional[HistoryPolicy] = None
+
+
+def get_history_policy() -> HistoryPolicy:
+    global _policy
+    if _policy is None:
+        _policy = HistoryPolicy()
+    return _policy
+
+
+def set_history_policy(policy: Optional[HistoryPolicy]) -> None:
+    """Replace the shared policy (e.g. other limits); None resets it."""
+    global _policy
+    _policy = policy
+
+
+def trim_history_callback(callback_context, llm_request):
+    """before_model_callback that applies the shared HistoryPolicy."""
+    return get_history_policy().before_model_callback(callback_context, llm_request)
+
+
+def install_history_policy(agent, policy: Optional[HistoryPolicy] = None) -> None:
+    """Chain trim_history_callback after `agent`'s own before_model_callback
+    (e.g. the fast-path router, which may skip the model altogether), recursively.
+
+    `policy`, if given, replaces the shared one (see HistoryPolicy.from_env).
+    """
+    if policy is not None:
+        set_history_policy(policy)
+    current = agent.before_model_callback
+    if current is not trim_history_callback and trim_history_callback not in getattr(current, "callbacks", ()):
+        agent.before_model_callback = chain_callbacks(current, trim_history_callback)
+    for sub_agent in agent.sub_agents:
+        install_history_policy(sub_agent)
@@ -0,0 +1,62 @@
+"""Resume a user's most recent session with one indexed lookup.
+
+list_sessions() loads every session row of the user, and its order is
+whatever the database returns, so `sessions[0]` is neither cheap nor
+necessarily the newest. get_latest_session() asks for the single newest
+session id through the (app_name, user_id, update_time, id) index (the same
+index 6.Multi-agent/print_latest_state.py --ensure-indexes creates) and loads
+only that session. Works with DatabaseSessionService and the services of
+6.Multi-agent/storage, which create the index when they start.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Optional
+
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.database_session_service import StorageSession
+from google.adk.sessions.session import Session
+from sqlalchemy import Index, select
+
+LATEST_SESSION_INDEX = Index(
+    "idx_sessions_app_user_update",
+    StorageSession.app_name, StorageSession.user_id, StorageSession.update_time, StorageSession.id,
+)
+
+
+def ensure_latest_session_index(engine) -> None:
+    LATEST_SESSION_INDEX.create(engine, checkfirst=True)
+
+
+def latest_session_id(service: DatabaseSessionService, app_name: str, user_id: str) -> Optional[str]:
+    """Id of the user's most recently updated session, or None."""
+    with service.DatabaseSessionFactory() as db:
+        return db.execute(
+            select(StorageSession.id)
+            .where(StorageSession.app_name == app_name, StorageSession.user_id == user_id)
+            .order_by(StorageSession.update_time.desc(), StorageSession.id.desc())
+            .limit(1)
+        ).scalar()
+
+
+def get_latest_session(service: DatabaseSessionService, app_name: str, user_id: str) -> Optional[Session]:
+    """The user's most recently updated session (with events and state), or None."""
+    session_id = latest_session_id(service, app_name, user_id)
+    if session_id is None:
+        return None
+    return service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+
+def prefetch_latest_session(service: DatabaseSessionService, app_name: str, user_id: str) -> Future:
+    """Start loading the latest session on a thread (creating the index if
+    missing); the Future yields it (or None)."""
+    future = Future()
+
+    def load():
+        try:
+            ensure_latest_session_index(service.db_engine)
+            future.set_result(get_latest_session(service, app_name, user_id))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=load, name="prefetch-latest-session", daemon=True).start()
+    return future
@@ -0,0 +1,269 @@
+"""Read-through LRU cache in front of a database session service.
+
+The Runner loads the session at the start of every turn, and each load reads
+the session row, its state and all of its events from SQLite and validates
+them into pydantic objects again. CachingSessionService keeps recently used
+sessions in memory:
+
+- get_session: served from the cache after one primary-key lookup of the
+  session's update_time (a newer update_time, e.g. written by another
+  process, reloads it); misses load through the wrapped service
+- append_event / create_session / delete_session: write through to the
+  wrapped service, then update the cached copy in place
+- bounded by `max_sessions` and approximately `max_bytes` (JSON size of
+  state and event contents), least recently used evicted first
+
+Callers get a copy (own state dict and events list), so a turn that fails
+half-way can't leave uncommitted state in the cache. Anything else (e.g.
+compact(), db_engine) is forwarded to the wrapped service.
+"""
+import copy
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListEventsResponse,
+    ListSessionsResponse,
+)
+from google.adk.sessions.database_session_service import StorageSession
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+from sqlalchemy import select
+
+from agent_common.latest_session import latest_session_id
+
+
+def _event_bytes(event: Event) -> int:
+    if not event.content:
+        return 64
+    return len(event.content.model_dump_json(exclude_none=True)) + 64
+
+
+def _state_bytes(state: dict) -> int:
+    return len(json.dumps(state, default=str))
+
+
+class _Entry:
+    __slots__ = ("session", "bytes")
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.bytes = _state_bytes(session.state) + sum(_event_bytes(e) for e in session.events)
+
+
+class CachingSessionService(BaseSessionService):
+    """LRU session cache wrapping a DatabaseSessionService (or subclass).
+
+    Args:
+        inner: The service that owns the database
+        max_sessions: Most sessions kept in memory
+        max_bytes: Approximate memory budget for all cached sessions
+        validate: Check update_time in the database on every hit
+    """
+
+    def __init__(
+        self,
+        inner: BaseSessionService,
+        max_sessions: int = 64,
+        max_bytes: int = 64 * 1024 * 1024,
+        validate: bool = True,
+    ):
+        self.inner = inner
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.validate = validate
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def __getattr__(self, name):
+        # Only called for attributes not defined here: forward to the wrapped service
+        if name == "inner":
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    # ===== Cache bookkeeping =====
+
+    def _put(self, session: Session) -> None:
+        key = (session.app_name, session.user_id, session.id)
+        entry = _Entry(session)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.bytes
+            if entry.bytes > self.max_bytes:
+                return  # larger than the whole budget: don't cache
+            self._entries[key] = entry
+            self._bytes += entry.bytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_sessions or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.bytes
+            self.counters["evictions"] += 1
+
+    def _drop(self, key: tuple) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.bytes
+
+    def _drop_shared(self, key: tuple, delta: dict) -> None:
+        """Drop other cached sessions that see the app:/user: keys in `delta`. Holds the lock."""
+        app_name, user_id, _ = key
+        app_wide = any(name.startswith(State.APP_PREFIX) for name in delta)
+        for other in list(self._entries):
+            if other != key and other[0] == app_name and (app_wide or other[1] == user_id):
+                self._bytes -= self._entries.pop(other).bytes
+
+    def _stored_update_time(self, app_name: str, user_id: str, session_id: str) -> Optional[float]:
+        with self.inner.DatabaseSessionFactory() as db:
+            update_time = db.execute(
+                select(StorageSession.update_time).where(
+                    StorageSession.app_name == app_name,
+                    StorageSession.user_id == user_id,
+                    StorageSession.id == session_id,
+                )
+            ).scalar()
+        return update_time.timestamp() if update_time is not None else None
+
+    @staticmethod
+    def _copy(session: Session) -> Session:
+        return session.model_copy(update={
+            "state": copy.deepcopy(session.state),
+            "events": list(session.events),
+        })
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "sessions": len(self._entries),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ===== Session service API =====
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = self.inner.create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._put(self._copy(session))
+        return session
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if config is not None:
+            # Filtered loads are not cached
+            return self.inner.get_session(
+                app_name=app_name, user_id=user_id, session_id=session_id, config=config
+            )
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            stored = self._stored_update_time(*key) if self.validate else entry.session.last_update_time
+            # (SQLite's update_time has second resolution: a write by another
+            # process in the same second as ours goes unnoticed)
+            if stored is not None and stored <= entry.session.last_update_time:
+                with self._lock:
+                    self.counters["hits"] += 1
+                    return self._copy(entry.session)
+            with self._lock:
+                self.counters["stale"] += 1
+            self._drop(key)
+
+        with self._lock:
+            self.counters["misses"] += 1
+        session = self.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        if session is not None:
+            self._put(self._copy(session))
+        return session
+
+    def get_latest_session(self, *, app_name: str, user_id: str) -> Optional[Session]:
+        """The user's most recently updated session (indexed lookup, then the cache)."""
+        session_id = latest_session_id(self.inner, app_name, user_id)
+        if session_id is None:
+            return None
+        return self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return self.inner.list_sessions(app_name=app_name, user_id=user_id)
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self._drop((app_name, user_id, session_id))
+        self.inner.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        return self.inner.list_events(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        compactions = getattr(self.inner, "compaction_stats", {}).get("compactions")
+        try:
+            event = self.inner.append_event(session=session, event=event)
+        except Exception:
+            # e.g. the session was stale: make the next load go to the database
+            self._drop(key)
+            raise
+        if event.partial:
+            return event
+        if getattr(self.inner, "compaction_stats", {}).get("compactions") != compactions:
+            # Events were archived and state rewritten: reload on next use
+            self._drop(key)
+            return event
+
+        delta = (event.actions.state_delta if event.actions else None) or {}
+        with self._lock:
+            if any(name.startswith((State.APP_PREFIX, State.USER_PREFIX)) for name in delta):
+                # app:/user: state is shared with the user's other sessions
+                self._drop_shared(key, delta)
+            entry = self._entries.get(key)
+            if entry is None:
+                return event
+            cached = entry.session
+            cached.events.append(event)
+            added = _event_bytes(event)
+            for name, value in delta.items():
+                if not name.startswith(State.TEMP_PREFIX):
+                    if name in cached.state:
+                        added -= len(json.dumps(cached.state[name], default=str))
+                    cached.state[name] = copy.deepcopy(value)
+                    added += len(json.dumps(value, default=str))
+            cached.last_update_time = session.last_update_time
+            entry.bytes += added
+            self._bytes += added
+            self._entries.move_to_end(key)
+            self._evict()
+        return event
@@ -0,0 +1,148 @@
+"""Named SQLite storage profiles: journal mode, sync level, caches and pooling.
+
+DatabaseSessionService creates its engine with SQLAlchemy's defaults: a
+rollback journal (every commit fsyncs the journal and the database, and a
+writer locks out readers such as 6.Multi-agent/print_latest_state.py) and no
+busy timeout beyond the sqlite3 default. A profile configures the engine's
+connection pool and runs PRAGMAs on every new connection:
+
+    profile       journal  synchronous  cache    mmap     busy timeout  pool
+    durable       WAL      FULL         16 MiB   -        5 s           5 + 5
+    fast          WAL      NORMAL       64 MiB   256 MiB  5 s           5 + 5
+    read-mostly   WAL      NORMAL       128 MiB  1 GiB    10 s          10 + 20
+
+WAL lets readers run while a commit is in progress and turns each commit
+into one sequential append to the -wal file. With synchronous=NORMAL, WAL
+commits are not fsynced: a crash of the app loses nothing, a power loss may
+lose the last commits (the database stays consistent). "durable" fsyncs
+every commit and is what the apps use unless told otherwise; "fast" is an
+opt-in for when losing the last commits on power loss is acceptable.
+
+    service = DeltaDatabaseSessionService(db_url, profile="fast")
+    apply_profile(DatabaseSessionService(db_url), "durable")
+"""
+from typing import Union
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+
+class StorageProfile:
+    """Engine and PRAGMA settings for one kind of workload.
+
+    Args:
+        name: Profile name
+        journal_mode: SQLite journal mode (WAL, DELETE, ...)
+        synchronous: FULL, NORMAL or OFF
+        cache_mib: Page cache per connection, in MiB
+        mmap_mib: Memory-mapped I/O size, in MiB (0 = off)
+        busy_timeout_ms: How long a connection waits for a lock before "database is locked"
+        pool_size: Connections kept open
+        max_overflow: Extra connections opened under load
+        pool_timeout: Seconds to wait for a free connection
+    """
+
+    def __init__(
+        self,
+        name: str,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        cache_mib: int = 16,
+        mmap_mib: int = 0,
+        busy_timeout_ms: int = 5000,
+        pool_size: int = 5,
+        max_overflow: int = 5,
+        pool_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_mib = cache_mib
+        self.mmap_mib = mmap_mib
+        self.busy_timeout_ms = busy_timeout_ms
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+
+    def pragmas(self) -> dict:
+        return {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "cache_size": -self.cache_mib * 1024,  # negative = KiB
+            "mmap_size": self.mmap_mib * 1024 * 1024,
+            "busy_timeout": self.busy_timeout_ms,
+            "temp_store": "MEMORY",
+        }
+
+    def __repr__(self) -> str:
+        return f"StorageProfile({self.name!r})"
+
+
+PROFILES = {
+    "durable": StorageProfile("durable", synchronous="FULL", cache_mib=16),
+    "fast": StorageProfile("fast", synchronous="NORMAL", cache_mib=64, mmap_mib=256),
+    "read-mostly": StorageProfile(
+        "read-mostly", synchronous="NORMAL", cache_mib=128, mmap_mib=1024,
+        busy_timeout_ms=10000, pool_size=10, max_overflow=20,
+    ),
+}
+
+
+def get_profile(profile: Union[str, StorageProfile]) -> StorageProfile:
+    """Look up a profile by name (a StorageProfile is returned as is)."""
+    if isinstance(profile, StorageProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown storage profile {profile!r}; choose from {', '.join(PROFILES)}") from None
+
+
+def create_profiled_engine(db_url: str, profile: Union[str, StorageProfile]) -> Engine:
+    """A SQLAlchemy engine for `db_url` configured by `profile`.
+
+    The PRAGMAs only apply to file-based SQLite URLs; other databases get the
+    pool settings only.
+    """
+    profile = get_profile(profile)
+    url = make_url(db_url)
+    pool_args = {
+        "poolclass": QueuePool,
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "pool_timeout": profile.pool_timeout,
+    }
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url, **pool_args)
+    if url.database in (None, "", ":memory:"):
+        # Each pooled connection would be its own in-memory database
+        return create_engine(url)
+
+    engine = create_engine(
+        url,
+        connect_args={"timeout": profile.busy_timeout_ms / 1000, "check_same_thread": False},
+        **pool_args,
+    )
+    pragmas = profile.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return engine
+
+
+def apply_profile(service, profile: Union[str, StorageProfile]):
+    """Switch a DatabaseSessionService (or subclass) to a profiled engine; returns the service."""
+    engine = create_profiled_engine(service.db_engine.url.render_as_string(hide_password=False), profile)
+    service.db_engine.dispose()
+    service.db_engine = engine
+    service.inspector = inspect(engine)
+    service.DatabaseSessionFactory = sessionmaker(bind=engine)
+    service.storage_profile = get_profile(profile)
+    return service
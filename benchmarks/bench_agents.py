@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""End-to-end turn latency, allocations and DB bytes for every example agent.
+
+Each agent's LiteLlm is replaced with a ScriptedLlm, so a turn exercises
+everything except the model: Runner loop, session I/O, state serialization,
+tool dispatch and agent transfer. Every scenario below is the tool-call
+script one turn plays back; scenarios rotate from turn to turn.
+
+For each agent the script runs --turns measured turns (after --warmup turns)
+and reports per-turn p50/p99 latency, model calls per turn, DB bytes written
+per turn (database-backed services only), then a second --alloc-turns pass
+under tracemalloc for peak and retained allocations per turn.
+
+    python benchmarks/bench_agents.py --turns 200
+    python benchmarks/bench_agents.py --agents manager memory_agent --model-latency 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from bench_utils import SqlBytesCounter, add_example_paths, percentile
+
+add_example_paths()
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import DatabaseSessionService, InMemorySessionService  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from scripted_llm import ScriptedLlm, call, text, transfer, use_model  # noqa: E402
+
+# The stock tools use the deterministic offline price source
+os.environ.setdefault("STOCK_PRICE_SOURCE", "fake")
+
+
+def load_greeting_agent():
+    from greeting_agent.agent import root_agent
+    return root_agent
+
+
+def load_tool_agent():
+    from tool_agent.tool_agent import root_agent
+    return root_agent
+
+
+def load_email_agent():
+    from email_agent.agent import root_agent
+    return root_agent
+
+
+def load_question_answering_agent():
+    from question_answering_agent import question_answering_agent
+    return question_answering_agent
+
+
+def load_memory_agent():
+    from memory_agent.agent import memory_agent
+    return memory_agent
+
+
+def load_manager():
+    from manager.agent import root_agent
+    return root_agent
+
+
+def multi_agent_state():
+    from persistent_multi_agent import initial_state
+    return initial_state
+
+
+# name -> (loader, session service kind, initial state factory, scenarios)
+# Each scenario is (user message, scripted model steps for that turn)
+AGENTS = {
+    "greeting_agent": (load_greeting_agent, "memory", dict, [
+        ("Hi there!", [text("Hello! Nice to meet you.")]),
+    ]),
+    "tool_agent": (load_tool_agent, "memory", dict, [
+        ("Tell me a joke", [call("bad_jokes"), text("Here's one for you!")]),
+    ]),
+    "email_agent": (load_email_agent, "memory", dict, [
+        ("Write an email to my team about the offsite", [
+            text('{"subject": "Team offsite", "body": "Hi team,\\n\\nDetails to follow.\\n\\nBest"}'),
+        ]),
+    ]),
+    "question_answering_agent": (load_question_answering_agent, "memory",
+                                 lambda: {"user_name": "Bench User", "user_preferences": "Likes chess"}, [
+        ("What do I like?", [text("You like chess.")]),
+    ]),
+    "memory_agent": (load_memory_agent, "database", lambda: {"user_name": "Bench User", "reminders": []}, [
+        ("Remind me to buy milk", [call("add_reminder", reminder="buy milk"), text("Added.")]),
+        ("What are my reminders?", [call("view_reminders"), text("You have reminders.")]),
+        ("Call me Sam", [call("update_user_name", name="Sam"), text("Hi Sam.")]),
+    ]),
+    # Consecutive scenarios hand over to a different sub-agent, the way a
+    # conversation moves between them; the first turn starts at the manager.
+    "manager": (load_manager, "delta", multi_agent_state, [
+        ("What's the price of AAPL?", [
+            transfer("stock_analyst"), call("get_stock_price", ticker="AAPL"), text("AAPL is up."),
+        ]),
+        ("Tell me a python joke", [
+            transfer("funny_nerd"), call("get_nerd_joke", topic="python"), text("Here you go."),
+        ]),
+        ("Another joke please", [
+            transfer("joke_agent"), call("bad_jokes"), text("Ha!"),
+        ]),
+    ]),
+}
+
+
+def make_session_service(kind: str, db_dir: str, name: str):
+    if kind == "memory":
+        return InMemorySessionService()
+    db_url = f"sqlite:///{os.path.join(db_dir, name)}.db"
+    if kind == "delta":
+        from storage import DeltaDatabaseSessionService
+        return DeltaDatabaseSessionService(db_url=db_url)
+    return DatabaseSessionService(db_url=db_url)
+
+
+async def run_turn(runner, llm, user_id, session_id, message, steps):
+    llm.start_turn(steps)
+    content = types.Content(role="user", parts=[types.Part(text=message)])
+    async for _ in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+        pass
+    return llm.turn_calls
+
+
+async def bench_agent(name: str, args, db_dir: str) -> dict:
+    loader, kind, state_factory, scenarios = AGENTS[name]
+    agent = loader()
+    llm = ScriptedLlm(latency=args.model_latency)
+    use_model(agent, llm)
+
+    service = make_session_service(kind, db_dir, name)
+    counter = SqlBytesCounter(service.db_engine) if hasattr(service, "db_engine") else None
+    runner = Runner(agent=agent, app_name=f"bench-{name}", session_service=service)
+    session = service.create_session(app_name=runner.app_name, user_id="bench", state=state_factory())
+
+    turn = 0
+
+    async def next_turn():
+        nonlocal turn
+        message, steps = scenarios[turn % len(scenarios)]
+        turn += 1
+        return await run_turn(runner, llm, "bench", session.id, message, steps)
+
+    for _ in range(args.warmup):
+        await next_turn()
+
+    latencies, model_calls, db_bytes = [], 0, 0
+    for _ in range(args.turns):
+        if counter:
+            counter.reset()
+        started = time.perf_counter()
+        model_calls += await next_turn()
+        latencies.append(time.perf_counter() - started)
+        if counter:
+            db_bytes += counter.bytes_written
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    for _ in range(args.alloc_turns):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await next_turn()
+        after, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        retained.append(after - before)
+    tracemalloc.stop()
+
+    if counter:
+        service.db_engine.dispose()
+    return {
+        "p50": percentile(latencies, 50) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "calls": model_calls / args.turns,
+        "db_bytes": db_bytes / args.turns if counter else None,
+        "peak_kib": sum(peaks) / len(peaks) / 1024 if peaks else 0.0,
+        "retained_kib": sum(retained) / len(retained) / 1024 if retained else 0.0,
+    }
+
+
+async def run(args):
+    # Modules such as persistent_multi_agent open SQLite files relative to cwd
+    db_dir = tempfile.mkdtemp(prefix="bench_agents_")
+    os.chdir(db_dir)
+
+    results = {}
+    for name in args.agents:
+        # Tools print progress lines; keep them out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = await bench_agent(name, args, db_dir)
+
+    print(f"turns={args.turns} warmup={args.warmup} alloc_turns={args.alloc_turns} "
+          f"model_latency={args.model_latency * 1000:.0f}ms\n")
+    print(f"{'agent':<26} {'p50 ms':>9} {'p99 ms':>9} {'calls':>6} {'DB B/turn':>10} "
+          f"{'peak KiB':>9} {'kept KiB':>9}")
+    for name, r in results.items():
+        db = f"{r['db_bytes']:,.0f}" if r["db_bytes"] is not None else "-"
+        print(f"{name:<26} {r['p50']:>9.2f} {r['p99']:>9.2f} {r['calls']:>6.1f} {db:>10} "
+              f"{r['peak_kib']:>9.1f} {r['retained_kib']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", nargs="+", choices=list(AGENTS), default=list(AGENTS))
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--alloc-turns", type=int, default=20, help="Turns measured under tracemalloc")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Scripted model latency in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""get_session (resume) latency as a session ages, with and without compaction.
+
+Builds one session per variant without a model: every turn appends a user
+event, a tool call/response pair and a model reply, the shape of a
+multi-agent turn. At each --checkpoints turn count the session is loaded
+--loads times and the load latency and number of events returned are
+reported, for:
+
+- DeltaDatabaseSessionService: loads every event ever recorded
+- CompactingDeltaSessionService(compact_every=...): loads the snapshot
+  boundary onwards only (last --keep-turns turns plus what accrued since)
+
+    python benchmarks/bench_compaction.py --checkpoints 100 1000 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from storage import CompactingDeltaSessionService, DeltaDatabaseSessionService  # noqa: E402
+
+
+def turn_events(turn: int) -> list:
+    call = types.FunctionCall(name="get_stock_price", args={"ticker": "AAPL"})
+    response = types.FunctionResponse(
+        name="get_stock_price", response={"ticker": "AAPL", "price": 100.0 + turn, "history": [1.0] * 20}
+    )
+    return [
+        Event(invocation_id=f"inv-{turn}", author="user",
+              content=types.Content(role="user", parts=[types.Part(text=f"price of AAPL? ({turn})")])),
+        Event(invocation_id=f"inv-{turn}", author="stock_analyst",
+              content=types.Content(role="model", parts=[types.Part(function_call=call)])),
+        Event(invocation_id=f"inv-{turn}", author="stock_analyst",
+              content=types.Content(role="user", parts=[types.Part(function_response=response)]),
+              actions=EventActions(state_delta={"last_price": 100.0 + turn})),
+        Event(invocation_id=f"inv-{turn}", author="stock_analyst",
+              content=types.Content(role="model", parts=[types.Part(text=f"AAPL is at {100.0 + turn}.")])),
+    ]
+
+
+def run_variant(service, checkpoints: list, loads: int) -> list:
+    session = service.create_session(app_name="bench", user_id="u", state={"last_price": 0.0})
+    rows = []
+    turn = 0
+    for checkpoint in checkpoints:
+        while turn < checkpoint:
+            turn += 1
+            for event in turn_events(turn):
+                service.append_event(session, event)
+        samples, events = [], 0
+        for _ in range(loads):
+            started = time.perf_counter()
+            loaded = service.get_session(app_name="bench", user_id="u", session_id=session.id)
+            samples.append(time.perf_counter() - started)
+            events = len(loaded.events)
+        rows.append((checkpoint, events, samples))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoints", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--loads", type=int, default=10, help="get_session calls per checkpoint")
+    parser.add_argument("--compact-every", type=int, default=200, help="Events between compactions")
+    parser.add_argument("--keep-turns", type=int, default=20)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="bench_compaction_")
+    variants = {
+        "delta (no compaction)": DeltaDatabaseSessionService(db_url=f"sqlite:///{os.path.join(db_dir, 'plain.db')}"),
+        "compacting delta": CompactingDeltaSessionService(
+            db_url=f"sqlite:///{os.path.join(db_dir, 'compacting.db')}",
+            compact_every=args.compact_every,
+            keep_turns=args.keep_turns,
+        ),
+    }
+    print(f"compact_every={args.compact_every} keep_turns={args.keep_turns} loads={args.loads}\n")
+    for label, service in variants.items():
+        print(label)
+        for turns, events, samples in run_variant(service, sorted(args.checkpoints), args.loads):
+            print(f"  {turns:>6} turns: {events:>6} events loaded, get_session {summarize_ms(samples)}")
+
+
+if __name__ == "__main__":
+    main()
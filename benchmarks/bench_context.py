@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Prompt size per model request as a session grows, with and without the history policy.
+
+Plays --turns scripted turns into one session of the manager (and of the
+memory agent), first with trimming disabled (HistoryPolicy(keep_turns=0),
+i.e. every event is sent, as before) and then with the policy as configured
+(--keep-turns). The ScriptedLlm records the approximate prompt tokens of
+every request it receives; the report shows them at a few points of the
+session, plus the simulated model time with --ms-per-1k-tokens of prefill.
+
+    python benchmarks/bench_context.py --turns 200 --keep-turns 6
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+
+from bench_agents import AGENTS, make_session_service
+from bench_utils import add_example_paths
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.genai import types  # noqa: E402
+from pydantic import Field  # noqa: E402
+
+from scripted_llm import ScriptedLlm, use_model  # noqa: E402
+
+
+class MeasuringLlm(ScriptedLlm):
+    """ScriptedLlm that records the approximate prompt tokens of each request."""
+
+    prompt_tokens: list = Field(default_factory=list)
+
+    async def generate_content_async(self, llm_request, stream=False):
+        from agent_common.context_window import estimate_tokens
+
+        self.prompt_tokens.append(estimate_tokens(llm_request.contents or []))
+        async for response in super().generate_content_async(llm_request, stream=stream):
+            yield response
+
+
+async def run_variant(name, keep_turns, args, db_dir):
+    from agent_common import context_window
+
+    loader, kind, state_factory, scenarios = AGENTS[name]
+    agent = loader()
+    context_window.set_history_policy(context_window.HistoryPolicy(keep_turns=keep_turns, log=False))
+    context_window.install_history_policy(agent)
+
+    llm = MeasuringLlm()
+    use_model(agent, llm)
+    service = make_session_service(kind, db_dir, f"{name}-{keep_turns}")
+    runner = Runner(agent=agent, app_name=f"bench-{name}", session_service=service)
+    session = service.create_session(app_name=runner.app_name, user_id="bench", state=state_factory())
+
+    per_turn = []
+    for turn in range(args.turns):
+        message, steps = scenarios[turn % len(scenarios)]
+        llm.start_turn(steps)
+        start = len(llm.prompt_tokens)
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=content):
+            pass
+        per_turn.append(llm.prompt_tokens[start:])
+    return per_turn, context_window.get_history_policy().stats()
+
+
+def report(label, per_turn, stats, args):
+    checkpoints = sorted({1, 10, 50, args.turns} & set(range(1, args.turns + 1)))
+    requests = [tokens for turn in per_turn for tokens in turn]
+    model_ms = sum(requests) / 1000 * args.ms_per_1k_tokens
+    at = "  ".join(f"turn {n}: ~{max(per_turn[n - 1], default=0)}" for n in checkpoints)
+    print(f"  {label:<12} max prompt tokens/request  {at}")
+    print(f"  {'':<12} avg ~{sum(requests) / max(len(requests), 1):.0f} tokens/request, "
+          f"simulated prefill {model_ms / 1000:.1f}s total, turns summarized: {stats['turns_folded']}")
+
+
+async def run(args):
+    db_dir = tempfile.mkdtemp(prefix="bench_context_")
+    os.chdir(db_dir)
+    print(f"turns={args.turns} keep_turns={args.keep_turns} prefill={args.ms_per_1k_tokens}ms/1k tokens\n")
+    for name in args.agents:
+        with contextlib.redirect_stdout(io.StringIO()):
+            untrimmed = await run_variant(name, 0, args, db_dir)
+            trimmed = await run_variant(name, args.keep_turns, args, db_dir)
+        print(name)
+        report("untrimmed", *untrimmed, args)
+        report("trimmed", *trimmed, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--keep-turns", type=int, default=6)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=50.0,
+                        help="Simulated model prefill time per 1k prompt tokens")
+    parser.add_argument("--agents", nargs="+", default=["manager", "memory_agent"], choices=["manager", "memory_agent"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
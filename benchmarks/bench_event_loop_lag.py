@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Event-loop lag with many concurrent sessions: inline vs off-loop session I/O.
+
+Runs --sessions sessions concurrently on one event loop, each doing --turns
+turns of a small agent (model call -> tool that writes state -> model reply,
+ScriptedLlm with --latency seconds of simulated model time). Every session
+starts with --history turns already recorded, so loading it costs what a
+session in daily use costs. Meanwhile a ticker coroutine wakes up every
+--tick ms and records how late it was woken: that lag is the time the loop
+spent blocked, i.e. what every other session, stream and HTTP request waited.
+
+- Runner + CompactingDeltaSessionService: ADK's Runner calls get_session and
+  append_event on the event loop thread
+- AsyncRunner + AsyncSessionService: the same service, called on its
+  dedicated I/O thread
+
+    python benchmarks/bench_event_loop_lag.py --sessions 64 --turns 5
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from bench_utils import add_example_paths, percentile, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.agents import LlmAgent  # noqa: E402
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.tools.tool_context import ToolContext  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from scripted_llm import ScriptedLlm, call, text  # noqa: E402
+from storage import AsyncRunner, AsyncSessionService, CompactingDeltaSessionService  # noqa: E402
+
+
+def record_note(note: str, tool_context: ToolContext) -> dict:
+    """Store a note in the session state."""
+    notes = tool_context.state.get("notes", [])
+    tool_context.state["notes"] = (notes + [note])[-20:]
+    tool_context.state["note_count"] = tool_context.state.get("note_count", 0) + 1
+    return {"status": "success", "notes": len(notes) + 1}
+
+
+def respond(llm_request, _call_index):
+    """Call record_note for a user message, answer after the tool result."""
+    last = llm_request.contents[-1] if llm_request.contents else None
+    if last and last.parts and last.parts[0].function_response:
+        return text("Noted.")
+    return call("record_note", note="remember this")
+
+
+def build_agent(latency: float) -> LlmAgent:
+    llm = ScriptedLlm(latency=latency, responder=respond)
+    return LlmAgent(name="note_taker", model=llm, instruction="Take notes.", tools=[record_note])
+
+
+def seed_history(service, session, turns: int) -> None:
+    for turn in range(turns):
+        content = types.Content(role="user", parts=[types.Part(text=f"earlier message {turn} " * 8)])
+        service.append_event(session, Event(invocation_id=f"seed-{turn}", author="user", content=content))
+        reply = types.Content(role="model", parts=[types.Part(text=f"earlier answer {turn} " * 16)])
+        service.append_event(session, Event(
+            invocation_id=f"seed-{turn}", author="note_taker", content=reply,
+            actions=EventActions(state_delta={"note_count": turn}),
+        ))
+
+
+async def measure_lag(samples: list, tick: float, stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + tick
+        await asyncio.sleep(tick)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_variant(runner_class, service, args) -> dict:
+    runner = runner_class(agent=build_agent(args.latency), app_name="bench", session_service=service)
+    sessions = []
+    for u in range(args.sessions):
+        session = service.create_session(app_name="bench", user_id=f"user{u}", state={"notes": []})
+        seed_history(service, session, args.history)
+        sessions.append(session)
+
+    turn_latencies = []
+
+    async def chat(session):
+        for turn in range(args.turns):
+            content = types.Content(role="user", parts=[types.Part(text=f"note {turn}")])
+            started = time.perf_counter()
+            async for _ in runner.run_async(user_id=session.user_id, session_id=session.id, new_message=content):
+                pass
+            turn_latencies.append(time.perf_counter() - started)
+
+    lag, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(lag, args.tick / 1000, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(session) for session in sessions))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+
+    counts = [
+        service.get_session(app_name="bench", user_id=s.user_id, session_id=s.id).state.get("note_count")
+        for s in sessions
+    ]
+    return {
+        "turns": turn_latencies,
+        "lag": lag,
+        "elapsed": elapsed,
+        "correct": sum(count == args.history - 1 + args.turns for count in counts),
+    }
+
+
+async def run(args):
+    db_dir = tempfile.mkdtemp(prefix="bench_event_loop_lag_")
+
+    def database(name):
+        return CompactingDeltaSessionService(db_url=f"sqlite:///{os.path.join(db_dir, name)}.db")
+
+    variants = {
+        "Runner (session I/O on the loop)": (Runner, database("inline")),
+        "AsyncRunner (session I/O thread)": (AsyncRunner, AsyncSessionService(database("offloaded"))),
+    }
+    print(f"sessions={args.sessions} turns={args.turns} history={args.history} turns "
+          f"model latency={args.latency * 1000:.0f}ms tick={args.tick}ms\n")
+    for label, (runner_class, service) in variants.items():
+        result = await run_variant(runner_class, service, args)
+        lag = result["lag"]
+        print(label)
+        print(f"  loop lag:  {summarize_ms(lag)}  max={max(lag or [0]) * 1000:8.2f}ms  "
+              f"blocked >50ms: {sum(sample > 0.05 for sample in lag)}/{len(lag)} ticks")
+        print(f"  turn:      {summarize_ms(result['turns'])}  p99.9={percentile(result['turns'], 99.9) * 1000:.1f}ms")
+        print(f"  throughput {len(result['turns']) / result['elapsed']:7.1f} turns/s, "
+              f"state correct in {result['correct']}/{args.sessions} sessions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=48, help="Concurrent sessions")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session")
+    parser.add_argument("--history", type=int, default=150, help="Turns recorded in each session beforehand")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated model latency (seconds)")
+    parser.add_argument("--tick", type=float, default=5.0, help="Lag probe interval (ms)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Throughput vs. latency of group commit for concurrent sessions.
+
+--sessions threads each append events with a state change to their own
+session (one append at a time, as the Runner does) for --seconds. This runs
+once with one transaction per event and once per --windows value (in ms)
+with DeltaDatabaseSessionService(commit_window=...), which commits the writes
+arriving within the window in one transaction. Reports events/sec,
+append_event latency, the average batch size, and checks every session's
+state against the number of events it appended.
+
+    python benchmarks/bench_group_commit.py --sessions 32 --windows 1 2 5 10 --profile durable
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from storage import PROFILES, DeltaDatabaseSessionService  # noqa: E402
+
+
+def append_loop(service, session, stop: threading.Event, latencies: list, counts: dict) -> None:
+    appended = 0
+    while not stop.is_set():
+        content = types.Content(role="model", parts=[types.Part(text=f"tool result {appended} " * 10)])
+        event = Event(
+            invocation_id=f"inv-{appended}", author="bench", content=content,
+            actions=EventActions(state_delta={"appended": appended + 1, "last_ticker": "AAPL"}),
+        )
+        started = time.perf_counter()
+        service.append_event(session, event)
+        latencies.append(time.perf_counter() - started)
+        appended += 1
+    counts[session.id] = appended
+
+
+def run_variant(window_ms: float, args) -> dict:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_group_commit_"), "group_commit.db")
+    service = DeltaDatabaseSessionService(
+        db_url=f"sqlite:///{db_path}", profile=args.profile, commit_window=window_ms / 1000 or None
+    )
+    sessions = [
+        service.create_session(app_name="bench", user_id=f"user{u}", state={"appended": 0})
+        for u in range(args.sessions)
+    ]
+    stop = threading.Event()
+    latencies, counts = [], {}
+    threads = [
+        threading.Thread(target=append_loop, args=(service, session, stop, latencies, counts))
+        for session in sessions
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    correct = sum(
+        service.get_session(app_name="bench", user_id=s.user_id, session_id=s.id).state["appended"] == counts[s.id]
+        for s in sessions
+    )
+    committer = service.group_committer
+    return {
+        "throughput": len(latencies) / elapsed,
+        "latencies": latencies,
+        "avg_batch": committer.stats()["avg_batch"] if committer else 1.0,
+        "correct": correct,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32, help="Concurrent sessions (threads)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Measurement time per variant")
+    parser.add_argument("--windows", type=float, nargs="+", default=[1.0, 2.0, 5.0, 10.0], help="Windows in ms")
+    parser.add_argument("--profile", choices=list(PROFILES), default="durable")
+    args = parser.parse_args()
+
+    print(f"sessions={args.sessions} seconds={args.seconds} profile={args.profile}\n")
+    print(f"{'commit':<18} {'events/s':>9} {'avg batch':>10}  append_event latency")
+    for window_ms in [0.0, *args.windows]:
+        result = run_variant(window_ms, args)
+        label = f"group {window_ms:g}ms" if window_ms else "per event"
+        print(f"{label:<18} {result['throughput']:9.1f} {result['avg_batch']:10.2f}  "
+              f"{summarize_ms(result['latencies'])}  state correct {result['correct']}/{args.sessions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Joke corpus: index build, memory, no-repeat sampling and seen-state size.
+
+Writes a JSONL corpus of --jokes jokes over --topics topics (a few tags
+each) and compares JokeCorpus (joke_corpus.py: offsets and id arrays,
+texts read from the memory-mapped file) with loading every joke as a dict:
+
+- load time (JokeCorpus: first load, which scans the file and saves the
+  index, and a later one from the saved index) and the memory held after
+  loading (tracemalloc)
+- tell latency: JokeCorpus.sample from a topic, a tag and the whole corpus
+  with a SeenJokes bitset that is empty, 90% full and 99% full
+- state size: the encoded bitset after N jokes told vs a JSON list of the ids
+- no repeats: a topic pool is told in full before any joke comes back
+
+    python benchmarks/bench_jokes.py --jokes 100000 --topics 200
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from joke_corpus import JokeCorpus, SeenJokes  # noqa: E402
+
+TAGS = ["general", "nerd", "pun", "one-liner", "riddle", "science", "programming", "animals", "food", "work"]
+
+
+def write_corpus(path: str, jokes: int, topics: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        for i in range(jokes):
+            topic = f"topic{rng.randrange(topics):04d}"
+            tags = rng.sample(TAGS, rng.randint(1, 3))
+            text = f"Joke {i} about {topic}: why did the {rng.choice(TAGS)} cross the road? " * rng.randint(1, 3)
+            f.write(json.dumps({"topic": topic, "tags": tags, "text": text.strip()}) + "\n")
+
+
+def load_dicts(path: str) -> list:
+    """The alternative: every joke as a dict in memory."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def measure(load):
+    """(result, load time, bytes held); the time is taken without tracemalloc running."""
+    gc.collect()
+    started = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, held
+
+
+def fill(seen: SeenJokes, pool, fraction: float, rng) -> None:
+    for joke_id in rng.sample(list(pool), int(len(pool) * fraction)):
+        seen.add(joke_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jokes", type=int, default=100_000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=2000, help="Jokes told per measurement")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_jokes_"), "jokes.jsonl")
+    write_corpus(path, args.jokes, args.topics)
+    print(f"{args.jokes:,} jokes, {args.topics} topics, {os.path.getsize(path) / 1024 / 1024:.1f} MiB of JSONL\n")
+
+    dicts, elapsed, held = measure(lambda: load_dicts(path))
+    print(f"{'list of dicts':<20} load {elapsed * 1000:8.1f}ms  held {held / 1024 / 1024:7.2f} MiB")
+    del dicts
+    corpus, elapsed, held = measure(lambda: JokeCorpus(path, cache_index=False))
+    print(f"{'JokeCorpus (scan)':<20} load {elapsed * 1000:8.1f}ms  held {held / 1024 / 1024:7.2f} MiB")
+    JokeCorpus(path)  # saves the index
+    corpus, elapsed, held = measure(lambda: JokeCorpus(path))
+    print(f"{'JokeCorpus (index)':<20} load {elapsed * 1000:8.1f}ms  held {held / 1024 / 1024:7.2f} MiB\n")
+
+    rng = random.Random(1)
+    topic = corpus.topics()[0]
+    pools = {
+        f"topic {topic}": corpus.pool(topic),
+        "tag nerd": corpus.pool(tag="nerd"),
+        "all": corpus.pool(),
+    }
+    print(f"{'pool':<16} {'size':>7} {'seen':>5}  tell latency")
+    for label, pool in pools.items():
+        for fraction in (0.0, 0.9, 0.99):
+            seen = SeenJokes()
+            fill(seen, pool, fraction, rng)
+            samples = []
+            for _ in range(args.samples):
+                started = time.perf_counter()
+                joke = corpus.sample(pool, seen, rng)
+                samples.append(time.perf_counter() - started)
+                # Keep the fill level: forget the joke just told
+                seen.discard_many([joke["id"]])
+            print(f"{label:<16} {len(pool):>7,} {fraction:>5.0%}  {summarize_ms(samples)}")
+
+    print(f"\n{'jokes told':>10} {'bitset state':>13} {'id list JSON':>13}")
+    for told in (10, 100, 1_000, 10_000, args.jokes):
+        ids = rng.sample(range(len(corpus)), min(told, len(corpus)))
+        seen = SeenJokes()
+        for joke_id in ids:
+            seen.add(joke_id)
+        print(f"{told:>10,} {len(seen.to_state()):>11,} B {len(json.dumps(sorted(ids))):>11,} B")
+
+    pool = corpus.pool(topic)
+    seen = SeenJokes()
+    told = [corpus.sample(pool, seen, rng)["id"] for _ in range(len(pool))]
+    again = corpus.sample(pool, seen, rng)["id"]
+    print(f"\nno repeats over {len(pool)} jokes of {topic}: {len(set(told)) == len(pool)}; "
+          f"then starts over: {again in told and len(seen) == 1}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Model calls per turn: bookkeeping tools vs callbacks vs the fast-path router.
+
+The legacy manager (rebuilt here from the current one) had log_user_input and
+track_agent_delegation as tools, and its instruction told the model to call
+them before anything else. The current manager records the same state in
+before_agent/after_tool callbacks, and its fast-path router (manager/router.py)
+transfers obvious requests without a model call.
+
+Both run with a ScriptedLlm whose responder follows the instruction: a
+sub-agent that can't handle the request hands it back to the manager, the
+manager calls every bookkeeping tool it has and transfers to the sub-agent
+that fits, which calls its tool and answers. The report shows model calls
+per turn, turn latency with --model-latency per call, and the resulting state
+counters, which should match.
+
+    python benchmarks/bench_model_calls.py --turns 30 --model-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import os
+import tempfile
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+os.environ.setdefault("STOCK_PRICE_SOURCE", "fake")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from scripted_llm import ScriptedLlm, call, last_user_text, text, transfer, use_model  # noqa: E402
+
+MESSAGES = [
+    ("What's the price of AAPL?", "stock_analyst", call("get_stock_price", ticker="AAPL")),
+    ("Tell me a python joke", "funny_nerd", call("get_nerd_joke", topic="python")),
+    ("Tell me a joke", "joke_agent", call("bad_jokes")),
+]
+
+LEGACY_WORKFLOW = """
+    **DELEGATION WORKFLOW:**
+    1. ALWAYS call log_user_input with the user's exact message BEFORE doing anything else
+    2. When delegating to a sub-agent, use track_agent_delegation first
+"""
+
+
+class InstructionFollower:
+    """Responder that behaves like a model following the manager's workflow."""
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, route):
+        self.route = route
+        self.done = set()
+
+    def __call__(self, llm_request, call_index):
+        message = last_user_text(llm_request)
+        target, work = self.route
+        tools = set(llm_request.tools_dict)
+        if work["calls"][0]["name"] in tools:
+            # The sub-agent that does the work
+            if "work" not in self.done:
+                self.done.add("work")
+                return work
+            return text("Done.")
+        if "get_current_time" not in tools:
+            # Another sub-agent (the session resumes at the last one): hand back
+            return transfer("manager")
+        if "log_user_input" in tools and "log" not in self.done:
+            self.done.add("log")
+            return call("log_user_input", text=message)
+        if "track_agent_delegation" in tools and "track" not in self.done:
+            self.done.add("track")
+            return call("track_agent_delegation", agent_name=target, task=message)
+        return transfer(target)
+
+
+def manager_variant(root_agent, bookkeeping_tools: bool, fast_path: bool):
+    """Copy of the manager (and sub-agents) with bookkeeping as model tools
+    (legacy) or as callbacks, with or without the fast-path router."""
+    from state_management_tools import log_user_input, track_agent_delegation
+
+    overrides = {"parent_agent": None}
+    if bookkeeping_tools:
+        overrides.update(before_agent_callback=None, after_tool_callback=None)
+    if not fast_path:
+        overrides["before_model_callback"] = None
+    sub_agents = [sub.model_copy(update=overrides) for sub in root_agent.sub_agents]
+    update = {**overrides, "sub_agents": sub_agents}
+    if bookkeeping_tools:
+        update["instruction"] = root_agent.instruction.replace(
+            root_agent.instruction[root_agent.instruction.index("**DELEGATION WORKFLOW:**"):
+                                   root_agent.instruction.index("**PERSONALIZATION:**")],
+            LEGACY_WORKFLOW.strip() + "\n\n    ",
+        )
+        update["tools"] = [log_user_input, track_agent_delegation, *root_agent.tools]
+    manager = root_agent.model_copy(update=update)
+    for sub in sub_agents:
+        sub.parent_agent = manager
+    return manager
+
+
+async def run_variant(agent, session_service, initial_state, args):
+    responder = InstructionFollower()
+    llm = ScriptedLlm(latency=args.model_latency, responder=responder)
+    use_model(agent, llm)
+    runner = Runner(agent=agent, app_name=f"bench-{agent.name}", session_service=session_service)
+    session = session_service.create_session(app_name=runner.app_name, user_id="bench", state=initial_state)
+
+    calls, latencies = [], []
+    for turn in range(args.turns):
+        message, target, work = MESSAGES[turn % len(MESSAGES)]
+        responder.reset((target, work))
+        llm.start_turn()
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        started = time.perf_counter()
+        async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=content):
+            pass
+        latencies.append(time.perf_counter() - started)
+        calls.append(llm.turn_calls)
+
+    state = session_service.get_session(
+        app_name=runner.app_name, user_id="bench", session_id=session.id
+    ).state
+    return calls, latencies, state
+
+
+async def run(args):
+    os.chdir(tempfile.mkdtemp(prefix="bench_model_calls_"))
+    import persistent_multi_agent
+    from conversation_log import CONVERSATION_LOG, DELEGATION_LOG, log_count
+
+    root_agent = persistent_multi_agent.root_agent
+    variants = {
+        "legacy (bookkeeping tools)": manager_variant(root_agent, bookkeeping_tools=True, fast_path=False),
+        "callbacks": manager_variant(root_agent, bookkeeping_tools=False, fast_path=False),
+        "callbacks + fast-path router": root_agent,
+    }
+    results = {}
+    for label, agent in variants.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[label] = await run_variant(
+                agent,
+                persistent_multi_agent.session_service,
+                copy.deepcopy(persistent_multi_agent.initial_state),
+                args,
+            )
+
+    print(f"turns={args.turns} model_latency={args.model_latency * 1000:.0f}ms\n")
+    from manager.router import get_router
+
+    for label, (calls, latencies, state) in results.items():
+        print(label)
+        print(f"  model calls/turn: {sum(calls) / len(calls):.2f}")
+        print(f"  turn latency:     {summarize_ms(latencies)}")
+        print(f"  state: conversations={log_count(state, CONVERSATION_LOG)} "
+              f"delegations={log_count(state, DELEGATION_LOG)} "
+              f"total_interactions={state['session_metadata']['total_interactions']}")
+    print(f"\nfast-path router: {get_router().stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Scripted model latency in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Turn latency with N tool calls in one model response: sequential vs concurrent.
+
+The stock_analyst answers a question about N tickers with one model response
+holding N get_stock_price calls (ScriptedLlm, --model-latency per call). The
+price source is FakePriceSource with --fetch-latency seconds per fetch, like a
+yfinance round-trip. ADK runs the calls one after another, so the tool step
+takes about N x the fetch latency; stock_analyst is a ConcurrentToolsAgent
+(tool_execution.py), so with the executor enabled they run on the tool thread
+pool and the step should take about one fetch latency.
+
+Each variant also checks what the calls recorded: the price history store
+must have prices for every ticker, the session state the storage layer ends
+up with must list every ticker in the watchlist and count one
+session_metadata.total_interactions per call.
+
+    python benchmarks/bench_parallel_tools.py --tickers 1 2 4 8 --fetch-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from scripted_llm import ScriptedLlm, call, calls, text, use_model  # noqa: E402
+
+TICKERS = ["AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "META", "TSLA", "NFLX", "AMD", "INTC", "ORCL", "IBM"]
+
+
+async def run_variant(agent, concurrent: bool, n: int, args) -> dict:
+    from manager.sub_agents.stock_analyst.price_history import PriceHistoryStore, set_price_history
+    from manager.sub_agents.stock_analyst.price_service import FakePriceSource, PriceService, set_price_service
+    from storage import DeltaDatabaseSessionService
+    from tool_execution import get_tool_executor
+
+    get_tool_executor().enabled = concurrent
+    # ttl=0: every call goes to the (slow) source
+    set_price_service(PriceService(FakePriceSource(latency=args.fetch_latency), ttl=0))
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_parallel_tools_"), "sessions.db")
+    history = PriceHistoryStore(db_path)
+    set_price_history(history)
+    service = DeltaDatabaseSessionService(db_url=f"sqlite:///{db_path}")
+    llm = ScriptedLlm(latency=args.model_latency)
+    use_model(agent, llm)
+    runner = Runner(agent=agent, app_name="bench", session_service=service)
+    session = service.create_session(app_name="bench", user_id="bench")
+
+    tickers = [TICKERS[i % len(TICKERS)] for i in range(n)]
+    latencies = []
+    for turn in range(args.turns):
+        llm.start_turn([
+            calls(*(call("get_stock_price", ticker=t) for t in tickers)),
+            text("Here are your prices."),
+        ])
+        content = types.Content(role="user", parts=[types.Part(text=f"prices of {' '.join(tickers)}")])
+        started = time.perf_counter()
+        # The tools print a line per call
+        with contextlib.redirect_stdout(io.StringIO()):
+            async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=content):
+                pass
+        latencies.append(time.perf_counter() - started)
+
+    state = service.get_session(app_name="bench", user_id="bench", session_id=session.id).state
+    watchlist = state.get("user_preferences", {}).get("stock_watchlist", [])
+    interactions = state.get("session_metadata", {}).get("total_interactions", 0)
+    return {
+        # Time spent outside the two model calls of a turn
+        "tool_step": [latency - 2 * args.model_latency for latency in latencies],
+        "state_ok": (
+            all(len(history.series(t)[0]) for t in tickers)
+            and set(watchlist) >= set(tickers)
+            and interactions == n * args.turns
+        ),
+    }
+
+
+async def run(args):
+    os.chdir(tempfile.mkdtemp(prefix="bench_parallel_tools_"))
+    from manager.sub_agents.stock_analyst.agent import stock_analyst
+
+    print(f"turns={args.turns} fetch latency={args.fetch_latency * 1000:.0f}ms "
+          f"model latency={args.model_latency * 1000:.0f}ms\n")
+    print(f"{'tickers':>7} {'mode':<11} tool step (turn minus model time)")
+    for n in args.tickers:
+        for concurrent in (False, True):
+            result = await run_variant(stock_analyst, concurrent, n, args)
+            mode = "concurrent" if concurrent else "sequential"
+            print(f"{n:>7} {mode:<11} {summarize_ms(result['tool_step'])}  "
+                  f"sum={n * args.fetch_latency * 1000:.0f}ms max={args.fetch_latency * 1000:.0f}ms  "
+                  f"state {'ok' if result['state_ok'] else 'MISMATCH'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, nargs="+", default=[1, 2, 4, 8], help="Tool calls per response")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--fetch-latency", type=float, default=0.2, help="Seconds per price fetch")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Seconds per model call")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
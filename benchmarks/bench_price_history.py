@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Price history in session state vs the columnar PriceHistoryStore.
+
+Simulates --days of price observations for --tickers tickers, one every
+--every seconds, and compares:
+
+- state list: what get_stock_price used to do, appending a dict per
+  observation to state["price_history"]; reports the JSON size of that list
+  (written with every session save) and the time to compute window stats
+  from it in pure Python
+- store: PriceHistoryStore (price_history.py) on a temporary SQLite file;
+  reports append throughput, the database size after compaction and
+  downsampling, and get_price_stats latency for several windows
+
+    python benchmarks/bench_price_history.py --days 90 --every 60 --tickers 5
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from manager.sub_agents.stock_analyst.price_history import PriceHistoryStore, parse_window  # noqa: E402
+
+WINDOWS = ["1h", "1d", "7d", "30d", "all"]
+
+
+def observations(tickers: list, days: float, every: float, end: float):
+    """Yield (ticker, epoch seconds, price) as a random walk per ticker, oldest first."""
+    count = int(days * 86400 / every)
+    prices = {t: 100.0 + 10 * i for i, t in enumerate(tickers)}
+    for step in range(count):
+        ts = end - (count - step) * every
+        for i, ticker in enumerate(tickers):
+            prices[ticker] *= 1 + 0.001 * math.sin(step * 0.37 + i) + 0.0005 * math.cos(step * 1.3)
+            yield ticker, ts, round(prices[ticker], 4)
+
+
+def python_stats(entries: list, ticker: str, since) -> dict:
+    """Window stats over the state list, the way a tool working on state would compute them."""
+    prices = [
+        e["price"] for e in entries
+        if e["ticker"] == ticker
+        and (since is None or datetime.strptime(e["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp() >= since)
+    ]
+    returns = [math.log(b / a) for a, b in zip(prices, prices[1:])]
+    return {
+        "min": min(prices), "max": max(prices), "mean": statistics.fmean(prices),
+        "volatility": statistics.stdev(returns) if len(returns) > 1 else 0.0,
+    }
+
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=float, default=90)
+    parser.add_argument("--every", type=float, default=60, help="Seconds between observations")
+    parser.add_argument("--tickers", type=int, default=5)
+    parser.add_argument("--raw-days", type=float, default=7, help="Days kept at full resolution")
+    parser.add_argument("--repeat", type=int, default=5, help="Queries per window")
+    args = parser.parse_args()
+
+    tickers = ["AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "META", "TSLA", "NFLX"][:args.tickers]
+    end = time.time()
+    data = list(observations(tickers, args.days, args.every, end))
+    print(f"{len(data):,} observations ({args.days:g} days every {args.every:g}s, {len(tickers)} tickers)\n")
+
+    # State list, with the string timestamps the tools record
+    entries = [
+        {"status": "success", "ticker": t, "price": p,
+         "timestamp": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")}
+        for t, ts, p in data
+    ]
+    state_bytes = len(json.dumps(entries))
+    print(f"state list: {state_bytes / 1024 / 1024:8.2f} MiB of JSON in every session save")
+    for window in WINDOWS:
+        seconds = parse_window(window)
+        since = end - seconds if seconds else None
+        samples = timed(lambda: python_stats(entries, tickers[0], since), max(1, args.repeat // 2))
+        print(f"  stats {window:>4}: {summarize_ms(samples)}")
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_price_history_"), "history.db")
+    store = PriceHistoryStore(db_path, raw_seconds=args.raw_days * 86400)
+    batch = len(tickers)
+    started = time.perf_counter()
+    for i in range(0, len(data), batch):
+        store.append(data[i:i + batch])
+    store.compact()
+    elapsed = time.perf_counter() - started
+    points = sum(len(store.series(t)[0]) for t in tickers)
+    print(f"\nstore: {len(data) / elapsed:,.0f} observations/s appended (one append per fetch of {batch})")
+    print(f"  {os.path.getsize(db_path) / 1024 / 1024:.2f} MiB on disk, {points:,} points kept "
+          f"(full resolution for {args.raw_days:g} days, hourly before)")
+    for window in WINDOWS:
+        samples = timed(lambda: store.stats(tickers[0], parse_window(window)), args.repeat)
+        print(f"  stats {window:>4}: {summarize_ms(samples)}")
+    print(f"\nlast 7d of {tickers[0]}: {store.stats(tickers[0], parse_window('7d'))}")
+
+
+if __name__ == "__main__":
+    main()
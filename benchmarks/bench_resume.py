@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Finding the session to resume: list_sessions()[0] vs get_latest_session.
+
+Creates --sessions sessions for one user (plus the same number for other
+users) in a fresh SQLite DB, then times both ways of picking the session to
+resume and checks which one actually returns the most recently updated
+session:
+
+- list_sessions(app, user).sessions[0]: loads every session row of the user
+- get_latest_session(app, user): one ORDER BY update_time DESC LIMIT 1 query
+  on the (app_name, user_id, update_time, id) index, then get_session
+
+    python benchmarks/bench_resume.py --sessions 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+
+from storage import DeltaDatabaseSessionService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000, help="Sessions for the measured user")
+    parser.add_argument("--lookups", type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_resume_"), "resume.db")
+    service = DeltaDatabaseSessionService(db_url=f"sqlite:///{db_path}")
+    for user_id in ("bench", "other"):
+        for _ in range(args.sessions):
+            service.create_session(app_name="bench", user_id=user_id, state={"n": 0})
+    # Touch an old session so the newest by update_time is not the newest row
+    sessions = service.list_sessions(app_name="bench", user_id="bench").sessions
+    target = service.get_session(app_name="bench", user_id="bench", session_id=sessions[len(sessions) // 2].id)
+    time.sleep(1.1)  # update_time has second resolution in SQLite
+    service.append_event(target, Event(author="user", invocation_id="touch", actions=EventActions(state_delta={"n": 1})))
+
+    def via_list():
+        return service.list_sessions(app_name="bench", user_id="bench").sessions[0].id
+
+    def via_index():
+        return service.get_latest_session(app_name="bench", user_id="bench").id
+
+    print(f"sessions per user={args.sessions} lookups={args.lookups}\n")
+    for label, lookup in (("list_sessions()[0]", via_list), ("get_latest_session", via_index)):
+        samples = []
+        for _ in range(args.lookups):
+            started = time.perf_counter()
+            session_id = lookup()
+            samples.append(time.perf_counter() - started)
+        print(f"  {label:<20} {summarize_ms(samples)}  newest: {session_id == target.id}")
+
+
+if __name__ == "__main__":
+    main()
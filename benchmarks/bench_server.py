@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Load test for multi_agent_server.py with an offline stub model.
+
+Starts the server in-process on an ephemeral port (temporary SQLite DB, EchoLlm
+in place of every LiteLlm), then runs --clients concurrent clients, each with
+its own user and session, sending --turns messages over a keep-alive
+connection. Reports requests/sec and latency percentiles.
+
+    python benchmarks/bench_server.py --clients 32 --turns 20 --max-concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from scripted_llm import EchoLlm, use_model  # noqa: E402
+
+
+async def request(reader, writer, method: str, path: str, body: dict) -> dict:
+    raw = json.dumps(body).encode()
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(raw)}\r\n\r\n".encode() + raw
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    payload = json.loads(await reader.readexactly(length))
+    if b" 200 " not in status_line:
+        raise RuntimeError(f"{status_line.decode().strip()}: {payload}")
+    return payload
+
+
+async def client(port: int, index: int, turns: int, latencies: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    user_id = f"user-{index}"
+    created = await request(reader, writer, "POST", "/sessions", {"user_id": user_id})
+    for turn in range(turns):
+        started = time.perf_counter()
+        await request(reader, writer, "POST", "/chat", {
+            "user_id": user_id,
+            "session_id": created["session_id"],
+            "message": f"message {turn} from {user_id}",
+        })
+        latencies.append(time.perf_counter() - started)
+    writer.close()
+
+
+async def run(args):
+    os.chdir(tempfile.mkdtemp(prefix="bench_server_"))
+
+    from google.adk.runners import Runner
+
+    import persistent_multi_agent
+    from multi_agent_server import APP_NAME, MultiAgentServer
+
+    use_model(persistent_multi_agent.root_agent, EchoLlm(latency=args.model_latency))
+    runner = Runner(
+        agent=persistent_multi_agent.root_agent,
+        app_name=APP_NAME,
+        session_service=persistent_multi_agent.session_service,
+    )
+    server = MultiAgentServer(
+        runner, initial_state=persistent_multi_agent.initial_state, max_concurrency=args.max_concurrency
+    )
+    listener = await server.start(port=0)
+    port = listener.sockets[0].getsockname()[1]
+
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, i, args.turns, latencies) for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    listener.close()
+
+    total = args.clients * args.turns
+    print(f"clients={args.clients} turns/client={args.turns} max_concurrency={args.max_concurrency} "
+          f"model_latency={args.model_latency * 1000:.0f}ms")
+    print(f"requests: {total}  elapsed: {elapsed:.2f}s  throughput: {total / elapsed:.1f} req/s")
+    print(f"client latency: {summarize_ms(latencies)}")
+    print(f"server stats:   {server.latency_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Stub model latency in seconds")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
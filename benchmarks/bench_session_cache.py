@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Per-turn session loads with and without the LRU session cache.
+
+Runs --turns scripted manager turns for each of --users users (round robin,
+one session each) through the Runner, once on CompactingDeltaSessionService
+directly and once wrapped in CachingSessionService with --cache-sessions
+slots. Every turn also re-loads the session for display, as the interactive
+scripts used to. Reports turn latency, get_session latency, the cache's hit
+rate and memory use, and checks the cached sessions against the database.
+
+    python benchmarks/bench_session_cache.py --users 8 --turns 200 --cache-sessions 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from bench_agents import AGENTS, load_manager, multi_agent_state
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from scripted_llm import ScriptedLlm, use_model  # noqa: E402
+from storage import CachingSessionService, CompactingDeltaSessionService  # noqa: E402
+
+# The manager scenarios of bench_agents.py (each hands over to another sub-agent)
+SCENARIOS = AGENTS["manager"][3]
+
+
+def time_loads(service) -> list:
+    """Record the latency of every get_session call on `service` (an instance patch)."""
+    loads = []
+    get_session = service.get_session
+
+    def timed_get_session(**kwargs):
+        started = time.perf_counter()
+        try:
+            return get_session(**kwargs)
+        finally:
+            loads.append(time.perf_counter() - started)
+
+    service.get_session = timed_get_session
+    return loads
+
+
+async def run_variant(service, args):
+    agent = load_manager()
+    llm = ScriptedLlm()
+    use_model(agent, llm)
+    runner = Runner(agent=agent, app_name="bench", session_service=service)
+    sessions = [
+        service.create_session(app_name="bench", user_id=f"user{u}", state=multi_agent_state())
+        for u in range(args.users)
+    ]
+    loads = time_loads(service)
+    latencies = []
+    for turn in range(args.turns):
+        session = sessions[turn % args.users]
+        message, steps = SCENARIOS[(turn // args.users) % len(SCENARIOS)]
+        llm.start_turn(steps)
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        started = time.perf_counter()
+        async for _ in runner.run_async(user_id=session.user_id, session_id=session.id, new_message=content):
+            pass
+        # The display re-load the interactive scripts used to do after each turn
+        service.get_session(app_name="bench", user_id=session.user_id, session_id=session.id)
+        latencies.append(time.perf_counter() - started)
+    return latencies, loads
+
+
+async def run(args):
+    db_dir = tempfile.mkdtemp(prefix="bench_session_cache_")
+    os.chdir(db_dir)
+
+    def database(name):
+        return CompactingDeltaSessionService(db_url=f"sqlite:///{os.path.join(db_dir, name)}.db")
+
+    cached = CachingSessionService(database("cached"), max_sessions=args.cache_sessions)
+    variants = {"database only": database("plain"), f"LRU cache ({args.cache_sessions} sessions)": cached}
+    print(f"users={args.users} turns={args.turns}\n")
+    results = {}
+    for label, service in variants.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[label] = await run_variant(service, args)
+        latencies, loads = results[label]
+        print(label)
+        print(f"  turn:        {summarize_ms(latencies)}")
+        print(f"  get_session: {summarize_ms(loads)}")
+    print(f"\ncache: {cached.stats()}")
+
+    # The cached copies must match what is in the database
+    matches = 0
+    for key in list(cached._entries):
+        app_name, user_id, session_id = key
+        from_cache = cached.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        from_db = cached.inner.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        matches += from_cache.state == from_db.state and len(from_cache.events) == len(from_db.events)
+    print(f"cached sessions identical to the database: {matches}/{len(cached._entries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=120)
+    parser.add_argument("--cache-sessions", type=int, default=8)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Startup cost of persistent_multi_agent.py: import time and time to first prompt.
+
+Two measurements, each in fresh interpreters with a temporary working
+directory (so a new SQLite DB is created):
+
+1. `python -X importtime -c "import <module>"` for persistent_multi_agent and
+   for manager.agent: total import time, the heaviest direct imports, and
+   whether yfinance is imported at all.
+2. Wall time from process start until the "You:" prompt is printed, for the
+   script as it is (agents load in the background) and with manager.agent
+   imported eagerly before it runs (how the script started before).
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_utils import REPO_ROOT
+
+EXAMPLE_DIR = os.path.join(REPO_ROOT, "6.Multi-agent")
+SCRIPT = os.path.join(EXAMPLE_DIR, "persistent_multi_agent.py")
+
+EAGER = (
+    "import runpy, sys; sys.path.insert(0, {dir!r}); import manager.agent; "
+    "runpy.run_path({script!r}, run_name='__main__')"
+)
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = EXAMPLE_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["PYTHONUNBUFFERED"] = "1"
+    env["PYTHONWARNINGS"] = "ignore"
+    env["MULTI_AGENT_SHOW_STATE"] = "0"
+    return env
+
+
+def import_times(module: str) -> tuple:
+    """Return (total seconds, [(cumulative seconds, module)] for the modules
+    imported directly by the top-level imports, and all module names)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=tmp, env=child_env(), capture_output=True, text=True,
+        )
+    total, direct, names = 0.0, [], set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # two spaces per nesting level
+        names.add(name.strip())
+        seconds = int(cumulative) / 1e6
+        if depth == 0:
+            total += seconds
+        elif depth == 1:
+            direct.append((seconds, name.strip()))
+    return total, sorted(direct, reverse=True), names
+
+
+def time_to_prompt(args: list) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            args, cwd=tmp, env=child_env(), stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        seen = ""
+        while "You:" not in seen:
+            char = proc.stdout.read(1)
+            if not char:
+                raise RuntimeError(f"process exited before the prompt: {seen[-500:]}")
+            seen += char
+        elapsed = time.perf_counter() - started
+        proc.communicate("exit\n")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Startups per variant")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    for module in ("persistent_multi_agent", "manager.agent"):
+        total, top_level, names = import_times(module)
+        print(f"import {module}: {total:.2f}s total, yfinance imported: {'yfinance' in names}, "
+              f"litellm imported: {'litellm' in names}")
+        for seconds, name in top_level[:args.top]:
+            print(f"  {seconds:7.3f}s  {name}")
+        print()
+
+    variants = {
+        "lazy (as shipped)": [sys.executable, SCRIPT],
+        "eager manager.agent": [sys.executable, "-c", EAGER.format(dir=EXAMPLE_DIR, script=SCRIPT)],
+    }
+    print(f"time to first prompt ({args.runs} runs each)")
+    for label, command in variants.items():
+        samples = [time_to_prompt(command) for _ in range(args.runs)]
+        print(f"  {label:<22} median={statistics.median(samples):6.2f}s  "
+              f"min={min(samples):6.2f}s  max={max(samples):6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Bytes written per turn: DatabaseSessionService vs DeltaDatabaseSessionService.
+
+Simulates a long session of the multi-agent app without a model: every turn
+appends a user event and a tool event whose state_delta touches a few small
+keys (last_user_input, session_metadata). Every 5th turn is a stock turn that
+also appends to price_history, so the full state keeps growing.
+
+    python benchmarks/bench_state_writes.py --turns 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import SqlBytesCounter, add_example_paths
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.adk.sessions import DatabaseSessionService  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from storage.delta_session_service import DeltaDatabaseSessionService  # noqa: E402
+
+
+def run_session(service_cls, db_path: str, turns: int, report_every: int) -> list:
+    service = service_cls(db_url=f"sqlite:///{db_path}")
+    counter = SqlBytesCounter(service.db_engine)
+    session = service.create_session(
+        app_name="bench", user_id="u", state={"price_history": [], "session_metadata": {}}
+    )
+
+    price_history = []
+    rows = []
+    window_bytes = 0
+    window_small_bytes = 0
+    window_start = time.perf_counter()
+    for turn in range(1, turns + 1):
+        counter.reset()
+        user_event = Event(
+            invocation_id=f"inv-{turn}",
+            author="user",
+            content=types.Content(role="user", parts=[types.Part(text=f"message {turn}")]),
+        )
+        service.append_event(session, user_event)
+
+        delta = {
+            "last_user_input": f"message {turn}",
+            "session_metadata": {"last_activity": time.time(), "total_interactions": turn},
+        }
+        if turn % 5 == 0:
+            price_history.append({"ticker": "AAPL", "price": 100.0 + turn, "timestamp": time.time()})
+            delta["price_history"] = list(price_history)
+        tool_event = Event(
+            invocation_id=f"inv-{turn}",
+            author="manager",
+            actions=EventActions(state_delta=delta),
+        )
+        service.append_event(session, tool_event)
+        window_bytes += counter.bytes_written
+        if turn % 5:
+            window_small_bytes += counter.bytes_written
+
+        if turn % report_every == 0:
+            elapsed = time.perf_counter() - window_start
+            small_turns = report_every - report_every // 5
+            rows.append((
+                turn,
+                window_small_bytes / small_turns,
+                window_bytes / report_every,
+                elapsed / report_every * 1000,
+            ))
+            window_bytes = 0
+            window_small_bytes = 0
+            window_start = time.perf_counter()
+    service.db_engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--report-every", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for service_cls in (DatabaseSessionService, DeltaDatabaseSessionService):
+            db_path = os.path.join(tmp, f"{service_cls.__name__}.db")
+            results[service_cls.__name__] = run_session(
+                service_cls, db_path, args.turns, args.report_every
+            )
+
+    print("Bytes written per turn. 'small' turns only touch last_user_input and")
+    print("session_metadata; 'all' also includes the every-5th-turn price_history append.\n")
+    print(f"{'turns':>8} | {'DatabaseSessionService':^34} | {'DeltaDatabaseSessionService':^34}")
+    print(f"{'':>8} | {'small':>10} {'all':>10} {'ms/turn':>12} | {'small':>10} {'all':>10} {'ms/turn':>12}")
+    base_rows = results["DatabaseSessionService"]
+    delta_rows = results["DeltaDatabaseSessionService"]
+    for (turn, b_small, b_all, b_ms), (_, d_small, d_all, d_ms) in zip(base_rows, delta_rows):
+        print(
+            f"{turn:>8} | {b_small:>10,.0f} {b_all:>10,.0f} {b_ms:>12.2f} |"
+            f" {d_small:>10,.0f} {d_all:>10,.0f} {d_ms:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
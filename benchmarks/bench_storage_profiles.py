@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Commits/sec and concurrent reader latency for each SQLite storage profile.
+
+For SQLAlchemy's defaults and every profile in agent_common/storage_profiles.py:
+
+- raw: single-row upsert + commit through the engine for --seconds, which
+  isolates what journal mode and synchronous level cost per commit
+- service: a fresh database gets --sessions sessions; then one writer
+  thread appends events with a state change (one commit each, round robin
+  over the sessions) for --seconds while --readers reader threads, each
+  with its own service and engine as a second process such as
+  print_latest_state.py would have, keep loading the newest session.
+  Reports writer commits/sec, reader get_session latency and "database is
+  locked" errors.
+
+    python benchmarks/bench_storage_profiles.py --seconds 5 --readers 2
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from bench_utils import add_example_paths, summarize_ms
+
+add_example_paths("6.Multi-agent")
+
+from google.adk.events.event import Event  # noqa: E402
+from google.adk.events.event_actions import EventActions  # noqa: E402
+from google.genai import types  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from storage import PROFILES, DeltaDatabaseSessionService, create_profiled_engine  # noqa: E402
+
+
+def raw_commits(profile, seconds: float) -> float:
+    """Commits/sec of a one-row upsert through the profile's engine."""
+    db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_storage_profiles_'), 'raw.db')}"
+    engine = create_profiled_engine(db_url, profile) if profile else create_engine(db_url)
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE entries (key INTEGER PRIMARY KEY, value TEXT)"))
+        conn.commit()
+        commits, started = 0, time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            conn.execute(text("INSERT OR REPLACE INTO entries VALUES (:key, :value)"),
+                         {"key": commits % 50, "value": "x" * 500})
+            conn.commit()
+            commits += 1
+        return commits / (time.perf_counter() - started)
+
+
+def writer(service, sessions: list, stop: threading.Event, result: dict) -> None:
+    commits = 0
+    while not stop.is_set():
+        session = sessions[commits % len(sessions)]
+        content = types.Content(role="model", parts=[types.Part(text=f"reply {commits} " * 20)])
+        try:
+            service.append_event(session, Event(
+                invocation_id=f"inv-{commits}", author="bench", content=content,
+                actions=EventActions(state_delta={"counter": commits, "last_reply": f"reply {commits}"}),
+            ))
+        except OperationalError:
+            result["errors"] += 1
+            # The in-memory session already moved on; reload it
+            sessions[commits % len(sessions)] = service.get_session(
+                app_name="bench", user_id=session.user_id, session_id=session.id
+            )
+        commits += 1
+    result["commits"] = commits
+
+
+def reader(db_url: str, profile, stop: threading.Event, samples: list, result: dict) -> None:
+    service = DeltaDatabaseSessionService(db_url=db_url, profile=profile)
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            service.get_latest_session(app_name="bench", user_id="user0")
+            samples.append(time.perf_counter() - started)
+        except OperationalError:
+            result["errors"] += 1
+        time.sleep(0.002)
+
+
+def run_profile(profile, args) -> tuple:
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_storage_profiles_"), "profiles.db")
+    db_url = f"sqlite:///{db_path}"
+    service = DeltaDatabaseSessionService(db_url=db_url, profile=profile)
+    sessions = [
+        service.create_session(app_name="bench", user_id="user0", state={"counter": 0, "notes": ["x" * 200] * 20})
+        for _ in range(args.sessions)
+    ]
+    for session in sessions:
+        for turn in range(args.history):
+            content = types.Content(role="user", parts=[types.Part(text=f"message {turn}")])
+            service.append_event(session, Event(invocation_id=f"seed-{turn}", author="user", content=content))
+
+    stop = threading.Event()
+    write_result = {"errors": 0, "commits": 0}
+    read_result = {"errors": 0}
+    read_samples = []
+    threads = [threading.Thread(target=writer, args=(service, sessions, stop, write_result))]
+    threads += [
+        threading.Thread(target=reader, args=(db_url, profile, stop, read_samples, read_result))
+        for _ in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return write_result, read_result, read_samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="Measurement time per profile")
+    parser.add_argument("--readers", type=int, default=2, help="Concurrent reader threads")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--history", type=int, default=50, help="Events recorded in each session beforehand")
+    args = parser.parse_args()
+
+    print(f"seconds={args.seconds} readers={args.readers} sessions={args.sessions} history={args.history}\n")
+    for profile in [None, *PROFILES]:
+        raw = raw_commits(profile, args.seconds)
+        writes, reads, samples = run_profile(profile, args)
+        print(profile or "SQLAlchemy defaults")
+        print(f"  raw:            {raw:8.1f} commits/s")
+        print(f"  service writer: {writes['commits'] / args.seconds:8.1f} commits/s  locked errors: {writes['errors']}")
+        print(f"  service reader: {summarize_ms(samples)}  reads: {len(samples)}  locked errors: {reads['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Time to first token (streaming) vs time to final response (non-streaming).
+
+Runs the same scripted turns twice through the Runner: once as today (the
+response is shown when the final event arrives) and once with
+RunConfig(streaming_mode=SSE), where the first partial text event is what the
+user sees first. The ScriptedLlm generates the reply in chunks of
+--chunk-words words, --chunk-latency seconds each, after a --model-latency
+delay, so both modes spend the same total time in the model.
+
+    python benchmarks/bench_streaming.py --turns 10 --reply-words 120
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from bench_agents import load_greeting_agent, load_manager, make_session_service, multi_agent_state
+from bench_utils import summarize_ms
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.genai import types
+
+from scripted_llm import ScriptedLlm, call, text, transfer, use_model
+
+
+def scenarios(reply: str) -> dict:
+    # name -> (loader, session service kind, initial state factory, steps)
+    return {
+        "greeting_agent": (load_greeting_agent, "memory", dict, [text(reply)]),
+        "manager": (load_manager, "delta", multi_agent_state, [
+            transfer("stock_analyst"), call("get_stock_price", ticker="AAPL"), text(reply),
+        ]),
+    }
+
+
+async def measure(name, spec, args, db_dir, stream: bool):
+    loader, kind, state_factory, steps = spec
+    agent = loader()
+    llm = ScriptedLlm(latency=args.model_latency, chunk_latency=args.chunk_latency, chunk_words=args.chunk_words)
+    use_model(agent, llm)
+    service = make_session_service(kind, db_dir, f"{name}-{'sse' if stream else 'none'}")
+    runner = Runner(agent=agent, app_name=f"bench-{name}", session_service=service)
+    session = service.create_session(app_name=runner.app_name, user_id="bench", state=state_factory())
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if stream else RunConfig()
+
+    first, final = [], []
+    for turn in range(args.turns):
+        llm.start_turn(steps)
+        content = types.Content(role="user", parts=[types.Part(text=f"message {turn}")])
+        started = time.perf_counter()
+        first_seen = None
+        async for event in runner.run_async(
+            user_id="bench", session_id=session.id, new_message=content, run_config=run_config
+        ):
+            has_text = event.content and event.content.parts and event.content.parts[0].text
+            if first_seen is None and has_text and (event.partial or event.is_final_response()):
+                first_seen = time.perf_counter() - started
+            if event.is_final_response():
+                final.append(time.perf_counter() - started)
+        first.append(first_seen)
+    return first, final
+
+
+async def run(args):
+    db_dir = tempfile.mkdtemp(prefix="bench_streaming_")
+    os.chdir(db_dir)
+    reply = " ".join(f"word{i}" for i in range(args.reply_words))
+
+    print(f"turns={args.turns} model_latency={args.model_latency * 1000:.0f}ms "
+          f"chunk={args.chunk_words} words/{args.chunk_latency * 1000:.0f}ms reply={args.reply_words} words\n")
+    for name, spec in scenarios(reply).items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, final_plain = await measure(name, spec, args, db_dir, stream=False)
+            first_sse, final_sse = await measure(name, spec, args, db_dir, stream=True)
+        print(name)
+        print(f"  non-streaming, first text = final: {summarize_ms(final_plain)}")
+        print(f"  streaming, first token:           {summarize_ms(first_sse)}")
+        print(f"  streaming, final response:        {summarize_ms(final_sse)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--model-latency", type=float, default=0.3, help="Delay before the first chunk (s)")
+    parser.add_argument("--chunk-latency", type=float, default=0.02, help="Generation time per chunk (s)")
+    parser.add_argument("--chunk-words", type=int, default=3)
+    parser.add_argument("--reply-words", type=int, default=120)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+The examples live in folders that are not Python packages ("6.Multi-agent",
+"5.Persistent-Storage", ...), so each script calls `add_example_paths()` to make
+their modules importable the same way running them from their folder would
+(plus the repository root, for the shared agent_common package).
+"""
+import os
+import statistics
+import sys
+import warnings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EXAMPLE_DIRS = [
+    "1.Basic Agent",
+    "2.Tools",
+    "3.Structure Output",
+    "4.Sessions-and-state",
+    "5.Persistent-Storage",
+    "6.Multi-agent",
+]
+
+
+def add_example_paths(*dirs: str) -> None:
+    """Put example folders (all of them by default) and the repository root on sys.path."""
+    warnings.filterwarnings("ignore")
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+    for d in dirs or EXAMPLE_DIRS:
+        path = os.path.join(REPO_ROOT, d)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of `values` (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize_ms(samples: list) -> str:
+    """Format a list of durations (seconds) as p50/p99/mean in milliseconds."""
+    if not samples:
+        return "n/a"
+    return (
+        f"p50={percentile(samples, 50) * 1000:8.2f}ms  "
+        f"p99={percentile(samples, 99) * 1000:8.2f}ms  "
+        f"mean={statistics.mean(samples) * 1000:8.2f}ms"
+    )
+
+
+class SqlBytesCounter:
+    """Counts statements and parameter bytes sent to a SQLAlchemy engine.
+
+    Only INSERT/UPDATE/DELETE/REPLACE statements are counted, which is a good
+    proxy for the bytes a session service writes to the database.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.bytes_written = 0
+        self.statements = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def reset(self) -> None:
+        self.bytes_written = 0
+        self.statements = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(" ", 1)[0].upper()
+        if verb not in ("INSERT", "UPDATE", "DELETE", "REPLACE"):
+            return
+        self.statements += 1
+        self.bytes_written += len(statement)
+        rows = parameters if executemany else [parameters]
+        for row in rows:
+            values = row.values() if isinstance(row, dict) else row
+            for value in values or ():
+                if isinstance(value, (str, bytes)):
+                    self.bytes_written += len(value)
+                elif value is not None:
+                    self.bytes_written += 8
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Watchlist analytics: per-ticker requests vs one batched, cached download.
+
+Writes a CSV fixture of --days of daily bars for --tickers tickers and serves
+it through CsvBarSource, with --request-latency seconds added per request (a
+Yahoo round-trip). Compares the time to get the closes analyze_watchlist
+needs:
+
+- per ticker: one request per ticker, nothing cached (what a loop over
+  yf.Ticker(...) calls costs)
+- cold cache: DailyBarCache, one batched request for all tickers
+- warm cache: the same call again the same day (no request)
+- next day: one request for the new tail only
+
+and checks that every variant yields the same analysis, then times
+analyze_closes itself.
+
+    python benchmarks/bench_watchlist.py --tickers 25 --days 500 --request-latency 0.3
+"""
+import argparse
+import csv
+import math
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from bench_utils import add_example_paths
+
+add_example_paths("6.Multi-agent")
+
+from manager.sub_agents.stock_analyst.price_bars import (  # noqa: E402
+    CsvBarSource,
+    DailyBarCache,
+    analyze_closes,
+    period_start,
+)
+
+
+class SlowSource:
+    """Adds a fixed latency to every request of a bar source."""
+
+    def __init__(self, source, latency: float):
+        self.source = source
+        self.latency = latency
+        self.requests = 0
+        self.bars = 0
+
+    def fetch(self, tickers, start, end):
+        self.requests += 1
+        time.sleep(self.latency)
+        frames = self.source.fetch(tickers, start, end)
+        self.bars += sum(len(f) for f in frames.values())
+        return frames
+
+
+def write_fixture(path: str, tickers: list, days: int, end: date) -> None:
+    """Daily bars for business days up to `end`, a deterministic walk per ticker."""
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "ticker", "open", "high", "low", "close", "volume"])
+        day, rows = end, []
+        while len(rows) < days:
+            if day.weekday() < 5:
+                rows.append(day)
+            day -= timedelta(days=1)
+        for i, ticker in enumerate(tickers):
+            price = 50.0 + 7 * i
+            for n, day in enumerate(reversed(rows)):
+                price *= 1 + 0.01 * math.sin(n * 0.21 + i) + 0.004 * math.cos(n * (0.5 + i / 50))
+                writer.writerow([day.isoformat(), ticker, price * 0.995, price * 1.01, price * 0.99,
+                                 round(price, 4), 1_000_000 + n])
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=25)
+    parser.add_argument("--days", type=int, default=500, help="Trading days in the fixture")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--request-latency", type=float, default=0.3, help="Seconds per source request")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_watchlist_")
+    today = date.today()
+    tickers = [f"T{i:03d}" for i in range(args.tickers)]
+    fixture = os.path.join(workdir, "bars.csv")
+    write_fixture(fixture, tickers, args.days, today)
+    start = period_start(args.period, today)
+    print(f"{args.tickers} tickers, period {args.period} (from {start}), "
+          f"{args.request_latency * 1000:.0f}ms per request\n")
+
+    # The cache is filled the day before the last trading day; "next day" then finds its bar
+    last_day = today - timedelta(days=max(0, today.weekday() - 4))
+    day_before = last_day - timedelta(days=1)
+    results = {}
+
+    source = SlowSource(CsvBarSource(fixture), args.request_latency)
+
+    def per_ticker():
+        import pandas as pd
+
+        frames = {}
+        for ticker in tickers:
+            frames.update(source.fetch([ticker], start, today + timedelta(days=1)))
+        return pd.DataFrame({t: f["close"] for t, f in frames.items()}).sort_index()
+
+    closes, elapsed = timed(per_ticker)
+    results["per ticker"] = (closes, elapsed, source.requests, source.bars)
+
+    source = SlowSource(CsvBarSource(fixture), args.request_latency)
+    current = {"day": day_before}
+    cache = DailyBarCache(os.path.join(workdir, "cache.db"), source=source, today=lambda: current["day"])
+    for label, day in [("cold cache", day_before), ("warm cache", day_before), ("next day", last_day)]:
+        current["day"] = day
+        requests, bars = source.requests, source.bars
+        closes, elapsed = timed(lambda: cache.closes(tickers, start))
+        results[label] = (closes, elapsed, source.requests - requests, source.bars - bars)
+
+    print(f"{'variant':<12} {'time':>10} {'requests':>9} {'bars fetched':>13}")
+    for label, (_, elapsed, requests, bars) in results.items():
+        print(f"{label:<12} {elapsed * 1000:8.1f}ms {requests:>9} {bars:>13,}")
+
+    reference = analyze_closes(results["per ticker"][0])
+    same = analyze_closes(results["next day"][0]) == reference
+    print(f"\nanalysis identical to per-ticker download: {same}")
+    analysis, elapsed = timed(lambda: analyze_closes(results["next day"][0]))
+    print(f"analyze_closes: {elapsed * 1000:.1f}ms for {analysis['trading_days']} days x {len(tickers)} tickers; "
+          f"portfolio {analysis['portfolio']}")
+
+
+if __name__ == "__main__":
+    main()
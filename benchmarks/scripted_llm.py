@@ -0,0 +1,168 @@
+"""Offline, deterministic LLM stand-ins for benchmarks.
+
+These implement google.adk's BaseLlm, so they can replace the LiteLlm models
+the examples are built with (see `use_model`) and no network is needed.
+
+A ScriptedLlm plays back a list of steps, one step per model call:
+
+    llm = ScriptedLlm(latency=0.2)
+    use_model(root_agent, llm)
+    llm.start_turn([
+        transfer("stock_analyst"),
+        call("get_stock_price", ticker="AAPL"),
+        text("AAPL is at $190."),
+    ])
+    # ... run one turn through the Runner ...
+
+When the steps run out it answers with an echo of the last user message,
+which ends the turn. Scripts can also be loaded from JSON (`load_script`) to
+replay recorded conversations.
+"""
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+
+def use_model(agent, llm) -> None:
+    """Replace the model of `agent` and all of its sub-agents with `llm`."""
+    agent.model = llm
+    for sub_agent in agent.sub_agents:
+        use_model(sub_agent, llm)
+
+
+def last_user_text(llm_request) -> str:
+    """Text of the most recent user message in the request ('' if none)."""
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user" and content.parts:
+            for part in content.parts:
+                if part.text:
+                    return part.text
+    return ""
+
+
+# ===== Script steps =====
+
+def text(value: str) -> dict:
+    """A step that answers with plain text (ends the turn)."""
+    return {"text": value}
+
+
+def call(name: str, /, **args) -> dict:
+    """A step that calls one tool."""
+    return {"calls": [{"name": name, "args": args}]}
+
+
+def calls(*steps: dict) -> dict:
+    """A step that calls several tools in one model response."""
+    return {"calls": [c for step in steps for c in step["calls"]]}
+
+
+def transfer(agent_name: str) -> dict:
+    """A step that hands the conversation to another agent."""
+    return call("transfer_to_agent", agent_name=agent_name)
+
+
+def load_script(path: str) -> list:
+    """Load steps from a JSON file: a list of {"text": ...} / {"calls": [...]} objects."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def step_to_content(step: dict) -> types.Content:
+    if "calls" in step:
+        parts = [
+            types.Part(function_call=types.FunctionCall(name=c["name"], args=c.get("args", {})))
+            for c in step["calls"]
+        ]
+    else:
+        parts = [types.Part(text=step.get("text", ""))]
+    return types.Content(role="model", parts=parts)
+
+
+class ScriptedLlm(BaseLlm):
+    """Deterministic BaseLlm that plays back scripted steps.
+
+    Attributes:
+        latency: Seconds to wait before each response (simulated model time)
+        chunk_latency: Seconds to generate each text chunk; without streaming the
+            whole text arrives after all chunks would have been generated
+        chunk_words: Words per streamed text chunk
+        responder: Optional callable(llm_request, call_index) -> step, used when
+            the current turn script is exhausted (instead of the echo reply)
+    """
+
+    model: str = "scripted"
+    latency: float = 0.0
+    chunk_latency: float = 0.0
+    chunk_words: int = 3
+    responder: Optional[Callable[[Any, int], Optional[dict]]] = None
+
+    _steps: list = PrivateAttr(default_factory=list)
+    _cursor: int = PrivateAttr(default=0)
+    _turn_calls: int = PrivateAttr(default=0)
+    _total_calls: int = PrivateAttr(default=0)
+
+    def start_turn(self, steps: Optional[list] = None) -> None:
+        """Begin a new turn that plays back `steps` (echo reply if empty)."""
+        self._steps = list(steps or [])
+        self._cursor = 0
+        self._turn_calls = 0
+
+    @property
+    def turn_calls(self) -> int:
+        """Model calls made since the last start_turn()."""
+        return self._turn_calls
+
+    @property
+    def total_calls(self) -> int:
+        return self._total_calls
+
+    def next_step(self, llm_request) -> dict:
+        if self._cursor < len(self._steps):
+            step = self._steps[self._cursor]
+            self._cursor += 1
+            return step
+        if self.responder:
+            step = self.responder(llm_request, self._turn_calls)
+            if step:
+                return step
+        return text(f"echo: {last_user_text(llm_request)}")
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self._turn_calls += 1
+        self._total_calls += 1
+        step = self.next_step(llm_request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        words = step.get("text", "").split(" ")
+        if not stream or "calls" in step:
+            if self.chunk_latency and "text" in step:
+                # The same generation time, delivered all at once
+                await asyncio.sleep(self.chunk_latency * -(-len(words) // self.chunk_words))
+            yield LlmResponse(content=step_to_content(step))
+            return
+
+        # Stream text the way LiteLlm does: partial chunks, then the full text
+        for i in range(0, len(words), self.chunk_words):
+            chunk = " ".join(words[i:i + self.chunk_words])
+            if i + self.chunk_words < len(words):
+                chunk += " "
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text=chunk)]),
+                partial=True,
+            )
+            if self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+        yield LlmResponse(content=step_to_content(step))
+
+
+class EchoLlm(ScriptedLlm):
+    """Answers every request with the last user message, after `latency` seconds."""
+
+    model: str = "echo"